@@ -0,0 +1,228 @@
+import os
+import sqlite3
+import threading
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from cambios import obtener_conteo
+from comparacion import NOVEDADES_INGRESO, fecha_evento
+from dotacion import dias_desde_epoch
+from identidad import claves_persona, obtener_identidad
+from registros import obtener_registros, CAMPOS
+from utils import version_datos
+
+# Motores disponibles para las agregaciones de las páginas
+MOTORES = {
+    'pandas': 'pandas (en memoria)',
+    'sqlite': 'SQLite embebido',
+}
+MOTOR_POR_DEFECTO = os.environ.get('INDICADORES_MOTOR', 'pandas')
+
+# Archivo de la base SQLite (por defecto la base vive solo en memoria)
+RUTA_SQLITE = os.environ.get('INDICADORES_SQLITE_RUTA', ':memory:')
+
+# Columnas de la tabla: dimensiones como texto, la clave de la persona (ver identidad.py)
+# y fechas como días desde 1970-01-01
+DIMENSIONES = ['origen', 'tipo_novedad', 'sitio'] + CAMPOS
+PERSONA = 'persona'
+COLUMNAS = DIMENSIONES + [PERSONA, 'fecha_ingreso', 'fecha_retiro']
+
+INDICES = {
+    'idx_novedad_ingreso': ['tipo_novedad', 'fecha_ingreso'],
+    'idx_novedad_retiro': ['tipo_novedad', 'fecha_retiro'],
+    **{f'idx_{columna}': [columna] for columna in ['origen', 'sitio'] + CAMPOS},
+}
+
+
+class AlmacenSQL:
+    """
+    Tabla unificada de registros en una base SQLite embebida, con índices por novedad,
+    fecha y dimensiones. La conexión se comparte entre sesiones: las consultas se
+    serializan con un candado.
+    """
+
+    def __init__(self, registros, ruta=RUTA_SQLITE):
+        self._candado = threading.Lock()
+        self.conexion = sqlite3.connect(ruta, check_same_thread=False)
+
+        tabla = pd.DataFrame({
+            columna: registros[columna].astype(object).where(registros[columna].notna(), None)
+            for columna in DIMENSIONES
+        })
+        tabla[PERSONA] = claves_persona(registros)
+        for columna in ['fecha_ingreso', 'fecha_retiro']:
+            tabla[columna] = pd.array(dias_desde_epoch(registros[columna]), dtype='Int64')
+
+        with self._candado, self.conexion:
+            self.conexion.execute("DROP TABLE IF EXISTS registros")
+            self.conexion.execute(
+                "CREATE TABLE registros ("
+                + ", ".join(f"{c} TEXT" for c in DIMENSIONES)
+                + f", {PERSONA} INTEGER, fecha_ingreso INTEGER, fecha_retiro INTEGER)"
+            )
+            self.conexion.executemany(
+                f"INSERT INTO registros ({', '.join(COLUMNAS)}) VALUES ({', '.join('?' * len(COLUMNAS))})",
+                tabla[COLUMNAS].astype(object).where(tabla[COLUMNAS].notna(), None).itertuples(index=False, name=None)
+            )
+            for nombre, columnas in INDICES.items():
+                self.conexion.execute(f"CREATE INDEX {nombre} ON registros ({', '.join(columnas)})")
+            self.conexion.execute("ANALYZE")
+
+    def consultar(self, sql, parametros=()):
+        """Ejecuta una consulta parametrizada y retorna (columnas, filas)."""
+        with self._candado:
+            cursor = self.conexion.execute(sql, parametros)
+            return [d[0] for d in cursor.description], cursor.fetchall()
+
+
+def _dia(fecha):
+    return int(np.datetime64(pd.Timestamp(fecha).normalize(), 'D').astype(np.int64))
+
+
+def contar_sql(almacen, por, origenes, novedades, fecha_min, fecha_max, incluir_nulos=False):
+    """
+    Cuenta registros por las columnas 'por' (dimensiones y/o 'persona') con una consulta
+    parametrizada. El filtro es el de las páginas: ACTIVO / CASO ESPECIAL por fecha de
+    ingreso y RETIRADO por fecha de retiro, dentro del rango. Las filas con alguna dimensión
+    vacía no se cuentan, salvo con incluir_nulos=True (forman su propio grupo, con None).
+    """
+    por = list(por)
+    if any(c not in DIMENSIONES + [PERSONA] for c in por):
+        raise ValueError(f"Dimensiones no válidas: {por}")
+    novedades = list(novedades)
+    ingreso = [n for n in novedades if n in NOVEDADES_INGRESO]
+    retiro = ['RETIRADO'] if 'RETIRADO' in novedades else []
+    desde, hasta = _dia(fecha_min), _dia(fecha_max)
+
+    condiciones_fecha, parametros = [], list(origenes)
+    if ingreso:
+        condiciones_fecha.append(
+            f"(tipo_novedad IN ({', '.join('?' * len(ingreso))}) AND fecha_ingreso BETWEEN ? AND ?)"
+        )
+        parametros += ingreso + [desde, hasta]
+    if retiro:
+        condiciones_fecha.append("(tipo_novedad = ? AND fecha_retiro BETWEEN ? AND ?)")
+        parametros += retiro + [desde, hasta]
+    if not condiciones_fecha:
+        vacio = pd.DataFrame({c: pd.Series(dtype=object) for c in por})
+        vacio['Total'] = pd.Series(dtype=np.int64)
+        return vacio
+
+    sql = (
+        f"SELECT {', '.join(por)}, COUNT(*) AS Total FROM registros"
+        f" WHERE origen IN ({', '.join('?' * len(origenes))})"
+        f" AND ({' OR '.join(condiciones_fecha)})"
+        + ("" if incluir_nulos else "".join(f" AND {c} IS NOT NULL" for c in por))
+        + f" GROUP BY {', '.join(por)} ORDER BY {', '.join(por)}"
+    )
+    columnas, filas = almacen.consultar(sql, parametros)
+    resultado = pd.DataFrame.from_records(filas, columns=columnas)
+    resultado['Total'] = resultado['Total'].astype(np.int64)
+    resultado = resultado.astype({c: object for c in por})
+    if incluir_nulos:
+        # SQLite ordena los NULL primero; se usa el mismo orden (y el mismo nulo) que en pandas
+        resultado = resultado.sort_values(por, ignore_index=True)
+        resultado = resultado.where(resultado.notna(), None)
+    return resultado
+
+
+def contar_pandas(registros, por, origenes, novedades, fecha_min, fecha_max, incluir_nulos=False, personas=None):
+    """
+    Equivalente en pandas de contar_sql sobre la tabla unificada de registros.
+    'personas' son las claves de identidad alineadas con los registros (se calculan si faltan).
+    Si la tabla trae la columna 'Total' (el conteo mantenido de cambios.py), cada fila
+    cuenta por ese total en lugar de uno.
+    """
+    por = list(por)
+    evento = fecha_evento(registros)
+    mascara = (
+        registros['origen'].isin(origenes)
+        & registros['tipo_novedad'].isin(novedades)
+        & (evento >= pd.Timestamp(fecha_min).normalize())
+        & (evento <= pd.Timestamp(fecha_max).normalize())
+    )
+    datos = registros.loc[mascara, [c for c in por if c != PERSONA]]
+    if PERSONA in por:
+        personas = claves_persona(registros) if personas is None else personas
+        datos = datos.assign(**{PERSONA: personas[mascara.to_numpy()]})[por]
+    if incluir_nulos:
+        datos = datos.astype(object)
+    if 'Total' in registros.columns:
+        conteo = datos.assign(Total=registros.loc[mascara, 'Total']).groupby(
+            por, observed=True, dropna=not incluir_nulos
+        )['Total'].sum()
+    else:
+        conteo = datos.groupby(por, observed=True, dropna=not incluir_nulos).size()
+    resultado = conteo[conteo > 0].rename('Total').reset_index()
+    resultado['Total'] = resultado['Total'].astype(np.int64)
+    resultado = resultado.astype({c: object for c in por})
+    resultado = resultado.sort_values(por, ignore_index=True)
+    if incluir_nulos:
+        resultado = resultado.where(resultado.notna(), None)
+    return resultado
+
+
+# Almacén construido una vez por versión de los datos (compartido entre sesiones)
+@st.cache_resource(ttl=3600, max_entries=2, show_spinner=False)
+def _almacen_por_version(version, _registros):
+    return AlmacenSQL(_registros)
+
+
+def obtener_almacen(data_dict):
+    """Retorna el AlmacenSQL de la versión actual de los datos."""
+    return _almacen_por_version(version_datos(data_dict), obtener_registros(data_dict))
+
+
+# Función para elegir el motor de consultas en la barra lateral
+def selector_motor():
+    """Muestra el selector del motor de consultas y retorna la clave elegida."""
+    opciones = list(MOTORES)
+    return st.sidebar.selectbox(
+        "Motor de consultas",
+        options=opciones,
+        index=opciones.index(MOTOR_POR_DEFECTO) if MOTOR_POR_DEFECTO in opciones else 0,
+        format_func=lambda m: MOTORES[m],
+        key="motor_consultas"
+    )
+
+
+def motor_actual():
+    """Motor elegido en la sesión (o el configurado por defecto)."""
+    return st.session_state.get('motor_consultas', MOTOR_POR_DEFECTO)
+
+
+def personas_distintas(conteo, por):
+    """
+    A partir de un conteo por (por..., persona) retorna la cantidad de personas distintas
+    por 'por': cada fila del conteo es una persona distinta dentro de su grupo.
+    """
+    por = list(por)
+    if conteo.empty:
+        return conteo[por + ['Total']].iloc[0:0]
+    resultado = conteo.groupby(por, dropna=False, sort=False).size().rename('Total').reset_index()
+    resultado['Total'] = resultado['Total'].astype(np.int64)
+    resultado = resultado.astype({c: object for c in por}).sort_values(por, ignore_index=True)
+    return resultado.where(resultado.notna(), None)
+
+
+def contar(data_dict, por, origenes, novedades, fecha_min, fecha_max, motor=None, incluir_nulos=False,
+           distintas=False):
+    """
+    Cuenta registros por las columnas 'por' con el motor indicado (por defecto el de la
+    sesión). Ambos motores retornan la misma tabla: columnas 'por' + 'Total', ordenada por 'por'.
+    Con distintas=True, 'Total' es la cantidad de personas distintas (por documento).
+    """
+    if distintas:
+        conteo = contar(data_dict, list(por) + [PERSONA], origenes, novedades, fecha_min, fecha_max, motor, incluir_nulos)
+        return personas_distintas(conteo, por)
+    if (motor or motor_actual()) == 'sqlite':
+        return contar_sql(obtener_almacen(data_dict), por, origenes, novedades, fecha_min, fecha_max, incluir_nulos)
+    if PERSONA not in por:
+        # Sin personas alcanza el conteo mantenido (se actualiza solo con las filas que cambian)
+        return contar_pandas(obtener_conteo(data_dict), por, origenes, novedades, fecha_min, fecha_max, incluir_nulos)
+    personas = obtener_identidad(data_dict).persona
+    return contar_pandas(
+        obtener_registros(data_dict), por, origenes, novedades, fecha_min, fecha_max, incluir_nulos, personas
+    )
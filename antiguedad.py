@@ -0,0 +1,156 @@
+import streamlit as st
+import pandas as pd
+import plotly.express as px
+from utils import load_all_data
+from registros import obtener_registros, ORIGENES
+from supervivencia import obtener_histograma, obtener_curvas
+import instrumentacion
+from instrumentacion import medir
+
+# Dimensiones por las que se puede desagregar el histograma de antigüedad
+AGRUPACIONES = {
+    'Origen': ['origen'],
+    'Tipo de Contrato': ['contrato'],
+    'Motivo de Retiro': ['motivo'],
+}
+
+# Estados para el histograma: antigüedad al retiro o antigüedad actual
+ESTADOS = {
+    'retiro': 'Al momento del retiro',
+    'activo': 'Actual (personal activo)',
+}
+
+def run():
+    """
+    Módulo que muestra la antigüedad del personal: distribución de la antigüedad al retiro
+    y actual, y curvas de permanencia por año de ingreso (cohorte).
+    """
+    # Cargar datos
+    instrumentacion.etapa('carga')
+    with st.spinner("Cargando datos..."):
+        data_dict = load_all_data()
+        registros = obtener_registros(data_dict)
+    
+    # ---------- FILTROS EN LA BARRA LATERAL ----------
+    instrumentacion.etapa('filtros_sidebar')
+    st.sidebar.header("Filtros")
+    
+    # 1. ORIGEN DE LOS DATOS
+    todos_origenes = list(ORIGENES.values())
+    origenes_seleccionados = st.sidebar.multiselect(
+        "Origen",
+        options=todos_origenes,
+        default=todos_origenes,
+        key="origenes_antiguedad"
+    )
+    if not origenes_seleccionados:
+        st.sidebar.warning("Por favor, seleccione al menos un origen.")
+        origenes_seleccionados = todos_origenes
+    
+    # 2. OPCIONES DEL HISTOGRAMA
+    estado = st.sidebar.radio(
+        "Antigüedad",
+        options=list(ESTADOS),
+        format_func=lambda e: ESTADOS[e],
+        key="estado_antiguedad"
+    )
+    agrupaciones = [a for a in AGRUPACIONES if estado == 'retiro' or a != 'Motivo de Retiro']
+    agrupacion = st.sidebar.selectbox("Agrupar por", agrupaciones, key="agrupacion_antiguedad")
+    
+    # 3. OPCIONES DE LAS CURVAS
+    meses = st.sidebar.slider(
+        "Horizonte de las curvas (meses)",
+        min_value=12,
+        max_value=120,
+        value=60,
+        step=12,
+        key="meses_antiguedad"
+    )
+    
+    # La fecha de corte es hoy: forma parte de la clave de caché
+    fecha_corte = pd.Timestamp.now().normalize()
+    
+    # ---------- HISTOGRAMA DE ANTIGÜEDAD ----------
+    instrumentacion.etapa('agregacion', filas=len(registros))
+    histograma = obtener_histograma(
+        data_dict, origenes_seleccionados, AGRUPACIONES[agrupacion], estado, fecha_corte
+    )
+    
+    st.header("Distribución de la Antigüedad")
+    st.caption(
+        f"{ESTADOS[estado]}, con corte al {fecha_corte.strftime('%d/%m/%Y')}. "
+        "Los registros sin fecha de ingreso y los RETIRADO sin fecha de retiro no se incluyen."
+    )
+    
+    if histograma.empty or histograma.to_numpy().sum() == 0:
+        st.warning("No hay datos disponibles con los filtros seleccionados.")
+    else:
+        instrumentacion.etapa('graficos')
+        datos_grafico = histograma.reset_index().melt(id_vars='Antigüedad', var_name='Grupo', value_name='Personas')
+        fig = px.bar(
+            datos_grafico,
+            x='Antigüedad',
+            y='Personas',
+            color='Grupo',
+            barmode='group',
+            title=f"Antigüedad por {agrupacion.lower()}",
+            labels={'Grupo': agrupacion},
+            height=500
+        )
+        fig.update_layout(plot_bgcolor='rgba(240, 240, 240, 0.5)')
+        with medir('render'):
+            st.plotly_chart(fig, use_container_width=True)
+        
+        with st.expander("Ver tabla de antigüedad"):
+            tabla = histograma.copy()
+            tabla['Total'] = tabla.sum(axis=1)
+            with medir('render', filas=len(tabla)):
+                st.dataframe(tabla, use_container_width=True)
+    
+    # ---------- CURVAS DE PERMANENCIA ----------
+    instrumentacion.etapa('agregacion')
+    curvas, tamanos = obtener_curvas(data_dict, origenes_seleccionados, meses, fecha_corte)
+    
+    st.header("Curvas de Permanencia por Año de Ingreso")
+    st.caption(
+        "Proporción de cada cohorte que sigue activa según los meses transcurridos desde el ingreso "
+        "(estimador de Kaplan–Meier: quienes siguen activos cuentan hasta la fecha de corte)."
+    )
+    
+    if curvas.empty or tamanos.empty:
+        st.warning("No hay datos suficientes para calcular las curvas de permanencia.")
+        return
+    
+    cohortes = st.multiselect(
+        "Cohortes a mostrar",
+        options=list(curvas.columns),
+        default=list(curvas.columns[-6:]),
+        key="cohortes_antiguedad"
+    )
+    if not cohortes:
+        st.info("Seleccione al menos una cohorte.")
+        return
+    
+    instrumentacion.etapa('graficos')
+    datos_curvas = (curvas[cohortes] * 100).reset_index().melt(id_vars='Meses', var_name='Cohorte', value_name='Activos (%)')
+    fig_curvas = px.line(
+        datos_curvas.dropna(),
+        x='Meses',
+        y='Activos (%)',
+        color='Cohorte',
+        line_shape='hv',
+        title="Permanencia por cohorte de ingreso",
+        height=500
+    )
+    fig_curvas.update_layout(plot_bgcolor='rgba(240, 240, 240, 0.5)', yaxis_range=[0, 100])
+    with medir('render'):
+        st.plotly_chart(fig_curvas, use_container_width=True)
+    
+    # Permanencia a hitos de interés
+    hitos = [m for m in (6, 12, 24, 36, 60) if m <= meses]
+    resumen = (curvas.loc[hitos, cohortes].T * 100).round(1)
+    resumen.columns = [f"{m} meses (%)" for m in hitos]
+    resumen.insert(0, 'Personas', tamanos[cohortes])
+    resumen.index.name = 'Cohorte'
+    with medir('render', filas=len(resumen)):
+        st.dataframe(resumen, use_container_width=True)
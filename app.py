@@ -6,6 +6,17 @@ import indicadores
 import areas_contratos
 import personal_activo
 import retiros  # Nuevo módulo de retiros
+import evolucion
+import antiguedad
+import retencion
+import empleados
+import instrumentacion
+import metricas
+import almacen_sql
+import calidad
+import cambios
+import historico
+import utils
 
 # Configuración de la página
 st.set_page_config(
@@ -33,6 +44,18 @@ def show_info():
     now = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
     st.sidebar.markdown(f"**Última actualización:** {now}")
 
+def show_perf_panel():
+    """Muestra el panel de tiempos por etapa en el sidebar"""
+    st.sidebar.markdown("---")
+    instrumentacion.mostrar_panel()
+    cambios.mostrar_panel(utils.load_all_data(registrar=False))
+
+def show_quality_panel():
+    """Muestra el panel de calidad de los datos en el sidebar"""
+    # Las hojas de la fecha elegida ya están en la caché de la página; se leen sin volver a registrar la carga
+    data_dict = utils.load_all_data(registrar=False)
+    calidad.mostrar_panel(data_dict)
+
 # Función principal
 def main():
     """Función principal que ejecuta la aplicación"""
@@ -42,12 +65,26 @@ def main():
     # Menú de navegación con todos los módulos
     menu = st.sidebar.radio(
         "Navegación",
-        ["📊 Indicadores de Contrato", "📋 Áreas por Tipo de Contrato", "👥 Personal Activo", "🚪 Motivos de Retiro"]
+        ["📊 Indicadores de Contrato", "📋 Áreas por Tipo de Contrato", "👥 Personal Activo", "🚪 Motivos de Retiro",
+         "📈 Evolución de Personal", "⏳ Antigüedad",
+         "🔁 Retención por Cohorte", "🔍 Buscar Empleado"]
     )
     
     # Mostrar información en el sidebar
     show_info()
     
+    # Motor de las agregaciones (pandas en memoria o SQLite embebido)
+    almacen_sql.selector_motor()
+    
+    # Fecha de los datos (actuales o una instantánea del histórico)
+    historico.selector_fecha()
+    
+    # Exponer las métricas del proceso en un endpoint local (se inicia una sola vez)
+    metricas.iniciar_servidor()
+    
+    # Medir los tiempos de la página durante este rerun
+    instrumentacion.iniciar_ejecucion(menu)
+    
     # Mostrar el módulo seleccionado
     if menu == "📊 Indicadores de Contrato":
         indicadores.run()
@@ -55,8 +92,27 @@ def main():
         areas_contratos.run()
     elif menu == "👥 Personal Activo":
         personal_activo.run()
+    elif menu == "📈 Evolución de Personal":
+        evolucion.run()
+    elif menu == "⏳ Antigüedad":
+        antiguedad.run()
+    elif menu == "🔁 Retención por Cohorte":
+        retencion.run()
+    elif menu == "🔍 Buscar Empleado":
+        empleados.run()
     else:
         retiros.run()
+    
+    duracion = instrumentacion.finalizar_ejecucion()
+    if duracion is not None:
+        metricas.PAGINA_DURACION.observar(duracion, pagina=menu)
+    metricas.volcar_archivo()
+    
+    # Registros con fechas inválidas o novedades inconsistentes
+    show_quality_panel()
+    
+    # Panel opcional con los tiempos del último rerun
+    show_perf_panel()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,7 +1,17 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime, timedelta
-from utils import load_all_data
+from utils import load_all_data, version_datos
+from esquema import obtener_esquemas, mostrar_diagnostico
+from comparacion import selector_periodo_comparacion, obtener_comparacion, mostrar_comparacion, filas_en_rango
+from rollup import rollup_cacheado, mostrar_desglose
+from reportes import obtener_reporte
+from exportacion import mostrar_exportacion
+from visor import mostrar_visor
+from identidad import selector_conteo, mostrar_resumen_identidad, personas_de
+from registros import obtener_registros, ETIQUETAS
+import instrumentacion
+from instrumentacion import medir
 
 def run():
     """
@@ -9,6 +19,7 @@ def run():
     por Área y Tipo de Contrato para Manipuladoras, y una tabla resumen global.
     """
     # Cargar datos
+    instrumentacion.etapa('carga')
     with st.spinner("Cargando datos..."):
         data_dict = load_all_data()
         
@@ -22,6 +33,7 @@ def run():
         st.warning("No se encontraron datos en la tabla Aprendices. Por favor, verifica la hoja de Google Sheets.")
     
     # ---------- FILTROS EN LA BARRA LATERAL ----------
+    instrumentacion.etapa('filtros_sidebar')
     st.sidebar.header("Filtros")
     
     # 1. FILTRO DE TIPO DE NOVEDAD (MULTISELECT)
@@ -67,23 +79,7 @@ def run():
     # 2. FILTRO DE FECHAS (Igual que en la primera página)
     st.sidebar.subheader("Rango de Fechas")
     
-    # Preparar las fechas en los DataFrames para el filtrado
-    for df_name, df in [('manipuladoras', manipuladoras_df), ('planta', planta_df), ('aprendices', aprendices_df)]:
-        # Fechas de ingreso
-        if 'FECHA DE INGRESO (AAAAMMDD)' in df.columns:
-            df['fecha_ingreso'] = pd.to_datetime(
-                df['FECHA DE INGRESO (AAAAMMDD)'], 
-                format='%Y%m%d', 
-                errors='coerce'
-            )
-        
-        # Fechas de retiro
-        if 'FECHA DE RETIRO (AAAAMMDD)' in df.columns:
-            df['fecha_retiro'] = pd.to_datetime(
-                df['FECHA DE RETIRO (AAAAMMDD)'], 
-                format='%Y%m%d', 
-                errors='coerce'
-            )
+    # Las columnas fecha_ingreso y fecha_retiro ya vienen convertidas por el cargador
     
     # Obtener todas las fechas según el tipo de novedad seleccionado
     fechas = []
@@ -128,246 +124,134 @@ def run():
     fecha_min = pd.Timestamp(date_range[0])
     fecha_max = pd.Timestamp(date_range[1])
     
-    # ---------- APLICAR FILTROS A LOS DATOS ----------
-    # Función para aplicar filtros a cada DataFrame
-    def aplicar_filtros(df):
-        # Crear una copia para no modificar el original
-        df_filtrado = df.copy()
-        
-        # 1. Filtrar por tipo de novedad
-        if 'tipo_novedad' in df_filtrado.columns:
-            df_filtrado = df_filtrado[
-                df_filtrado['tipo_novedad'].isin(tipos_novedad_seleccionados)
-            ]
-        
-        # 2. Filtrar por fechas
-        mask = pd.Series(False, index=df_filtrado.index)
-        
-        # Aplicar filtros según tipo de novedad
-        if any(item in ["ACTIVO", "CASO ESPECIAL"] for item in tipos_novedad_seleccionados):
-            if 'fecha_ingreso' in df_filtrado.columns:
-                mask_ingreso = (
-                    (df_filtrado['fecha_ingreso'] >= fecha_min) & 
-                    (df_filtrado['fecha_ingreso'] <= fecha_max) &
-                    (df_filtrado['tipo_novedad'].isin(['ACTIVO', 'CASO ESPECIAL']))
-                )
-                mask = mask | mask_ingreso
-        
-        if "RETIRADO" in tipos_novedad_seleccionados:
-            if 'fecha_retiro' in df_filtrado.columns:
-                mask_retiro = (
-                    (df_filtrado['fecha_retiro'] >= fecha_min) & 
-                    (df_filtrado['fecha_retiro'] <= fecha_max) &
-                    (df_filtrado['tipo_novedad'] == 'RETIRADO')
-                )
-                mask = mask | mask_retiro
-        
-        # Aplicar la máscara
-        df_filtrado = df_filtrado[mask]
-        
-        return df_filtrado
+    # Periodo opcional para comparar las tablas
+    periodo_comparacion = selector_periodo_comparacion('areas', fecha_min, fecha_max)
     
-    # Aplicar filtros a cada DataFrame
-    manipuladoras_filtradas = aplicar_filtros(manipuladoras_df)
-    planta_filtrada = aplicar_filtros(planta_df)
-    aprendices_filtrados = aplicar_filtros(aprendices_df)
+    # Contar registros o personas distintas (mismo documento en cualquier hoja)
+    distintas = selector_conteo('areas_contratos', data_dict)
+    
+    # ---------- APLICAR FILTROS A LOS DATOS ----------
+    instrumentacion.etapa('filtrado')
+    filas_detalle = filas_en_rango(
+        obtener_registros(data_dict), tipos_novedad_seleccionados, fecha_min, fecha_max
+    )
+    filas_detalle = filas_detalle[filas_detalle['origen'].isin(['Planta', 'Manipuladoras', 'Aprendices'])]
+    registros_por_origen = filas_detalle['origen'].astype(object).value_counts()
     
     # ---------- MOSTRAR INFORMACIÓN DE RESULTADOS ----------
     col1, col2, col3 = st.columns(3)
     with col1:
-        st.info(f"Registros filtrados en Manipuladoras: {len(manipuladoras_filtradas)}")
+        st.info(f"Registros filtrados en Manipuladoras: {registros_por_origen.get('Manipuladoras', 0)}")
     with col2:
-        st.info(f"Registros filtrados en Planta: {len(planta_filtrada)}")
+        st.info(f"Registros filtrados en Planta: {registros_por_origen.get('Planta', 0)}")
     with col3:
-        st.info(f"Registros filtrados en Aprendices: {len(aprendices_filtrados)}")
+        st.info(f"Registros filtrados en Aprendices: {registros_por_origen.get('Aprendices', 0)}")
 
     # ---------- BUSCAR COLUMNAS NECESARIAS ----------
-    def encontrar_columna_por_posicion(df, posicion, nombre_alternativo=None):
-        """Busca una columna por posición o nombre alternativo."""
-        columna = None
-        
-        # 1. Buscar por posición
-        if len(df.columns) > posicion:
-            columna = df.columns[posicion]
-        
-        # 2. Si no se encuentra por posición, buscar por nombre alternativo
-        if columna is None and nombre_alternativo:
-            for nombre in nombre_alternativo:
-                if nombre in df.columns:
-                    columna = nombre
-                    break
-        
-        return columna
-    
-    # Buscar las columnas necesarias
-    planta_contrato_col = encontrar_columna_por_posicion(
-        planta_filtrada, 
-        12,  # Posición M
-        ['TIPO DE CONTRATO', 'Tipo de Contrato', 'TIPO CONTRATO']
-    )
-    
-    manipuladoras_area_col = encontrar_columna_por_posicion(
-        manipuladoras_filtradas, 
-        5,  # Posición F
-        ['AREA', 'ÁREA', 'Area', 'Área']
-    )
-    
-    manipuladoras_contrato_col = encontrar_columna_por_posicion(
-        manipuladoras_filtradas, 
-        19,  # Posición T
-        ['TIPO DE CONTRATO', 'Tipo de Contrato', 'TIPO CONTRATO']
-    )
-    
-    aprendices_contrato_col = encontrar_columna_por_posicion(
-        aprendices_filtrados, 
-        39,  # Posición An
-        ['TIPO DE CONTRATO', 'Tipo de Contrato', 'TIPO CONTRATO']
-    )
+    instrumentacion.etapa('resolucion_columnas')
+    # Resolver las columnas por campo lógico (una vez por versión del encabezado)
+    esquemas = obtener_esquemas(data_dict)
+    planta_contrato_col = esquemas['planta']['contrato']
+    manipuladoras_area_col = esquemas['manipuladoras']['area']
+    manipuladoras_contrato_col = esquemas['manipuladoras']['contrato']
+    aprendices_contrato_col = esquemas['aprendices']['contrato']
     
     # Mostrar advertencia si no se encuentran las columnas
-    missing_cols = []
-    if not planta_contrato_col:
-        missing_cols.append("Tipo de Contrato (Planta, posición M)")
-    if not manipuladoras_area_col:
-        missing_cols.append("Área (Manipuladoras, posición F)")
-    if not manipuladoras_contrato_col:
-        missing_cols.append("Tipo de Contrato (Manipuladoras, posición T)")
-    if not aprendices_contrato_col:
-        missing_cols.append("Tipo de Contrato (Aprendices, posición An)")
-    
-    if missing_cols:
-        st.warning(f"No se encontraron las siguientes columnas: {', '.join(missing_cols)}")
-        st.info("Por favor, verifica los nombres o posiciones de las columnas en los datos.")
-    
-    # ---------- FUNCIONES PARA CREAR TABLAS ----------
-    def crear_tabla_por_contrato(df, col_contrato, titulo, origen):
-        """Crea una tabla de conteo por tipo de contrato."""
-        st.header(titulo)
-        
-        if col_contrato and not df.empty:
-            # Crear columna normalizada para agrupar
-            df['contrato_normalizado'] = df[col_contrato]
-            
-            # Contar registros por tipo de contrato
-            conteo = df['contrato_normalizado'].value_counts().reset_index()
-            conteo.columns = ['Tipo de Contrato', 'Total']
-            conteo['Origen'] = origen
-            
-            # Ordenar por tipo de contrato
-            conteo = conteo.sort_values('Tipo de Contrato')
-            
-            # Mostrar la tabla
-            if len(conteo) > 0:
-                st.dataframe(conteo, use_container_width=True)
-                return conteo
-            else:
-                st.warning(f"No hay datos disponibles de {origen} con los filtros seleccionados.")
-                return pd.DataFrame(columns=['Tipo de Contrato', 'Total', 'Origen'])
-        else:
-            st.warning(f"No hay datos disponibles de {origen} o falta la columna de tipo de contrato.")
-            return pd.DataFrame(columns=['Tipo de Contrato', 'Total', 'Origen'])
+    mostrar_diagnostico(esquemas, {
+        'planta': ['contrato'],
+        'manipuladoras': ['area', 'contrato'],
+        'aprendices': ['contrato'],
+    })
+    
+    # ---------- TABLAS DEL REPORTE ----------
+    # Todas las tablas de la página salen de un solo conteo de los registros filtrados
+    instrumentacion.etapa('agregacion')
+    tablas = obtener_reporte(
+        data_dict, 'areas_contratos', tipos_novedad_seleccionados, fecha_min, fecha_max, distintas=distintas
+    )
+    if distintas:
+        mostrar_resumen_identidad(data_dict)
     
-    def crear_tabla_por_area_contrato(df, col_area, col_contrato, titulo, origen):
-        """Crea una tabla de conteo por área y tipo de contrato."""
+    # Función para mostrar una tabla del reporte con los mensajes de la página
+    def mostrar_tabla(tabla, titulo, origen, columnas_disponibles, faltante):
         st.header(titulo)
-        
-        if col_area and col_contrato and not df.empty:
-            # Crear columnas normalizadas para agrupar
-            df['area_normalizada'] = df[col_area]
-            df['contrato_normalizado'] = df[col_contrato]
-            
-            # Contar registros por área y tipo de contrato
-            conteo = df.groupby(['area_normalizada', 'contrato_normalizado']).size().reset_index()
-            conteo.columns = ['Área', 'Tipo de Contrato', 'Total']
-            conteo['Origen'] = origen
-            
-            # Ordenar por Área y luego por Tipo de Contrato
-            conteo = conteo.sort_values(['Área', 'Tipo de Contrato'])
-            
-            # Mostrar la tabla
-            if len(conteo) > 0:
-                st.dataframe(conteo, use_container_width=True)
-                
-                # También crear un conteo solo por tipo de contrato para el resumen
-                resumen = conteo.groupby('Tipo de Contrato')['Total'].sum().reset_index()
-                resumen['Origen'] = origen
-                return resumen
-            else:
-                st.warning(f"No hay datos disponibles de {origen} con los filtros seleccionados.")
-                return pd.DataFrame(columns=['Tipo de Contrato', 'Total', 'Origen'])
+        if not columnas_disponibles or registros_por_origen.get(origen, 0) == 0:
+            st.warning(f"No hay datos disponibles de {origen} o {faltante}.")
+        elif tabla.empty:
+            st.warning(f"No hay datos disponibles de {origen} con los filtros seleccionados.")
         else:
-            st.warning(f"No hay datos disponibles de {origen} o faltan las columnas necesarias.")
-            return pd.DataFrame(columns=['Tipo de Contrato', 'Total', 'Origen'])
+            with medir('render', filas=len(tabla)):
+                st.dataframe(tabla, use_container_width=True)
     
     # ---------- TABLA 1: PLANTA POR TIPO DE CONTRATO ----------
-    conteo_planta = crear_tabla_por_contrato(
-        planta_filtrada, 
+    mostrar_tabla(
+        tablas['planta'],
+        "Conteo por Tipo de Contrato (Planta)",
+        "Planta",
         planta_contrato_col,
-        "Conteo por Tipo de Contrato (Planta)", 
-        "Planta"
+        "falta la columna de tipo de contrato"
     )
     
     # ---------- TABLA 2: MANIPULADORAS POR ÁREA Y TIPO DE CONTRATO ----------
-    conteo_manipuladoras = crear_tabla_por_area_contrato(
-        manipuladoras_filtradas,
-        manipuladoras_area_col,
-        manipuladoras_contrato_col,
+    mostrar_tabla(
+        tablas['manipuladoras'],
         "Conteo por Área y Tipo de Contrato (Manipuladoras)",
-        "Manipuladoras"
+        "Manipuladoras",
+        manipuladoras_area_col and manipuladoras_contrato_col,
+        "faltan las columnas necesarias"
     )
     
     # ---------- TABLA 3: APRENDICES POR TIPO DE CONTRATO ----------
-    conteo_aprendices = crear_tabla_por_contrato(
-        aprendices_filtrados, 
+    mostrar_tabla(
+        tablas['aprendices'],
+        "Conteo por Tipo de Contrato (Aprendices)",
+        "Aprendices",
         aprendices_contrato_col,
-        "Conteo por Tipo de Contrato (Aprendices)", 
-        "Aprendices"
+        "falta la columna de tipo de contrato"
     )
     
     # ---------- TABLA RESUMEN: TODAS LAS FUENTES ----------
     st.header("Tabla Resumen: Todos los Tipos de Contrato")
     
-    # Combinar todos los conteos
-    conteos = [conteo_planta, conteo_manipuladoras, conteo_aprendices]
-    conteos = [c for c in conteos if not c.empty]
-    
-    if conteos:
-        # Concatenar todos los conteos
-        todos_conteos = pd.concat(conteos, ignore_index=True)
-        
-        # Crear pivote para mostrar una tabla más clara
-        pivote = pd.pivot_table(
-            todos_conteos, 
-            values='Total', 
-            index='Tipo de Contrato', 
-            columns='Origen', 
-            aggfunc='sum', 
-            fill_value=0
-        ).reset_index()
-        
-        # Asegurarse de que todas las columnas de origen existan
-        for origen in ['Planta', 'Manipuladoras', 'Aprendices']:
-            if origen not in pivote.columns:
-                pivote[origen] = 0
-        
-        # Añadir columna de total
-        pivote['Total General'] = pivote[['Planta', 'Manipuladoras', 'Aprendices']].sum(axis=1)
-        
-        # Ordenar por tipo de contrato
-        pivote = pivote.sort_values('Tipo de Contrato')
-        
-        # Añadir una fila de totales
-        totales = pd.DataFrame({
-            'Tipo de Contrato': ['TOTAL'],
-            'Planta': [pivote['Planta'].sum()],
-            'Manipuladoras': [pivote['Manipuladoras'].sum()],
-            'Aprendices': [pivote['Aprendices'].sum()],
-            'Total General': [pivote['Total General'].sum()]
-        })
-        
-        pivote = pd.concat([pivote, totales], ignore_index=True)
-        
-        # Mostrar la tabla resumen
-        st.dataframe(pivote, use_container_width=True)
+    pivote = tablas['resumen']
+    if not pivote.empty:
+        # Mostrar la tabla resumen (incluye la fila TOTAL)
+        with medir('render', filas=len(pivote)):
+            st.dataframe(pivote, use_container_width=True)
     else:
-        st.warning("No hay datos disponibles para crear la tabla resumen.")
\ No newline at end of file
+        st.warning("No hay datos disponibles para crear la tabla resumen.")
+    
+    # ---------- REGISTROS DETALLADOS Y EXPORTACIÓN ----------
+    mostrar_visor(data_dict, filas_detalle, 'areas')
+    mostrar_exportacion(
+        data_dict, filas_detalle, ['area', 'contrato'], 'areas'
+    )
+    
+    # ---------- COMPARACIÓN CON OTRO PERIODO ----------
+    if periodo_comparacion:
+        instrumentacion.etapa('comparacion')
+        st.header("Comparación de Periodos")
+        periodo_actual = (fecha_min, fecha_max)
+        comparacion_resumen = obtener_comparacion(
+            data_dict, ['Planta', 'Manipuladoras', 'Aprendices'], ['origen', 'contrato'],
+            tipos_novedad_seleccionados, periodo_actual, periodo_comparacion, distintas=distintas
+        )
+        mostrar_comparacion(comparacion_resumen, "Tipos de Contrato por Origen", periodo_actual, periodo_comparacion)
+        comparacion_areas = obtener_comparacion(
+            data_dict, ['Manipuladoras'], ['area', 'contrato'],
+            tipos_novedad_seleccionados, periodo_actual, periodo_comparacion, distintas=distintas
+        )
+        mostrar_comparacion(comparacion_areas, "Área y Tipo de Contrato (Manipuladoras)", periodo_actual, periodo_comparacion)
+    
+    # ---------- DESGLOSE JERÁRQUICO ----------
+    st.header("Desglose por Origen, Área y Tipo de Contrato")
+    niveles = ['origen', 'area', 'contrato']
+    datos_jerarquia = filas_detalle[niveles].astype(object)
+    if distintas:
+        # Cada nivel cuenta personas distintas (una persona puede estar en varios grupos)
+        datos_jerarquia['persona'] = personas_de(data_dict, filas_detalle)
+    filtros = (tuple(sorted(tipos_novedad_seleccionados)), fecha_min.isoformat(), fecha_max.isoformat())
+    jerarquia = rollup_cacheado(
+        version_datos(data_dict), filtros, tuple(niveles), datos_jerarquia, 'persona' if distintas else None
+    )
+    mostrar_desglose(jerarquia, niveles, ETIQUETAS, 'areas')
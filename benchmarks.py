@@ -0,0 +1,442 @@
+import argparse
+import random
+import time
+
+import numpy as np
+import pandas as pd
+
+import utils
+
+# ---------- DATOS SINTÉTICOS ----------
+# Encabezados con las columnas que usan las páginas en sus posiciones reales
+ENCABEZADOS = {
+    'Planta': {
+        'columnas': 20,
+        'campos': {
+            1: 'NOMBRE COMPLETO', 2: 'NUMERO DE DOCUMENTO', 5: 'EMPRESA', 10: 'MOTIVO DEL RETIRO',
+            12: 'TIPO DE CONTRATO', 13: 'AREA', 15: 'TIPO DE NOVEDAD (ACTIVO/RETIRADO)',
+            16: 'FECHA DE INGRESO (AAAAMMDD)', 17: 'FECHA DE RETIRO (AAAAMMDD)',
+        },
+    },
+    'Manipuladoras': {
+        'columnas': 24,
+        'campos': {
+            1: 'NOMBRE COMPLETO', 2: 'NUMERO DE DOCUMENTO', 5: 'AREA', 7: 'PROGRAMA AL QUE PERTENECE',
+            17: 'MOTIVO DEL RETIRO', 19: 'TIPO DE CONTRATO', 20: 'TIPO DE NOVEDAD (ACTIVO/RETIRADO)',
+            21: 'FECHA DE INGRESO (AAAAMMDD)', 22: 'FECHA DE RETIRO (AAAAMMDD)',
+        },
+    },
+    'Aprendices': {
+        'columnas': 42,
+        'campos': {
+            1: 'NOMBRE COMPLETO', 2: 'NUMERO DE DOCUMENTO', 5: 'AREA', 10: 'TIPO DE NOVEDAD',
+            11: 'FECHA DE INGRESO', 12: 'FECHA RETIRO', 39: 'TIPO DE CONTRATO',
+        },
+    },
+}
+
+AREAS = ['ADMINISTRATIVA', 'OPERACIONES', 'LOGÍSTICA', 'BUGA CENTRO', 'BUGA NORTE', 'CALI SUR', 'PALMIRA']
+CONTRATOS = ['TERMINO FIJO', 'OBRA LABOR', 'INDEFINIDO', 'APRENDIZAJE']
+PROGRAMAS = ['PAE', 'CDI', 'HOGARES COMUNITARIOS', 'DESAYUNOS']
+EMPRESAS = ['EMPRESA A', 'EMPRESA B', 'EMPRESA C']
+NOMBRES = ['JOSÉ', 'MARÍA', 'ANA', 'LUIS', 'CARLOS', 'DIANA', 'JORGE', 'PAOLA']
+APELLIDOS = ['PÉREZ', 'GÓMEZ', 'NÚÑEZ', 'MARTÍNEZ', 'RUIZ', 'CASTAÑO', 'OSORIO', 'VALENCIA']
+
+
+def generar_valores(hoja, filas, semilla=0, motivos=25):
+    """
+    Genera la respuesta 'values' de la API de Sheets para una hoja sintética:
+    lista de filas de texto, con las celdas vacías finales recortadas como hace la API.
+    """
+    rnd = random.Random(f"{hoja}-{semilla}")
+    definicion = ENCABEZADOS[hoja]
+    campos = definicion['campos']
+    encabezado = [campos.get(i, f'COLUMNA {i + 1}') for i in range(definicion['columnas'])]
+    lista_motivos = [f'MOTIVO {i:02d}' for i in range(motivos)]
+
+    valores = [encabezado]
+    for i in range(filas):
+        fila = [f'dato {i}-{c}' for c in range(definicion['columnas'])]
+        novedad = rnd.choices(['ACTIVO', 'RETIRADO', 'CASO ESPECIAL'], weights=[6, 3, 1])[0]
+        ingreso = pd.Timestamp('2015-01-01') + pd.Timedelta(days=rnd.randint(0, 3600))
+        retiro = ingreso + pd.Timedelta(days=rnd.randint(15, 1500)) if novedad == 'RETIRADO' else None
+        for posicion, nombre in campos.items():
+            if nombre == 'NOMBRE COMPLETO':
+                valor = f"{rnd.choice(NOMBRES)} {rnd.choice(APELLIDOS)} {rnd.choice(APELLIDOS)}"
+            elif nombre == 'NUMERO DE DOCUMENTO':
+                valor = str(1000000 + rnd.randint(0, filas * 2))
+            elif nombre == 'EMPRESA':
+                valor = rnd.choice(EMPRESAS)
+            elif nombre.startswith('MOTIVO'):
+                # Distribución de cola larga: pocos motivos frecuentes y muchos raros
+                valor = lista_motivos[min(int(rnd.expovariate(0.25)), motivos - 1)] if retiro is not None else ''
+            elif nombre == 'TIPO DE CONTRATO':
+                valor = rnd.choice(CONTRATOS)
+            elif nombre == 'AREA':
+                valor = rnd.choice(AREAS)
+            elif nombre.startswith('PROGRAMA'):
+                valor = rnd.choice(PROGRAMAS)
+            elif nombre.startswith('TIPO DE NOVEDAD'):
+                valor = novedad
+            elif nombre.startswith('FECHA DE INGRESO'):
+                valor = ingreso.strftime('%Y%m%d')
+            else:
+                valor = retiro.strftime('%Y%m%d') if retiro is not None else ''
+            fila[posicion] = valor
+        while fila and fila[-1] == '':
+            fila.pop()
+        valores.append(fila)
+    return valores
+
+
+class ServicioSintetico:
+    """
+    Imita la cadena service.spreadsheets().values().get(...).execute() con datos sintéticos,
+    y service.spreadsheets().get(ranges=..., includeGridData=True) con el texto de cada
+    celda y el número de las celdas numéricas (los números llegan como números, como en la API).
+    """
+
+    def __init__(self, filas, semilla=0, motivos=25):
+        self.valores = {
+            hoja: generar_valores(hoja, n, semilla, motivos)
+            for hoja, n in filas.items()
+        }
+
+    def spreadsheets(self):
+        return self
+
+    def values(self):
+        return self
+
+    def get(self, spreadsheetId, range=None, ranges=None, **kwargs):
+        if ranges is not None:
+            # spreadsheets().get: datos de la grilla del primer rango
+            self._respuesta = {'sheets': [{'data': [{'rowData': self._grilla(ranges[0])}]}]}
+        else:
+            # Copia de las filas: cada respuesta de la API es una lista nueva
+            self._respuesta = {'values': [list(fila) for fila in self.valores[range.split('!')[0]]]}
+        return self
+
+    def _grilla(self, rango):
+        filas = self.valores[rango.split('!')[0]]
+        grilla = [{'values': [{'formattedValue': v} for v in filas[0]]}]
+        for fila in filas[1:]:
+            grilla.append({'values': [
+                {} if v == '' else
+                {'formattedValue': v, 'effectiveValue': {'numberValue': int(v)}} if v.isdigit() else
+                {'formattedValue': v}
+                for v in fila
+            ]})
+        return grilla
+
+    def execute(self):
+        return self._respuesta
+
+
+def cargar_datos_sinteticos(filas=10000, semilla=0, motivos=25):
+    """
+    Retorna un data_dict como el de utils.load_all_data() pero con datos sintéticos,
+    pasando por el mismo cargador (_cargar_hoja) sin la caché de Streamlit.
+    """
+    servicio = ServicioSintetico(
+        {'Planta': filas // 4, 'Manipuladoras': filas // 2, 'Aprendices': filas // 4},
+        semilla,
+        motivos
+    )
+    original = utils.create_sheets_service
+    utils.create_sheets_service = lambda: servicio
+    try:
+        return {
+            'planta': _cargar_hoja_sintetica('Planta'),
+            'manipuladoras': _cargar_hoja_sintetica('Manipuladoras'),
+            'aprendices': _cargar_hoja_sintetica('Aprendices'),
+        }
+    finally:
+        utils.create_sheets_service = original
+
+
+# Argumentos de utils._cargar_hoja para cada hoja sintética
+ARGUMENTOS_CARGA = {
+    'Planta': ('Planta!A1:Z', 'TIPO DE NOVEDAD (ACTIVO/RETIRADO)', 'FECHA DE INGRESO (AAAAMMDD)',
+               'FECHA DE RETIRO (AAAAMMDD)', 'planta_backup.csv'),
+    'Manipuladoras': ('Manipuladoras!A1:Z', 'TIPO DE NOVEDAD (ACTIVO/RETIRADO)', 'FECHA DE INGRESO (AAAAMMDD)',
+                      'FECHA DE RETIRO (AAAAMMDD)', 'manipuladoras_backup.csv'),
+    'Aprendices': ('Aprendices!A1:AZ', 'TIPO DE NOVEDAD', 'FECHA DE INGRESO', 'FECHA RETIRO',
+                   'aprendices_backup.csv'),
+}
+
+
+def _cargar_hoja_sintetica(hoja):
+    return utils._cargar_hoja(hoja, *ARGUMENTOS_CARGA[hoja])
+
+
+def medir_tiempo(funcion, repeticiones):
+    """Ejecuta la función varias veces y retorna (mediana en ms, último resultado)."""
+    tiempos = []
+    resultado = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return float(np.median(tiempos)), resultado
+
+
+# ---------- BENCHMARKS ----------
+def bench_figuras(args):
+    """Construcción y tamaño serializado de las figuras de motivos de retiro."""
+    import retiros
+
+    motivos = [f'MOTIVO {i:03d}' for i in range(args.motivos)]
+    rnd = np.random.default_rng(args.semilla)
+    planta = rnd.zipf(1.6, args.motivos) % 500
+    manipuladoras = rnd.zipf(1.6, args.motivos) % 500
+    pivot_motivos = pd.DataFrame({
+        'Motivo de Retiro': motivos,
+        'Manipuladoras': manipuladoras,
+        'Planta': planta,
+        'Total General': planta + manipuladoras,
+    }).sort_values('Total General', ascending=False)
+
+    resultados = []
+    for top_n in (0, 15):
+        ms, figuras = medir_tiempo(lambda: retiros.construir_figuras_motivos(pivot_motivos, top_n), args.repeticiones)
+        tamano = sum(len(fig.to_json()) for fig in figuras)
+        resultados.append({'escenario': f'sin caché, top_n={top_n}', 'ms': ms, 'bytes_json': tamano})
+
+        filtros = (('RETIRADO',), '2024-01-01', '2024-12-31')
+        retiros.figuras_motivos_cacheadas('bench', filtros, top_n, pivot_motivos)
+        ms, figuras = medir_tiempo(
+            lambda: retiros.figuras_motivos_cacheadas('bench', filtros, top_n, pivot_motivos),
+            args.repeticiones
+        )
+        resultados.append({'escenario': f'caché, top_n={top_n}', 'ms': ms, 'bytes_json': tamano})
+    return pd.DataFrame(resultados)
+
+
+def bench_sql(args):
+    """
+    Conteos con pandas sobre la tabla de registros, con pandas sobre el conteo mantenido
+    (el camino de contar() en producción) y con SQLite embebido: las tablas deben ser idénticas.
+    """
+    import almacen_sql
+    import cambios
+    import registros
+
+    data_dict = cargar_datos_sinteticos(args.filas, args.semilla, args.motivos)
+    tabla = registros.unificar(data_dict)
+    ms_carga, almacen = medir_tiempo(lambda: almacen_sql.AlmacenSQL(tabla), 1)
+    ms_mantenido, conteo = medir_tiempo(lambda: cambios.ConteoMantenido(tabla).vista(), 1)
+
+    consultas = [
+        (['contrato'], ['Planta', 'Manipuladoras'], ['ACTIVO', 'RETIRADO', 'CASO ESPECIAL']),
+        (['empresa', 'motivo'], ['Planta'], ['RETIRADO']),
+        (['programa', 'motivo'], ['Manipuladoras'], ['RETIRADO']),
+        (['origen', 'area', 'contrato'], ['Planta', 'Manipuladoras', 'Aprendices'], ['ACTIVO']),
+    ]
+    fecha_min, fecha_max = pd.Timestamp('2017-01-01'), pd.Timestamp('2022-12-31')
+
+    resultados = [
+        {'consulta': 'construir almacén SQLite', 'ms_pandas': np.nan, 'ms_mantenido': np.nan,
+         'ms_sqlite': ms_carga, 'filas': len(tabla), 'identicas': True},
+        {'consulta': 'construir conteo mantenido', 'ms_pandas': np.nan, 'ms_mantenido': ms_mantenido,
+         'ms_sqlite': np.nan, 'filas': len(conteo), 'identicas': True},
+    ]
+    for por, origenes, novedades in consultas:
+        for incluir_nulos in (False, True):
+            ms_pandas, con_pandas = medir_tiempo(
+                lambda: almacen_sql.contar_pandas(tabla, por, origenes, novedades, fecha_min, fecha_max, incluir_nulos),
+                args.repeticiones
+            )
+            ms_conteo, con_conteo = medir_tiempo(
+                lambda: almacen_sql.contar_pandas(conteo, por, origenes, novedades, fecha_min, fecha_max, incluir_nulos),
+                args.repeticiones
+            )
+            ms_sqlite, con_sqlite = medir_tiempo(
+                lambda: almacen_sql.contar_sql(almacen, por, origenes, novedades, fecha_min, fecha_max, incluir_nulos),
+                args.repeticiones
+            )
+            resultados.append({
+                'consulta': f"{' x '.join(por)} ({', '.join(novedades)})" + (' con vacíos' if incluir_nulos else ''),
+                'ms_pandas': ms_pandas,
+                'ms_mantenido': ms_conteo,
+                'ms_sqlite': ms_sqlite,
+                'filas': len(con_sqlite),
+                'identicas': con_pandas.equals(con_sqlite) and con_conteo.equals(con_sqlite),
+            })
+    return pd.DataFrame(resultados)
+
+
+def bench_exportacion(args):
+    """Memoria máxima al exportar registros: to_excel / to_csv frente a la escritura por bloques."""
+    import io
+    import tempfile
+    import tracemalloc
+
+    import exportacion
+
+    def pico(funcion):
+        tracemalloc.start()
+        inicio = time.perf_counter()
+        funcion()
+        ms = (time.perf_counter() - inicio) * 1000
+        _, maximo = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return ms, maximo / 1024 / 1024
+
+    def escribir_temporal(escribir):
+        with tempfile.TemporaryFile() as archivo:
+            escribir(archivo)
+
+    resultados = []
+    for filas in (args.filas // 4, args.filas):
+        df = cargar_datos_sinteticos(filas * 2, args.semilla, args.motivos)['manipuladoras']
+        indices = df.index.to_numpy()
+        columnas = exportacion.columnas_originales(df)
+        escenarios = {
+            'DataFrame.to_excel': lambda: df[columnas].to_excel(io.BytesIO(), index=False),
+            'libro de solo escritura': lambda: exportacion.escribir_excel(io.BytesIO(), [('Hoja', df, indices, columnas)]),
+            # Los CSV se escriben a un archivo temporal (como preparar_archivo): se mide la memoria de la conversión
+            'DataFrame.to_csv': lambda: escribir_temporal(lambda archivo: df[columnas].to_csv(archivo, index=False)),
+            'CSV por bloques': lambda: escribir_temporal(
+                lambda archivo: exportacion.escribir_csv(archivo, [('Hoja', df, indices, columnas)])
+            ),
+        }
+        for escenario, funcion in escenarios.items():
+            ms, mb = pico(funcion)
+            resultados.append({'escenario': escenario, 'filas': len(df), 'ms': ms, 'mb_pico': mb})
+    return pd.DataFrame(resultados)
+
+
+def bench_busqueda(args):
+    """Construcción del índice de búsqueda y consultas por prefijo frente a un recorrido de los textos."""
+    import busqueda
+    import registros
+
+    data_dict = cargar_datos_sinteticos(args.filas, args.semilla, args.motivos)
+    tabla = registros.unificar(data_dict)
+    textos = busqueda.textos_busqueda(data_dict, tabla)
+    ms_indice, indice = medir_tiempo(lambda: busqueda.IndiceBusqueda(textos), 1)
+    completo = (textos['nombre'].fillna('') + ' ' + textos['documento'].fillna('')).to_numpy(dtype=str)
+    normalizado = pd.Series(completo).str.normalize('NFKD').str.replace('[\u0300-\u036f]', '', regex=True).str.upper()
+
+    resultados = [{'consulta': 'construir índice', 'ms_indice': ms_indice, 'ms_recorrido': np.nan, 'registros': len(tabla)}]
+    for consulta in ['maria', 'mar gom', 'núñez jos', '1000']:
+        ms, encontrados = medir_tiempo(lambda: indice.buscar(consulta), args.repeticiones)
+        terminos = busqueda.tokenizar(pd.Series([consulta])).iloc[0]
+        # Recorrido: buscar cada término como inicio de palabra en todos los textos
+        patron = ''.join(f'(?=.*\\b{t})' for t in terminos)
+        ms_recorrido, _ = medir_tiempo(lambda: normalizado.str.contains(patron, regex=True), args.repeticiones)
+        resultados.append({'consulta': consulta, 'ms_indice': ms, 'ms_recorrido': ms_recorrido, 'registros': len(encontrados)})
+    return pd.DataFrame(resultados)
+
+
+def bench_canonico(args):
+    """Canonización de categorías: por valor distinto (primera carga y refresco memoizado) frente a fila por fila."""
+    import canonico
+    from esquema import normalizar_encabezado
+
+    rng = random.Random(args.semilla)
+    variantes = [
+        lambda v: v, str.lower, str.title, lambda v: f' {v}  ',
+        lambda v: v.replace('Í', 'I').replace('É', 'E').replace('Ó', 'O'),
+    ]
+    valores = AREAS + CONTRATOS + PROGRAMAS
+    serie = pd.Series([rng.choice(variantes)(rng.choice(valores)) for _ in range(args.filas)])
+
+    canonico.limpiar_memo()
+    ms_primera, resultado = medir_tiempo(lambda: canonico.canonizar(serie, 'area'), 1)
+    ms_memo, _ = medir_tiempo(lambda: canonico.canonizar(serie, 'area'), args.repeticiones)
+    ms_filas, _ = medir_tiempo(lambda: serie.map(normalizar_encabezado), args.repeticiones)
+    return pd.DataFrame([
+        {'escenario': 'valores distintos (primera vez)', 'ms': ms_primera},
+        {'escenario': 'valores distintos (memoizado)', 'ms': ms_memo},
+        {'escenario': 'fila por fila', 'ms': ms_filas},
+    ]).assign(filas=len(serie), originales=serie.nunique(), canonicos=resultado.nunique())
+
+
+def bench_conversion(args):
+    """Respuesta de la API a DataFrame: lista de filas + replace + to_datetime frente a conversion.convertir."""
+    import conversion
+
+    def ruta_anterior(values, novedad, ingreso, retiro):
+        df = pd.DataFrame(values[1:], columns=values[0])
+        df = df.replace('', pd.NA).dropna(how='all')
+        df['tipo_novedad'] = df[novedad]
+        df['fecha_ingreso'] = pd.to_datetime(df[ingreso], format='%Y%m%d', errors='coerce')
+        df['fecha_retiro'] = pd.to_datetime(df[retiro], format='%Y%m%d', errors='coerce')
+        return df
+
+    resultados = []
+    for hoja, (_, novedad, ingreso, retiro, _) in ARGUMENTOS_CARGA.items():
+        values = generar_valores(hoja, args.filas, args.semilla, args.motivos)
+        derivadas = {
+            'tipo_novedad': (novedad, conversion.DIMENSION),
+            'fecha_ingreso': (ingreso, conversion.FECHA),
+            'fecha_retiro': (retiro, conversion.FECHA),
+        }
+        ms_anterior, anterior = medir_tiempo(lambda: ruta_anterior(values, novedad, ingreso, retiro), args.repeticiones)
+        ms_nueva, nueva = medir_tiempo(lambda: conversion.convertir(values, derivadas), args.repeticiones)
+        # Mismos valores y nulos (los tipos de las columnas pueden diferir según la versión de pandas)
+        iguales = anterior.astype(object).where(anterior.notna(), None).equals(nueva.astype(object).where(nueva.notna(), None))
+        resultados.append({
+            'hoja': hoja, 'filas': len(values) - 1, 'columnas': len(values[0]),
+            'ms_anterior': ms_anterior, 'ms_convertidor': ms_nueva, 'iguales': iguales,
+        })
+    return pd.DataFrame(resultados)
+
+
+def bench_fechas(args):
+    """Fechas de la hoja a datetime64: to_datetime con formato AAAAMMDD frente a conversion.convertir_fechas."""
+    import conversion
+
+    rnd = np.random.default_rng(args.semilla)
+    dias = rnd.integers(0, 365 * 30, args.filas)
+    fechas = np.datetime64('1995-01-01') + dias
+    textos = pd.Series(pd.DatetimeIndex(fechas).strftime('%Y%m%d'), dtype=object).to_numpy()
+    enteros = np.array([int(t) for t in textos], dtype=object)
+    seriales = np.array((fechas - conversion.ORIGEN_SERIAL).astype(np.int64).tolist(), dtype=object)
+
+    ms_texto, esperado = medir_tiempo(
+        lambda: pd.to_datetime(pd.Series(textos), format='%Y%m%d', errors='coerce').to_numpy(), args.repeticiones
+    )
+    resultados = [{'valores': 'texto AAAAMMDD', 'metodo': 'to_datetime', 'ms': ms_texto, 'iguales': True}]
+    for nombre, valores in [('texto AAAAMMDD', textos), ('entero AAAAMMDD', enteros), ('número de serie', seriales)]:
+        ms, resultado = medir_tiempo(lambda: conversion.convertir_fechas(valores), args.repeticiones)
+        resultados.append({
+            'valores': nombre, 'metodo': 'convertir_fechas', 'ms': ms,
+            'iguales': bool(np.array_equal(resultado, esperado.astype('datetime64[ns]'))),
+        })
+    return pd.DataFrame(resultados).assign(filas=args.filas)
+
+
+BENCHMARKS = {
+    'figuras': bench_figuras,
+    'sql': bench_sql,
+    'exportacion': bench_exportacion,
+    'busqueda': bench_busqueda,
+    'canonico': bench_canonico,
+    'conversion': bench_conversion,
+    'fechas': bench_fechas,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks del dashboard con datos sintéticos.")
+    parser.add_argument('benchmarks', nargs='*', help=f"Benchmarks a ejecutar ({', '.join(BENCHMARKS)}); por defecto todos.")
+    parser.add_argument('--filas', type=int, default=20000, help="Filas sintéticas en total (todas las hojas).")
+    parser.add_argument('--motivos', type=int, default=120, help="Cantidad de motivos de retiro distintos.")
+    parser.add_argument('--repeticiones', type=int, default=5)
+    parser.add_argument('--semilla', type=int, default=0)
+    args = parser.parse_args()
+
+    desconocidos = set(args.benchmarks) - set(BENCHMARKS)
+    if desconocidos:
+        parser.error(f"Benchmarks desconocidos: {', '.join(sorted(desconocidos))}")
+    
+    for nombre in args.benchmarks or list(BENCHMARKS):
+        print(f"\n== {nombre}: {BENCHMARKS[nombre].__doc__}")
+        print(BENCHMARKS[nombre](args).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
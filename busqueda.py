@@ -0,0 +1,133 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from esquema import obtener_esquema
+from registros import obtener_registros, ORIGENES
+from utils import version_datos
+
+# Campos de la hoja que se indexan para la búsqueda
+CAMPOS_BUSQUEDA = ['nombre', 'documento']
+
+# Cota superior de un prefijo: los términos solo tienen letras A-Z y dígitos
+FIN_PREFIJO = '\uffff'
+
+
+def tokenizar(serie):
+    """
+    Convierte cada texto en su lista de términos: sin tildes (la Ñ queda como N), en
+    mayúsculas, con los separadores de miles de los números eliminados y partido en
+    secuencias de letras o dígitos.
+    """
+    texto = serie.astype('string').str.normalize('NFKD').str.replace('[\u0300-\u036f]', '', regex=True)
+    texto = texto.str.upper().str.replace(r'(?<=\d)[.,\s](?=\d)', '', regex=True)
+    return texto.str.findall(r'[A-Z0-9]+')
+
+
+def textos_busqueda(data_dict, registros):
+    """
+    Retorna un DataFrame alineado con 'registros' (misma posición) con el nombre y el
+    documento de cada registro tomados de su hoja (vacíos si la hoja no tiene la columna).
+    """
+    textos = pd.DataFrame(index=registros.index, columns=CAMPOS_BUSQUEDA, dtype=object)
+    for hoja, origen in ORIGENES.items():
+        df = data_dict.get(hoja)
+        if df is None or df.empty:
+            continue
+        esquema = obtener_esquema(hoja, df)
+        posiciones = np.flatnonzero((registros['origen'] == origen).to_numpy())
+        etiquetas = registros['indice_origen'].to_numpy()[posiciones]
+        for campo in CAMPOS_BUSQUEDA:
+            columna = esquema[campo]
+            if columna:
+                textos.iloc[posiciones, textos.columns.get_loc(campo)] = df.loc[etiquetas, columna].to_numpy()
+    return textos
+
+
+class IndiceBusqueda:
+    """
+    Índice invertido de los términos del nombre y del documento de cada registro.
+
+    Los términos distintos se guardan ordenados y las posiciones de los registros de cada
+    término quedan contiguas (formato CSR). Todos los términos que empiezan por un prefijo
+    forman un rango del arreglo ordenado, así que sus registros son un solo tramo contiguo
+    de las posiciones: una búsqueda por prefijo son dos búsquedas binarias y un corte.
+    """
+
+    def __init__(self, textos):
+        self.filas_total = len(textos)
+        listas = pd.concat([tokenizar(textos[campo]) for campo in CAMPOS_BUSQUEDA])
+        pares = listas.explode().dropna()
+        if pares.empty:
+            self.terminos = np.array([], dtype=str)
+            self.filas = np.array([], dtype=np.int64)
+            self.inicios = np.zeros(1, dtype=np.int64)
+            return
+
+        self.terminos, termino = np.unique(pares.to_numpy(dtype=str), return_inverse=True)
+        # Pares (término, fila) únicos y ordenados con una sola clave entera
+        clave = np.unique(termino.ravel().astype(np.int64) * self.filas_total + pares.index.to_numpy(np.int64))
+        termino, self.filas = np.divmod(clave, self.filas_total)
+        self.inicios = np.searchsorted(termino, np.arange(len(self.terminos) + 1))
+
+    def filas_prefijo(self, prefijo):
+        """Posiciones (ordenadas, sin repetir) de los registros con algún término que empiece por 'prefijo'."""
+        desde = np.searchsorted(self.terminos, prefijo, side='left')
+        hasta = np.searchsorted(self.terminos, prefijo + FIN_PREFIJO, side='left')
+        return np.unique(self.filas[self.inicios[desde]:self.inicios[hasta]])
+
+    def buscar(self, consulta):
+        """
+        Posiciones de los registros que tienen, para cada término de la consulta, algún
+        término que empiece por él (por ejemplo 'mar gom' encuentra 'MARÍA GÓMEZ').
+        """
+        partes = tokenizar(pd.Series([consulta])).iloc[0]
+        if not isinstance(partes, list) or not partes:
+            return np.array([], dtype=np.int64)
+        # Primero los términos más largos: suelen ser los más selectivos
+        resultado = None
+        for parte in sorted(set(partes), key=len, reverse=True):
+            filas = self.filas_prefijo(parte)
+            resultado = filas if resultado is None else np.intersect1d(resultado, filas, assume_unique=True)
+            if len(resultado) == 0:
+                break
+        return resultado
+
+
+# Índice construido una vez por versión de los datos (compartido entre sesiones)
+@st.cache_resource(ttl=3600, max_entries=2, show_spinner=False)
+def _indice_por_version(version, _data_dict):
+    registros = obtener_registros(_data_dict)
+    textos = textos_busqueda(_data_dict, registros)
+    return IndiceBusqueda(textos), textos
+
+
+def obtener_indice(data_dict):
+    """Retorna (IndiceBusqueda, textos) de la versión actual de los datos."""
+    return _indice_por_version(version_datos(data_dict), data_dict)
+
+
+def buscar_empleados(data_dict, consulta, origenes=None):
+    """
+    Retorna los registros que coinciden con la consulta (nombre o documento), con su
+    origen, nombre, documento, novedad, contrato, área y fechas.
+    """
+    indice, textos = obtener_indice(data_dict)
+    registros = obtener_registros(data_dict)
+    posiciones = indice.buscar(consulta)
+    if origenes is not None:
+        origen = registros['origen'].astype(object).to_numpy()[posiciones]
+        posiciones = posiciones[np.isin(origen, list(origenes))]
+
+    filas = registros.iloc[posiciones]
+    resultado = pd.DataFrame({
+        'Origen': filas['origen'].astype(object).to_numpy(),
+        'Nombre': textos['nombre'].to_numpy()[posiciones],
+        'Documento': textos['documento'].to_numpy()[posiciones],
+        'Tipo de Novedad': filas['tipo_novedad'].astype(object).to_numpy(),
+        'Tipo de Contrato': filas['contrato'].astype(object).to_numpy(),
+        'Área': filas['area'].astype(object).to_numpy(),
+        'Fecha de Ingreso': filas['fecha_ingreso'].dt.date.to_numpy(),
+        'Fecha de Retiro': filas['fecha_retiro'].dt.date.to_numpy(),
+    })
+    return resultado.sort_values(['Nombre', 'Origen'], na_position='last', ignore_index=True)
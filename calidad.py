@@ -0,0 +1,136 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from comparacion import NOVEDADES_INGRESO
+from registros import ORIGENES
+from utils import version_datos
+from instrumentacion import medir
+
+NOVEDADES_CONOCIDAS = NOVEDADES_INGRESO + ['RETIRADO']
+
+# Reglas de validación: nombre -> descripción visible
+REGLAS = {
+    'fecha_ingreso_invalida': 'Fecha de ingreso que no tiene el formato AAAAMMDD',
+    'fecha_retiro_invalida': 'Fecha de retiro que no tiene el formato AAAAMMDD',
+    'sin_fecha_ingreso': 'ACTIVO o CASO ESPECIAL sin fecha de ingreso válida',
+    'retirado_sin_fecha_retiro': 'RETIRADO sin fecha de retiro válida',
+    'activo_con_fecha_retiro': 'ACTIVO o CASO ESPECIAL con fecha de retiro',
+    'retiro_antes_de_ingreso': 'Fecha de retiro anterior a la de ingreso',
+    'novedad_desconocida': 'Tipo de novedad vacío o distinto de ACTIVO, RETIRADO y CASO ESPECIAL',
+}
+
+# Ejemplos que se guardan por hoja y regla
+MAX_EJEMPLOS = 5
+
+# Fila de la hoja del primer registro (la fila 1 es el encabezado)
+PRIMERA_FILA_DATOS = 2
+
+
+def _columna(df, nombre):
+    """Columna del DataFrame o una serie vacía alineada si la hoja no la tiene."""
+    if nombre and nombre in df.columns:
+        return df[nombre]
+    return pd.Series(pd.NA, index=df.index, dtype=object)
+
+
+def validar_hoja(df):
+    """
+    Evalúa todas las reglas sobre una hoja con operaciones por columna.
+    Retorna {regla: máscara booleana (numpy) de los registros que la incumplen}.
+    """
+    originales = df.attrs.get('columnas_origen', {})
+    novedad = _columna(df, 'tipo_novedad').astype(object)
+    ingreso = pd.to_datetime(_columna(df, 'fecha_ingreso'), errors='coerce')
+    retiro = pd.to_datetime(_columna(df, 'fecha_retiro'), errors='coerce')
+    # Texto original de las fechas (si el cargador lo informó): lo que había antes de convertir
+    ingreso_original = _columna(df, originales.get('fecha_ingreso'))
+    retiro_original = _columna(df, originales.get('fecha_retiro'))
+
+    es_ingreso = novedad.isin(NOVEDADES_INGRESO)
+    es_retirado = novedad == 'RETIRADO'
+    mascaras = {
+        'fecha_ingreso_invalida': ingreso_original.notna() & ingreso.isna(),
+        'fecha_retiro_invalida': retiro_original.notna() & retiro.isna(),
+        'sin_fecha_ingreso': es_ingreso & ingreso.isna(),
+        'retirado_sin_fecha_retiro': es_retirado & retiro.isna(),
+        'activo_con_fecha_retiro': es_ingreso & (retiro.notna() | retiro_original.notna()),
+        'retiro_antes_de_ingreso': retiro < ingreso,
+        'novedad_desconocida': ~novedad.isin(NOVEDADES_CONOCIDAS),
+    }
+    return {regla: mascara.to_numpy(dtype=bool) for regla, mascara in mascaras.items()}
+
+
+def ejemplos(df, mascara, columnas):
+    """Primeros registros que incumplen la regla: fila de la hoja y valores de las columnas."""
+    posiciones = np.flatnonzero(mascara)[:MAX_EJEMPLOS]
+    filas = df.iloc[posiciones]
+    partes = []
+    for etiqueta, fila in zip(filas.index, filas[columnas].itertuples(index=False, name=None)):
+        valores = ', '.join('—' if pd.isna(v) else str(v) for v in fila)
+        numero = etiqueta + PRIMERA_FILA_DATOS if isinstance(etiqueta, (int, np.integer)) else etiqueta
+        partes.append(f"fila {numero}: {valores}" if valores else f"fila {numero}")
+    return '; '.join(partes)
+
+
+# Función para validar todas las hojas
+def validar(data_dict):
+    """
+    Retorna un DataFrame con una fila por hoja y regla incumplida: cantidad de registros,
+    porcentaje de la hoja y ejemplos (fila de la hoja y valores originales).
+    """
+    resultados = []
+    for hoja, origen in ORIGENES.items():
+        df = data_dict.get(hoja)
+        if df is None or df.empty:
+            continue
+        originales = df.attrs.get('columnas_origen', {})
+        columnas = [c for c in dict.fromkeys([
+            originales.get('tipo_novedad', 'tipo_novedad'),
+            originales.get('fecha_ingreso', 'fecha_ingreso'),
+            originales.get('fecha_retiro', 'fecha_retiro'),
+        ]) if c in df.columns]
+        for regla, mascara in validar_hoja(df).items():
+            cantidad = int(mascara.sum())
+            if cantidad == 0:
+                continue
+            resultados.append({
+                'Hoja': origen,
+                'Regla': REGLAS[regla],
+                'Registros': cantidad,
+                '%': round(100 * cantidad / len(df), 1),
+                'Ejemplos': ejemplos(df, mascara, columnas),
+            })
+    return pd.DataFrame(resultados, columns=['Hoja', 'Regla', 'Registros', '%', 'Ejemplos'])
+
+
+# Validación calculada una vez por versión de los datos
+@st.cache_data(ttl=3600, max_entries=4, show_spinner=False)
+def _validacion_por_version(version, _data_dict):
+    return validar(_data_dict)
+
+
+def obtener_validacion(data_dict):
+    """Retorna el resultado de validar() para la versión actual de los datos."""
+    with medir('validacion'):
+        return _validacion_por_version(version_datos(data_dict), data_dict)
+
+
+# Función para mostrar el panel de calidad de datos en la barra lateral
+def mostrar_panel(data_dict):
+    """
+    Muestra en la barra lateral cuántos registros incumplen cada regla: estos registros
+    quedan fuera de los filtros por fecha o se cuentan con una novedad inconsistente.
+    """
+    resultado = obtener_validacion(data_dict)
+    total = int(resultado['Registros'].sum()) if not resultado.empty else 0
+    titulo = f"🩺 Calidad de datos ({total} observaciones)" if total else "🩺 Calidad de datos"
+    with st.sidebar.expander(titulo):
+        if resultado.empty:
+            st.caption("No se encontraron problemas en los datos cargados.")
+            return
+        st.caption(
+            "Registros con fechas que no se pudieron leer o con novedad y fechas inconsistentes. "
+            "Las fechas inválidas quedan vacías y esos registros no aparecen en los filtros por fecha."
+        )
+        st.dataframe(resultado, use_container_width=True)
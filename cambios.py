@@ -0,0 +1,277 @@
+import threading
+import time
+from collections import OrderedDict, deque
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+import metricas
+from identidad import claves_persona, normalizar_documento
+from instrumentacion import medir
+from registros import obtener_registros, CAMPOS
+from utils import version_datos
+
+# Columnas del conteo mantenido: las dimensiones de los reportes y las dos fechas (con
+# ellas se filtra por fecha de evento y se arma la serie de dotación)
+DIMENSIONES = ['origen', 'tipo_novedad', 'sitio'] + CAMPOS
+COLUMNAS = DIMENSIONES + ['fecha_ingreso', 'fecha_retiro']
+
+# Cambios recientes que se conservan en el registro de cambios
+MAX_CAMBIOS = 50
+
+# Fracción de grupos en cero a partir de la cual se compacta el conteo
+MAX_FRACCION_VACIOS = 0.5
+
+# Linajes de datos con conteo mantenido (los datos actuales y las instantáneas consultadas)
+MAX_LINAJES = 4
+
+# Linaje de los datos actuales de Google Sheets
+ACTUAL = 'actual'
+
+
+def _hash_filas(frame):
+    """Hash de 64 bits de cada fila (las categorías se hashean por valor, no por código)."""
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy()
+
+
+def claves_fila(registros):
+    """
+    Clave estable de cada registro de la tabla unificada: la hoja, la clave de la persona
+    (documento normalizado, ver identidad.py) y el número de aparición de esa persona en la
+    hoja. Los registros sin documento usan en su lugar el hash de su contenido (ver
+    claves_contenido): editar uno de ellos cuenta como eliminarlo e insertarlo de nuevo.
+    La clave no depende de la posición de la fila, así que insertar o quitar filas no
+    cambia la de los demás registros.
+    """
+    persona = claves_persona(registros)
+    sin_documento = normalizar_documento(registros['documento']).isna().to_numpy()
+    if sin_documento.any():
+        persona = persona.copy()
+        persona[sin_documento] = claves_contenido(registros.iloc[np.flatnonzero(sin_documento)]).view(np.int64)
+    origen = registros['origen'].astype(object).to_numpy()
+    aparicion = pd.DataFrame({'origen': origen, 'persona': persona}).groupby(['origen', 'persona'], sort=False).cumcount()
+    return _hash_filas(pd.DataFrame({'origen': origen, 'persona': persona, 'aparicion': aparicion.to_numpy()}))
+
+
+def claves_contenido(registros):
+    """
+    Hash de las columnas del conteo de cada registro: cambia si cambia alguna de ellas.
+    Las fechas se llevan a la misma resolución para que el hash no dependa de cómo se
+    armó la tabla.
+    """
+    frame = registros[COLUMNAS].copy()
+    for columna in ['fecha_ingreso', 'fecha_retiro']:
+        frame[columna] = pd.to_datetime(frame[columna], errors='coerce').astype('datetime64[ns]')
+    return _hash_filas(frame)
+
+
+class Cambios:
+    """
+    Diferencias entre dos versiones de la tabla unificada, por clave de fila: posiciones de
+    los registros insertados (en la nueva), eliminados (en la anterior) y actualizados
+    (en ambas, alineadas).
+    """
+
+    def __init__(self, filas_anteriores, filas_nuevas, contenido_anterior, contenido_nuevo):
+        posicion_anterior = pd.Index(filas_anteriores).get_indexer(filas_nuevas)
+        existe = posicion_anterior >= 0
+        self.insertados = np.flatnonzero(~existe)
+        vigente = np.zeros(len(filas_anteriores), dtype=bool)
+        vigente[posicion_anterior[existe]] = True
+        self.eliminados = np.flatnonzero(~vigente)
+
+        comunes = np.flatnonzero(existe)
+        distinto = contenido_nuevo[comunes] != contenido_anterior[posicion_anterior[comunes]]
+        self.actualizados_nuevos = comunes[distinto]
+        self.actualizados_anteriores = posicion_anterior[self.actualizados_nuevos]
+
+    def resumen(self):
+        """Cantidad de registros insertados, actualizados y eliminados."""
+        return {
+            'insertados': len(self.insertados),
+            'actualizados': len(self.actualizados_nuevos),
+            'eliminados': len(self.eliminados),
+        }
+
+
+# Función para calcular los cambios entre dos versiones de la tabla unificada
+def diferencias(anteriores, nuevos):
+    """Retorna los Cambios (insertados, actualizados, eliminados) de 'anteriores' a 'nuevos'."""
+    return Cambios(claves_fila(anteriores), claves_fila(nuevos), claves_contenido(anteriores), claves_contenido(nuevos))
+
+
+class ConteoMantenido:
+    """
+    Conteo de registros por todas las columnas de COLUMNAS (vacíos incluidos). Es la tabla
+    más fina que necesitan los conteos por contrato, área y motivo y la serie de dotación,
+    y se mantiene con deltas: cada cambio suma o resta 1 en el grupo de su contenido, sin
+    volver a agrupar la tabla completa.
+    """
+
+    def __init__(self, registros):
+        contenido = claves_contenido(registros)
+        claves, primera, inversa = np.unique(contenido, return_index=True, return_inverse=True)
+        self.tabla = registros[COLUMNAS].iloc[primera].reset_index(drop=True)
+        self.totales = np.bincount(inversa.ravel(), minlength=len(claves)).astype(np.int64)
+        self.posiciones = dict(zip(claves.tolist(), range(len(claves))))
+        self._vista = None
+
+    def aplicar(self, registros_anteriores, registros_nuevos, cambios):
+        """Suma los registros insertados y actualizados (nuevos) y resta los eliminados y actualizados (anteriores)."""
+        suman = np.concatenate([cambios.insertados, cambios.actualizados_nuevos])
+        restan = np.concatenate([cambios.eliminados, cambios.actualizados_anteriores])
+        if len(suman) == 0 and len(restan) == 0:
+            return
+
+        # Los restados siempre tienen grupo: estaban en la versión anterior
+        restados = claves_contenido(registros_anteriores.iloc[restan]).tolist()
+        np.subtract.at(self.totales, [self.posiciones[c] for c in restados], 1)
+
+        # Los sumados pueden formar grupos nuevos: se agregan al final del conteo
+        nuevos = registros_nuevos.iloc[suman]
+        sumados = claves_contenido(nuevos)
+        distintas, primera = np.unique(sumados, return_index=True)
+        faltan = [i for i, clave in enumerate(distintas.tolist()) if clave not in self.posiciones]
+        if faltan:
+            self.posiciones.update({c: len(self.totales) + i for i, c in enumerate(distintas[faltan].tolist())})
+            filas = nuevos[COLUMNAS].iloc[primera[faltan]]
+            self.tabla = pd.concat([self.tabla, filas], ignore_index=True)
+            self.totales = np.concatenate([self.totales, np.zeros(len(faltan), dtype=np.int64)])
+        np.add.at(self.totales, [self.posiciones[c] for c in sumados.tolist()], 1)
+
+        if (self.totales == 0).mean() > MAX_FRACCION_VACIOS:
+            self.compactar()
+        self._vista = None
+
+    def compactar(self):
+        """Descarta los grupos que quedaron en cero."""
+        conservar = np.flatnonzero(self.totales != 0)
+        self.tabla = self.tabla.iloc[conservar].reset_index(drop=True)
+        self.totales = self.totales[conservar]
+        claves = claves_contenido(self.tabla) if len(self.tabla) else np.zeros(0, dtype=np.uint64)
+        self.posiciones = dict(zip(claves.tolist(), range(len(claves))))
+
+    def vista(self):
+        """
+        Grupos con registros como DataFrame: COLUMNAS (dimensiones como categorías) y
+        'Total'. Se arma una vez por versión y es compartido: no modificarlo.
+        """
+        if self._vista is None:
+            conservar = np.flatnonzero(self.totales > 0)
+            vista = self.tabla.iloc[conservar].reset_index(drop=True)
+            for columna in DIMENSIONES:
+                vista[columna] = vista[columna].astype(object).astype('category')
+            for columna in ['fecha_ingreso', 'fecha_retiro']:
+                vista[columna] = pd.to_datetime(vista[columna], errors='coerce')
+            vista['Total'] = self.totales[conservar]
+            self._vista = vista
+        return self._vista
+
+
+def firma_esquema(data_dict):
+    """Columnas de cada hoja: si cambian, el conteo se vuelve a calcular desde cero."""
+    return tuple(
+        (hoja, tuple(map(str, df.columns)), tuple(sorted(df.attrs.get('columnas_origen', {}).items())))
+        for hoja, df in sorted(data_dict.items()) if df is not None
+    )
+
+
+def linaje(data_dict):
+    """
+    Origen de los datos: ACTUAL para las hojas de Google Sheets o la fecha de la instantánea
+    más reciente de las hojas históricas (ver utils.load_historical_data). El conteo se
+    mantiene por linaje: consultar otra fecha no se toma como un cambio de los datos.
+    """
+    fechas = [df.attrs['instantanea'] for df in data_dict.values() if df is not None and 'instantanea' in df.attrs]
+    return max(fechas) if fechas else ACTUAL
+
+
+# Estado del proceso por linaje: conteo mantenido, versión a la que corresponde y registros
+_lock = threading.Lock()
+_estados = OrderedDict()
+_registro_cambios = deque(maxlen=MAX_CAMBIOS)
+
+
+def _estado(origen):
+    """Estado del linaje 'origen' (se crea vacío; se descartan los menos usados)."""
+    if origen not in _estados:
+        _estados[origen] = {'version': None, 'firma': None, 'registros': None, 'conteo': None}
+        while len(_estados) > MAX_LINAJES:
+            _estados.popitem(last=False)
+    _estados.move_to_end(origen)
+    return _estados[origen]
+
+
+def _actualizar(data_dict, origen, version):
+    """Lleva el conteo mantenido del linaje a la versión de data_dict (con deltas si el esquema no cambió)."""
+    estado = _estado(origen)
+    registros = obtener_registros(data_dict)
+    firma = firma_esquema(data_dict)
+    inicio = time.perf_counter()
+    with medir('conteo_mantenido', linaje=origen) as span:
+        if estado['conteo'] is None or estado['firma'] != firma:
+            estado['conteo'] = ConteoMantenido(registros)
+            resumen = {'insertados': len(registros), 'actualizados': 0, 'eliminados': 0}
+            span['reconstruido'] = True
+        else:
+            cambios = diferencias(estado['registros'], registros)
+            estado['conteo'].aplicar(estado['registros'], registros, cambios)
+            resumen = cambios.resumen()
+            span['reconstruido'] = False
+        span.update(resumen)
+
+    # Las métricas de cambios son de los datos actuales: abrir una instantánea no es un cambio
+    if origen == ACTUAL:
+        for tipo, cantidad in resumen.items():
+            metricas.CAMBIOS.incrementar(cantidad, tipo=tipo)
+    _registro_cambios.appendleft({
+        'momento': pd.Timestamp.now().floor('s'),
+        'linaje': origen,
+        'version_anterior': estado['version'],
+        'version': version,
+        'reconstruido': span['reconstruido'],
+        **resumen,
+        'ms': round((time.perf_counter() - inicio) * 1000, 1),
+    })
+    estado.update(version=version, firma=firma, registros=registros)
+
+
+def obtener_conteo(data_dict):
+    """
+    Retorna la vista del conteo mantenido (ver ConteoMantenido.vista) para la versión de
+    data_dict. Al cambiar la versión solo se aplican las diferencias con la anterior del
+    mismo linaje (datos actuales o la misma instantánea).
+    """
+    origen = linaje(data_dict)
+    version = version_datos(data_dict)
+    with _lock:
+        if _estado(origen)['version'] != version:
+            _actualizar(data_dict, origen, version)
+        return _estado(origen)['conteo'].vista()
+
+
+def registro_cambios(origen=None):
+    """Cambios aplicados al conteo mantenido (de un linaje, o de todos), del más reciente al más antiguo."""
+    with _lock:
+        cambios = pd.DataFrame(list(_registro_cambios))
+    if origen is not None and not cambios.empty:
+        cambios = cambios[cambios['linaje'] == origen].reset_index(drop=True)
+    return cambios
+
+
+# Función para mostrar los últimos cambios aplicados en la barra lateral
+def mostrar_panel(data_dict):
+    """Muestra cuántos registros cambiaron en cada actualización de los datos que se están viendo."""
+    cambios = registro_cambios(linaje(data_dict))
+    if cambios.empty:
+        return
+    with st.sidebar.expander("🔄 Cambios en los datos"):
+        st.caption(
+            "Registros insertados, actualizados y eliminados en cada actualización. Los conteos "
+            "se actualizan solo con estos cambios; se recalculan completos si cambian las columnas. "
+            "Los registros sin documento se identifican por su contenido: si se editan, cuentan "
+            "como eliminados e insertados."
+        )
+        columnas = ['momento', 'insertados', 'actualizados', 'eliminados', 'reconstruido', 'ms']
+        st.dataframe(cambios[columnas], use_container_width=True)
@@ -0,0 +1,126 @@
+import functools
+import json
+import os
+import threading
+import unicodedata
+
+import pandas as pd
+
+from esquema import normalizar_encabezado
+
+# Archivo opcional de alias: {"campo": {"variante": "valor canónico"}, "*": {...}}.
+# Las variantes se comparan ya normalizadas; "*" aplica a todos los campos.
+RUTA_ALIAS = os.environ.get('INDICADORES_ALIAS', 'alias_categorias.json')
+
+TODOS_CAMPOS = '*'
+
+# Valores originales distintos cuya forma (clave y escritura visible) se conserva memoizada
+MAX_MEMO = 50000
+
+_alias = {}
+_SIN_LEER = object()
+_version_alias = _SIN_LEER
+_lock = threading.Lock()
+
+
+def leer_alias(ruta=RUTA_ALIAS):
+    """
+    Lee el archivo de alias y retorna {campo: {variante normalizada: valor canónico}}.
+    Si el archivo no existe o no es válido no hay alias.
+    """
+    try:
+        with open(ruta, encoding='utf-8') as archivo:
+            contenido = json.load(archivo)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(contenido, dict):
+        return {}
+    return {
+        campo: {normalizar_encabezado(variante): str(valor) for variante, valor in alias.items()}
+        for campo, alias in contenido.items() if isinstance(alias, dict)
+    }
+
+
+def version_alias():
+    """Versión del archivo de alias (fecha de modificación y tamaño), None si no existe."""
+    try:
+        estado = os.stat(RUTA_ALIAS)
+    except OSError:
+        return None
+    return estado.st_mtime_ns, estado.st_size
+
+
+def recargar_alias():
+    """
+    Vuelve a leer los alias si el archivo cambió desde la última lectura. Se llama una vez
+    por carga de datos (ver registros.unificar), no en cada canonización.
+    """
+    global _alias, _version_alias
+    version = version_alias()
+    with _lock:
+        if version != _version_alias:
+            _alias = leer_alias(RUTA_ALIAS) if version else {}
+            _version_alias = version
+
+
+def tildes(texto):
+    """Cantidad de caracteres con tilde o diéresis del texto."""
+    return sum(1 for c in unicodedata.normalize('NFKD', texto) if unicodedata.combining(c))
+
+
+@functools.lru_cache(maxsize=MAX_MEMO)
+def formas_valor(valor):
+    """
+    Retorna (clave, visible) de un valor no vacío: la clave para comparar (sin tildes, en
+    mayúsculas y con espacios simples) y la escritura para mostrar (igual pero con sus
+    tildes). None si el valor queda vacío.
+    """
+    visible = ' '.join(str(valor).upper().split())
+    if not visible:
+        return None
+    return normalizar_encabezado(visible), visible
+
+
+def _preferida(escrituras):
+    """Entre las escrituras de una misma categoría se muestra la que tiene más tildes (o la primera en orden alfabético)."""
+    return min(escrituras, key=lambda v: (-tildes(v), v))
+
+
+# Función para canonizar una columna de categorías
+def canonizar(serie, campo):
+    """
+    Retorna la serie con los valores canónicos del campo (vacíos para los valores vacíos).
+    Las variantes de mayúsculas, espacios y tildes son una sola categoría: se comparan sin
+    tildes y se muestran con la escritura que las conserva entre los valores de la serie,
+    o con el alias si el archivo de alias lo define para el campo. Solo se evalúan los
+    valores distintos; las filas reciben el resultado por indexación.
+    """
+    if _version_alias is _SIN_LEER:
+        recargar_alias()
+    codigos, valores = pd.factorize(serie)
+    formas = [None if pd.isna(v) else formas_valor(v) for v in valores]
+    with _lock:
+        alias = {**_alias.get(TODOS_CAMPOS, {}), **_alias.get(campo, {})}
+
+    # La escritura visible depende solo de los valores de esta serie (no del orden ni de
+    # canonizaciones anteriores): la misma columna siempre da las mismas etiquetas
+    escrituras = {}
+    for forma in formas:
+        if forma is not None:
+            escrituras.setdefault(forma[0], set()).add(forma[1])
+    visibles = {clave: alias.get(clave) or _preferida(opciones) for clave, opciones in escrituras.items()}
+    canonicos = [None if forma is None else visibles[forma[0]] for forma in formas]
+
+    # El último elemento corresponde a los vacíos (código -1)
+    resultado = pd.Series(canonicos + [None], dtype=object).to_numpy()[codigos]
+    return pd.Series(resultado, index=serie.index, dtype=object)
+
+
+def limpiar_memo():
+    """Descarta las formas memoizadas (se recalculan en la próxima canonización)."""
+    formas_valor.cache_clear()
+
+
+def valores_memoizados():
+    """Cantidad de valores originales con su forma ya calculada."""
+    return formas_valor.cache_info().currsize
@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from dotacion import codigos_grupo, intervalos_vigencia
+from registros import obtener_registros
+from utils import version_datos
+
+# Edades (meses desde el ingreso) en las que se mide la retención
+EDADES_MESES = (1, 3, 6, 12)
+
+
+def sumar_meses(dias, meses):
+    """
+    Suma meses calendario a fechas expresadas en días desde 1970-01-01 (enteros).
+    Si el día no existe en el mes destino se usa el último día de ese mes (31/01 + 1 = 28/02).
+    """
+    fechas = dias.astype('datetime64[D]')
+    mes = fechas.astype('datetime64[M]')
+    dia_del_mes = (fechas - mes.astype('datetime64[D]')).astype(np.int64)
+    destino = mes + meses
+    largo_destino = ((destino + 1).astype('datetime64[D]') - destino.astype('datetime64[D]')).astype(np.int64)
+    return (destino.astype('datetime64[D]') + np.minimum(dia_del_mes, largo_destino - 1)).astype(np.int64)
+
+
+def matriz_retencion(registros, por=None, edades=EDADES_MESES, fecha_corte=None):
+    """
+    Calcula, por grupo y mes de ingreso (cohorte), qué porcentaje de los ingresos sigue
+    activo 1, 3, 6 y 12 meses después.
+
+    Los registros se ordenan una sola vez por la clave grupo * cohortes + cohorte y cada
+    celda se obtiene con sumas por tramos (np.add.reduceat) sobre una matriz
+    registro × edad de indicadores. Una edad solo se evalúa para los registros cuya fecha
+    objetivo ya pasó (fecha de corte); si ninguno la alcanza la celda queda vacía.
+
+    Retorna un DataFrame con Grupo, Cohorte, Ingresos y una columna de retención (%) por edad.
+    """
+    edades = list(edades)
+    columnas_edad = [f"{e} meses" for e in edades]
+    columnas = ['Grupo', 'Cohorte', 'Ingresos'] + columnas_edad
+
+    corte = pd.Timestamp(fecha_corte or pd.Timestamp.now().normalize())
+    dia_corte = int(np.datetime64(corte.normalize(), 'D').astype(np.int64))
+    mascara, inicio, fin = intervalos_vigencia(registros)
+    codigos, etiquetas = codigos_grupo(registros, por)
+    # Solo ingresos hasta la fecha de corte
+    filas = np.flatnonzero(mascara)
+    filas = filas[inicio[filas] <= dia_corte]
+    if len(filas) == 0:
+        return pd.DataFrame(columns=columnas)
+
+    inicio = inicio[filas].astype(np.int64)
+    fin = fin[filas]
+    codigos = codigos[filas]
+
+    # Cohorte: meses desde 1970-01
+    cohorte = inicio.astype('datetime64[D]').astype('datetime64[M]').astype(np.int64)
+    primera = int(cohorte.min())
+    cantidad_cohortes = int(cohorte.max()) - primera + 1
+
+    # Indicadores por registro y edad: observable (fecha objetivo <= corte) y activo en esa fecha
+    objetivo = np.column_stack([sumar_meses(inicio, e) for e in edades])
+    observable = objetivo <= dia_corte
+    sin_retiro = np.isnan(fin)
+    activo = observable & (sin_retiro[:, None] | (np.nan_to_num(fin, nan=0)[:, None] >= objetivo))
+
+    # Un solo ordenamiento por (grupo, cohorte) y sumas por tramos
+    claves = codigos * cantidad_cohortes + (cohorte - primera)
+    orden = np.argsort(claves, kind='stable')
+    claves = claves[orden]
+    celdas, inicios, ingresos = np.unique(claves, return_index=True, return_counts=True)
+    observables = np.add.reduceat(observable[orden].astype(np.int64), inicios, axis=0)
+    activos = np.add.reduceat(activo[orden].astype(np.int64), inicios, axis=0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        retencion = np.where(observables > 0, activos / observables * 100, np.nan)
+
+    meses = (celdas % cantidad_cohortes + primera).astype('datetime64[M]')
+    resultado = pd.DataFrame(retencion.round(1), columns=columnas_edad)
+    resultado.insert(0, 'Ingresos', ingresos)
+    resultado.insert(0, 'Cohorte', pd.DatetimeIndex(meses).strftime('%Y-%m'))
+    resultado.insert(0, 'Grupo', np.asarray(etiquetas, dtype=object)[celdas // cantidad_cohortes])
+    return resultado[columnas]
+
+
+# Matriz cacheada por versión de los datos y filtros (los registros no se hashean)
+@st.cache_data(ttl=3600, max_entries=32, show_spinner=False)
+def _retencion_por_version(version, origenes, novedades, por, fecha_corte, _registros):
+    registros = _registros[
+        _registros['origen'].isin(origenes) & _registros['tipo_novedad'].isin(novedades)
+    ]
+    return matriz_retencion(registros, por=list(por), fecha_corte=fecha_corte)
+
+
+def obtener_retencion(data_dict, origenes, novedades, por, fecha_corte=None):
+    """
+    Retorna la matriz de retención por cohorte para los filtros indicados, calculada una
+    sola vez por versión de los datos.
+    """
+    return _retencion_por_version(
+        version_datos(data_dict), tuple(origenes), tuple(sorted(novedades)), tuple(por),
+        fecha_corte, obtener_registros(data_dict)
+    )
@@ -0,0 +1,158 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from registros import obtener_registros, ETIQUETAS
+from identidad import obtener_identidad
+from utils import version_datos
+from instrumentacion import medir
+
+# Novedades que se filtran por fecha de ingreso (las RETIRADO se filtran por fecha de retiro)
+NOVEDADES_INGRESO = ['ACTIVO', 'CASO ESPECIAL']
+
+# Nombres de las columnas de conteo de cada periodo
+PERIODO_ACTUAL = 'Periodo actual'
+PERIODO_COMPARACION = 'Periodo de comparación'
+
+
+def fecha_evento(registros):
+    """
+    Fecha con la que las páginas filtran cada registro: ingreso para ACTIVO / CASO ESPECIAL,
+    retiro para RETIRADO y NaT para las demás novedades.
+    """
+    novedad = registros['tipo_novedad'].astype(object)
+    return registros['fecha_ingreso'].where(
+        novedad.isin(NOVEDADES_INGRESO),
+        registros['fecha_retiro'].where(novedad == 'RETIRADO')
+    )
+
+
+def filas_en_rango(registros, novedades, fecha_min, fecha_max):
+    """Registros que las páginas muestran con esos tipos de novedad y rango de fechas."""
+    evento = fecha_evento(registros)
+    return registros[
+        registros['tipo_novedad'].isin(novedades)
+        & (evento >= pd.Timestamp(fecha_min).normalize())
+        & (evento <= pd.Timestamp(fecha_max).normalize())
+    ]
+
+
+def filas_por_periodo(registros, novedades, periodos):
+    """
+    Retorna (posiciones, periodo): las posiciones (iloc) de los registros que caen en cada
+    rango de fechas y la clave del periodo (0, 1, ...) de cada una. Un registro aparece
+    una vez por cada periodo que lo contiene (los rangos pueden solaparse).
+    """
+    evento = fecha_evento(registros)
+    seleccion = registros['tipo_novedad'].isin(novedades).to_numpy()
+    posiciones, claves = [], []
+    for clave, (desde, hasta) in enumerate(periodos):
+        dentro = np.flatnonzero(seleccion & ((evento >= desde) & (evento <= hasta)).to_numpy())
+        posiciones.append(dentro)
+        claves.append(np.full(len(dentro), clave, dtype=np.int8))
+    return np.concatenate(posiciones), np.concatenate(claves)
+
+
+def comparar_periodos(registros, por, novedades, periodo_actual, periodo_comparacion, personas=None):
+    """
+    Cuenta registros por las columnas 'por' en dos rangos de fechas y calcula la diferencia
+    (actual - comparación) y la variación porcentual. Con 'personas' (claves de identidad
+    alineadas con los registros, ver identidad.py) cada periodo cuenta personas distintas.
+
+    Los registros de ambos periodos se apilan con una clave de periodo y se agrupan una
+    sola vez por (por..., periodo), en lugar de repetir el filtrado y el conteo por periodo.
+    """
+    por = list(por)
+    columnas = [ETIQUETAS.get(c, c) for c in por] + [
+        PERIODO_ACTUAL, PERIODO_COMPARACION, 'Diferencia', 'Variación (%)'
+    ]
+    posiciones, periodo = filas_por_periodo(registros, novedades, [periodo_actual, periodo_comparacion])
+    if len(posiciones) == 0:
+        return pd.DataFrame(columns=columnas)
+
+    datos = registros.iloc[posiciones][por].copy()
+    datos['periodo'] = periodo
+    if personas is not None:
+        datos['persona'] = personas[posiciones]
+        grupos = datos.groupby(por + ['periodo'], observed=True)['persona'].nunique()
+    else:
+        grupos = datos.groupby(por + ['periodo'], observed=True).size()
+    conteo = (
+        grupos.unstack('periodo', fill_value=0)
+        .reindex(columns=[0, 1], fill_value=0)
+    )
+    conteo.columns = [PERIODO_ACTUAL, PERIODO_COMPARACION]
+    conteo['Diferencia'] = conteo[PERIODO_ACTUAL] - conteo[PERIODO_COMPARACION]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        conteo['Variación (%)'] = np.where(
+            conteo[PERIODO_COMPARACION] > 0,
+            (conteo['Diferencia'] / conteo[PERIODO_COMPARACION] * 100).round(1),
+            np.nan
+        )
+
+    resultado = conteo.reset_index()
+    resultado.columns = columnas
+    return resultado.sort_values(columnas[:len(por)], ignore_index=True)
+
+
+# Comparación cacheada por versión de los datos y filtros (los registros no se hashean)
+@st.cache_data(ttl=3600, max_entries=64, show_spinner=False)
+def _comparacion_por_version(version, origenes, por, novedades, periodo_actual, periodo_comparacion,
+                             distintas, _registros, _personas):
+    seleccion = _registros['origen'].isin(origenes).to_numpy()
+    return comparar_periodos(
+        _registros[seleccion], por, novedades, periodo_actual, periodo_comparacion,
+        _personas[seleccion] if distintas else None
+    )
+
+
+def obtener_comparacion(data_dict, origenes, por, novedades, periodo_actual, periodo_comparacion, distintas=False):
+    """
+    Retorna la tabla comparativa de dos periodos, calculada una sola vez por versión de
+    los datos y estado de los filtros. Con distintas=True cuenta personas distintas.
+    """
+    return _comparacion_por_version(
+        version_datos(data_dict), tuple(origenes), tuple(por), tuple(sorted(novedades)),
+        tuple(periodo_actual), tuple(periodo_comparacion), distintas, obtener_registros(data_dict),
+        obtener_identidad(data_dict).persona if distintas else None
+    )
+
+
+# Función para elegir en la barra lateral el periodo de comparación
+def selector_periodo_comparacion(clave, fecha_min, fecha_max):
+    """
+    Muestra en la barra lateral la opción de comparar con otro periodo. Por defecto propone
+    el periodo de igual duración inmediatamente anterior al rango seleccionado.
+    Retorna (fecha_inicio, fecha_fin) o None si la comparación está desactivada.
+    """
+    st.sidebar.subheader("Comparación")
+    if not st.sidebar.checkbox("Comparar con otro periodo", key=f"comparar_{clave}"):
+        return None
+
+    fin_defecto = fecha_min - pd.Timedelta(days=1)
+    inicio_defecto = fin_defecto - (fecha_max - fecha_min)
+    rango = st.sidebar.date_input(
+        "Periodo de comparación",
+        value=(inicio_defecto.date(), fin_defecto.date()),
+        key=f"periodo_comparacion_{clave}"
+    )
+    if not hasattr(rango, '__len__'):
+        rango = (rango, rango)
+    elif len(rango) == 1:
+        rango = (rango[0], rango[0])
+    return pd.Timestamp(rango[0]), pd.Timestamp(rango[1])
+
+
+# Función para mostrar una tabla comparativa
+def mostrar_comparacion(tabla, titulo, periodo_actual, periodo_comparacion):
+    """Muestra la tabla comparativa con los rangos de fechas de cada periodo."""
+    st.subheader(titulo)
+    st.caption(
+        f"{PERIODO_ACTUAL}: {periodo_actual[0].strftime('%d/%m/%Y')} – {periodo_actual[1].strftime('%d/%m/%Y')}. "
+        f"{PERIODO_COMPARACION}: {periodo_comparacion[0].strftime('%d/%m/%Y')} – {periodo_comparacion[1].strftime('%d/%m/%Y')}."
+    )
+    if tabla.empty:
+        st.warning("No hay datos disponibles en ninguno de los dos periodos.")
+        return
+    with medir('render', filas=len(tabla)):
+        st.dataframe(tabla, use_container_width=True)
@@ -0,0 +1,135 @@
+import numpy as np
+import pandas as pd
+
+# Tipos de las columnas derivadas que arma el convertidor
+FECHA = 'fecha'
+DIMENSION = 'dimension'
+
+# Formato de las fechas en las hojas
+FORMATO_FECHA = '%Y%m%d'
+
+# Día 0 de los números de serie de fecha de Google Sheets
+ORIGEN_SERIAL = np.datetime64('1899-12-30', 'D')
+
+# Rangos de las fechas numéricas representables en datetime64[ns] (1678-01-01 a 2262-04-11)
+MIN_AAAAMMDD = 16780101
+MAX_AAAAMMDD = 22620411
+MAX_SERIAL = int((np.datetime64('2262-04-11', 'D') - ORIGEN_SERIAL).astype(np.int64))
+
+# Clase de cada celda según su tipo en Python (las demás, como los vacíos, quedan en NaT)
+TEXTO, NUMERO = 1, 2
+TIPOS_CELDA = {str: TEXTO, int: NUMERO, float: NUMERO, np.int64: NUMERO, np.float64: NUMERO}
+
+
+def matriz_desde_filas(filas, ancho):
+    """
+    Arma la matriz (filas x ancho) de objetos a partir de las filas de la API, que tienen
+    distinto largo porque la API omite las celdas vacías del final. Las filas cortas se
+    completan con celdas vacías y las celdas que exceden el encabezado se descartan.
+    """
+    relleno = [''] * ancho
+    completas = [
+        fila if len(fila) == ancho else (fila + relleno[len(fila):] if len(fila) < ancho else fila[:ancho])
+        for fila in filas
+    ]
+    return np.array(completas, dtype=object).reshape(len(filas), ancho)
+
+
+def fechas_aaaammdd(numeros):
+    """
+    Convierte enteros AAAAMMDD en datetime64[ns] con aritmética entera (NaT si el mes o el
+    día no existen).
+    """
+    anio, resto = np.divmod(numeros, 10000)
+    mes, dia = np.divmod(resto, 100)
+    meses = (anio - 1970) * 12 + (mes - 1)
+    inicio_mes = meses.astype('datetime64[M]').astype('datetime64[D]')
+    dias_mes = ((meses + 1).astype('datetime64[M]').astype('datetime64[D]') - inicio_mes).astype(np.int64)
+    validas = (mes >= 1) & (mes <= 12) & (dia >= 1) & (dia <= dias_mes)
+    fechas = (inicio_mes + np.where(validas, dia - 1, 0)).astype('datetime64[ns]')
+    return np.where(validas, fechas, np.datetime64('NaT', 'ns'))
+
+
+def convertir_fechas(valores):
+    """
+    Convierte las fechas de la hoja en datetime64[ns]. Las celdas numéricas (valores sin
+    formato de la API) se convierten con aritmética entera: enteros AAAAMMDD y números de
+    serie de Sheets (días desde 1899-12-30, la hora se descarta). Solo las celdas de texto
+    pasan por to_datetime con el formato AAAAMMDD; las que no lo cumplen quedan en NaT.
+    """
+    valores = np.asarray(valores, dtype=object)
+    resultado = np.full(len(valores), np.datetime64('NaT', 'ns'), dtype='datetime64[ns]')
+    tipos = np.fromiter((TIPOS_CELDA.get(type(v), 0) for v in valores), dtype=np.int8, count=len(valores))
+
+    es_numero = tipos == NUMERO
+    if es_numero.any():
+        numeros = valores[es_numero].astype(float)
+        fechas = np.full(len(numeros), np.datetime64('NaT', 'ns'), dtype='datetime64[ns]')
+        entero = numeros == np.floor(numeros)
+        es_aaaammdd = entero & (numeros >= MIN_AAAAMMDD) & (numeros <= MAX_AAAAMMDD)
+        if es_aaaammdd.any():
+            fechas[es_aaaammdd] = fechas_aaaammdd(numeros[es_aaaammdd].astype(np.int64))
+        es_serial = (numeros >= 1) & (numeros <= MAX_SERIAL)
+        if es_serial.any():
+            dias = np.floor(numeros[es_serial]).astype(np.int64)
+            fechas[es_serial] = (ORIGEN_SERIAL + dias).astype('datetime64[ns]')
+        resultado[es_numero] = fechas
+
+    es_texto = tipos == TEXTO
+    if es_texto.any():
+        resultado[es_texto] = pd.to_datetime(
+            pd.Series(valores[es_texto], dtype=object), format=FORMATO_FECHA, errors='coerce'
+        ).to_numpy(dtype='datetime64[ns]')
+    return resultado
+
+
+def codificar_dimension(valores):
+    """Codifica una columna de texto como categoría (categorías ordenadas, vacíos como NaN)."""
+    codigos, categorias = pd.factorize(valores, sort=True)
+    return pd.Categorical.from_codes(codigos, categories=categorias)
+
+
+# Función para convertir la respuesta de la API en un DataFrame
+def convertir(values, derivadas=None):
+    """
+    Convierte 'values' de la API de Sheets (encabezado + filas irregulares) en un DataFrame
+    de columnas de objetos armado desde una sola matriz: las celdas vacías quedan como nulos
+    y las filas completamente vacías se descartan (conservando su posición original como
+    índice, igual que dropna). Evita el replace sobre todas las celdas del DataFrame.
+
+    derivadas: {columna nueva: (columna original, FECHA | DIMENSION)} que se calculan en la
+    misma pasada sobre los arreglos ya filtrados (fechas AAAAMMDD y categorías).
+    """
+    encabezados, filas = values[0], values[1:]
+    matriz = matriz_desde_filas(filas, len(encabezados))
+    matriz[matriz == ''] = None
+    return desde_matriz(encabezados, matriz, derivadas)
+
+
+def desde_matriz(encabezados, matriz, derivadas=None):
+    """
+    Arma el DataFrame de una hoja a partir de su matriz de celdas (objetos, None en las
+    vacías): descarta las filas sin ninguna celda con valor y agrega las derivadas.
+    """
+    indice = pd.RangeIndex(len(matriz))
+    # Comparación elemento a elemento con None (más rápida que pd.notna sobre objetos)
+    con_datos = np.not_equal(matriz, None).any(axis=1)
+    if not con_datos.all():
+        matriz, indice = matriz[con_datos], indice[con_datos]
+
+    # Columnas originales como objetos (texto y nulos), sin inferir tipos columna por columna
+    df = pd.DataFrame(matriz, index=indice, columns=list(encabezados), dtype=object)
+    return agregar_derivadas(df, derivadas)
+
+
+def agregar_derivadas(df, derivadas=None):
+    """
+    Agrega al DataFrame las columnas derivadas {columna nueva: (columna original, FECHA |
+    DIMENSION)} cuyas columnas originales existen.
+    """
+    for nueva, (original, tipo) in (derivadas or {}).items():
+        if original not in df.columns:
+            continue
+        valores = df[original].to_numpy(dtype=object)
+        df[nueva] = convertir_fechas(valores) if tipo == FECHA else codificar_dimension(valores)
+    return df
@@ -0,0 +1,196 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from registros import obtener_registros
+from utils import version_datos
+
+# Frecuencias soportadas por la serie de dotación
+FRECUENCIAS = {'D': 'Diaria', 'M': 'Mensual'}
+
+
+def dias_desde_epoch(fechas):
+    """Convierte una serie de fechas en enteros (días desde 1970-01-01); NaT queda como NaN."""
+    valores = pd.to_datetime(fechas, errors='coerce').to_numpy(dtype='datetime64[ns]')
+    dias = valores.astype('datetime64[D]').astype(np.int64).astype(np.float64)
+    dias[np.isnat(valores)] = np.nan
+    return dias
+
+
+def intervalos_vigencia(registros):
+    """
+    Retorna (mascara, inicio, fin) con el intervalo de vigencia de cada registro en días:
+    activo desde fecha_ingreso hasta fecha_retiro inclusive (sin retiro: sigue activo).
+    Se excluyen los registros sin fecha de ingreso y los RETIRADO sin fecha de retiro,
+    porque su intervalo no se puede determinar, y los que tienen la fecha de retiro
+    anterior a la de ingreso (intervalo vacío; ver calidad.py).
+    """
+    inicio = dias_desde_epoch(registros['fecha_ingreso'])
+    fin = dias_desde_epoch(registros['fecha_retiro'])
+    retirado_sin_fecha = (registros['tipo_novedad'].astype(object) == 'RETIRADO').to_numpy() & np.isnan(fin)
+    with np.errstate(invalid='ignore'):
+        retiro_antes_de_ingreso = fin < inicio
+    mascara = ~np.isnan(inicio) & ~retirado_sin_fecha & ~retiro_antes_de_ingreso
+    return mascara, inicio, fin
+
+
+def codigos_grupo(registros, por):
+    """
+    Retorna (codigos, etiquetas) de los grupos formados por las columnas 'por'.
+    Sin columnas, todos los registros pertenecen al grupo 'Total'.
+    """
+    if not por:
+        return np.zeros(len(registros), dtype=np.int64), ['Total']
+    claves = registros[list(por)].astype(object).fillna('Sin dato').astype(str)
+    clave = claves.iloc[:, 0]
+    if len(por) > 1:
+        clave = clave.str.cat([claves[c] for c in claves.columns[1:]], sep=' / ')
+    codigos, etiquetas = pd.factorize(clave, sort=True)
+    return codigos.astype(np.int64), list(etiquetas)
+
+
+def serie_dotacion(registros, por=None, frecuencia='D', fecha_inicio=None, fecha_fin=None):
+    """
+    Calcula cuántas personas estaban activas cada día (o al cierre de cada mes) por grupo.
+    Si la tabla trae la columna 'Total' (el conteo mantenido de cambios.py), cada fila
+    vale por ese total.
+
+    Cada registro genera un evento +1 en su fecha de ingreso y un evento -1 el día
+    siguiente a su fecha de retiro. Los eventos se acumulan por (grupo, día) con un
+    conteo por casillas (bincount, equivalente a ordenarlos) y la suma acumulada por fila
+    da la dotación diaria: O(n + grupos × días) en total, sin recorrer los días por registro.
+
+    Retorna un DataFrame con índice 'Fecha' y una columna por grupo.
+    """
+    por = list(por or [])
+    mascara, inicio, fin = intervalos_vigencia(registros)
+    codigos, etiquetas = codigos_grupo(registros, por)
+    inicio, fin, codigos = inicio[mascara], fin[mascara], codigos[mascara]
+    pesos = registros['Total'].to_numpy()[mascara] if 'Total' in registros.columns else None
+
+    if len(inicio) == 0:
+        return pd.DataFrame(columns=etiquetas, index=pd.DatetimeIndex([], name='Fecha'))
+
+    # Ventana de días a calcular
+    hoy = pd.Timestamp.now().normalize()
+    conocidas = np.concatenate([inicio, fin[~np.isnan(fin)]])
+    dia0 = int(conocidas.min()) if fecha_inicio is None else int(dias_desde_epoch(pd.Series([fecha_inicio]))[0])
+    if fecha_fin is None:
+        dia_fin = max(int(conocidas.max()), int(dias_desde_epoch(pd.Series([hoy]))[0]))
+    else:
+        dia_fin = int(dias_desde_epoch(pd.Series([fecha_fin]))[0])
+    dias = dia_fin - dia0 + 1
+    if dias <= 0:
+        return pd.DataFrame(columns=etiquetas, index=pd.DatetimeIndex([], name='Fecha'))
+
+    # Posición de los eventos dentro de la ventana: los ingresos anteriores cuentan desde el
+    # primer día y los eventos posteriores al último día caen en la casilla extra (se descarta)
+    entrada = np.clip(inicio - dia0, 0, dias).astype(np.int64)
+    salida = np.where(np.isnan(fin), dias, np.clip(fin + 1 - dia0, 0, dias)).astype(np.int64)
+
+    ancho = dias + 1
+    grupos = len(etiquetas)
+    deltas = (
+        np.bincount(codigos * ancho + entrada, weights=pesos, minlength=grupos * ancho)
+        - np.bincount(codigos * ancho + salida, weights=pesos, minlength=grupos * ancho)
+    ).reshape(grupos, ancho)[:, :dias].astype(np.int64)
+    activos = np.cumsum(deltas, axis=1)
+
+    fechas = pd.date_range(pd.Timestamp(dia0, unit='D'), periods=dias, freq='D', name='Fecha')
+    if frecuencia == 'M':
+        # Dotación al cierre de cada mes (último día disponible del mes)
+        meses = fechas.to_period('M')
+        cierres = np.flatnonzero(np.r_[meses[1:] != meses[:-1], True])
+        fechas = fechas[cierres]
+        activos = activos[:, cierres]
+
+    return pd.DataFrame(activos.T, index=fechas, columns=etiquetas)
+
+
+class IndiceVigencia:
+    """
+    Índice de intervalos de vigencia por grupo para consultas a una fecha de corte.
+
+    Guarda, concatenados por grupo, los inicios ordenados y los fines ordenados de los
+    intervalos. La cantidad de activos de un grupo en la fecha d es
+    (#inicios <= d) - (#fines < d): dos searchsorted, sin recorrer los registros.
+    """
+
+    def __init__(self, registros, por=None):
+        self.por = list(por or [])
+        mascara, inicio, fin = intervalos_vigencia(registros)
+        codigos, self.etiquetas = codigos_grupo(registros, self.por)
+        grupos = len(self.etiquetas)
+        filas = np.flatnonzero(mascara)
+        codigos = codigos[filas]
+
+        # Días desplazados a enteros no negativos; sin retiro = más allá de cualquier fecha
+        inicio = inicio[filas]
+        fin = fin[filas]
+        self._origen = int(inicio.min()) if len(inicio) else 0
+        maximo = int(np.nanmax(np.concatenate([inicio, fin]))) if len(inicio) else 0
+        self._ancho = maximo - self._origen + 3
+        inicio = (inicio - self._origen).astype(np.int64)
+        fin = np.where(np.isnan(fin), self._ancho - 1, fin - self._origen).astype(np.int64)
+
+        # Claves compuestas grupo * ancho + día: un solo arreglo ordenado sirve para todos los grupos
+        orden_inicio = np.lexsort((inicio, codigos))
+        self._filas = filas[orden_inicio]
+        self._fin_por_inicio = fin[orden_inicio]
+        self._claves_inicio = codigos[orden_inicio] * self._ancho + inicio[orden_inicio]
+        self._claves_fin = np.sort(codigos * self._ancho + fin)
+        self._limites = np.searchsorted(codigos[orden_inicio], np.arange(grupos + 1))
+
+    def _dia(self, fecha):
+        """Día relativo al índice; None si la fecha es anterior a todos los ingresos."""
+        dia = int(np.datetime64(pd.Timestamp(fecha).normalize(), 'D').astype(np.int64)) - self._origen
+        if dia < 0:
+            return None
+        # Las fechas posteriores al rango conocido se acotan sin cambiar el resultado
+        return min(dia, self._ancho - 2)
+
+    def contar(self, fecha):
+        """Retorna una Serie con la cantidad de activos por grupo en la fecha indicada."""
+        dia = self._dia(fecha)
+        if dia is None:
+            return pd.Series(0, index=self.etiquetas, name='Activos')
+        base = np.arange(len(self.etiquetas), dtype=np.int64) * self._ancho
+        iniciados = np.searchsorted(self._claves_inicio, base + dia, side='right') - self._limites[:-1]
+        terminados = np.searchsorted(self._claves_fin, base + dia, side='left') - self._limites[:-1]
+        return pd.Series(iniciados - terminados, index=self.etiquetas, name='Activos')
+
+    def filas(self, fecha, grupos=None):
+        """
+        Retorna las posiciones (iloc) en la tabla de registros de los activos en la fecha,
+        opcionalmente solo de los grupos indicados.
+        """
+        dia = self._dia(fecha)
+        if dia is None:
+            return np.array([], dtype=np.int64)
+        seleccion = range(len(self.etiquetas)) if grupos is None else [
+            self.etiquetas.index(g) for g in grupos if g in self.etiquetas
+        ]
+        partes = []
+        for g in seleccion:
+            desde = self._limites[g]
+            # Los registros del grupo ya iniciados son un prefijo del orden por inicio
+            hasta = np.searchsorted(self._claves_inicio, g * self._ancho + dia, side='right')
+            vigentes = self._fin_por_inicio[desde:hasta] >= dia
+            partes.append(self._filas[desde:hasta][vigentes])
+        if not partes:
+            return np.array([], dtype=np.int64)
+        return np.sort(np.concatenate(partes))
+
+
+# Índice cacheado por versión de datos y agrupación (compartido: solo lectura)
+@st.cache_resource(ttl=3600, max_entries=16, show_spinner=False)
+def _indice_por_version(version, por, _registros):
+    return IndiceVigencia(_registros, por)
+
+
+def obtener_indice_vigencia(data_dict, por=()):
+    """
+    Retorna el IndiceVigencia de la tabla unificada de registros, construido una sola vez
+    por versión de los datos y agrupación.
+    """
+    return _indice_por_version(version_datos(data_dict), tuple(por), obtener_registros(data_dict))
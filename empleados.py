@@ -0,0 +1,89 @@
+import time
+
+import streamlit as st
+from utils import load_all_data
+from registros import ORIGENES
+from esquema import obtener_esquemas, mostrar_diagnostico
+from identidad import hojas_sin_documento
+from busqueda import obtener_indice, buscar_empleados
+import instrumentacion
+from instrumentacion import medir
+
+# Máximo de resultados que se muestran (la cantidad total siempre se informa)
+MAX_RESULTADOS = 500
+
+# Largo mínimo de la consulta (evita listar a todo el personal con una sola letra)
+MIN_CARACTERES = 2
+
+def run():
+    """
+    Módulo para buscar personas por nombre o número de documento en Planta, Manipuladoras
+    y Aprendices, con su novedad, tipo de contrato y fechas.
+    """
+    # Cargar datos
+    instrumentacion.etapa('carga')
+    with st.spinner("Cargando datos..."):
+        data_dict = load_all_data()
+
+    # ---------- FILTROS EN LA BARRA LATERAL ----------
+    instrumentacion.etapa('filtros_sidebar')
+    st.sidebar.header("Filtros")
+    todos_origenes = list(ORIGENES.values())
+    origenes_seleccionados = st.sidebar.multiselect(
+        "Origen",
+        options=todos_origenes,
+        default=todos_origenes,
+        key="origenes_busqueda"
+    )
+    if not origenes_seleccionados:
+        st.sidebar.warning("Por favor, seleccione al menos un origen.")
+        origenes_seleccionados = todos_origenes
+
+    # ---------- ÍNDICE DE BÚSQUEDA ----------
+    # Se construye una vez por versión de los datos; las búsquedas solo lo consultan
+    instrumentacion.etapa('indice')
+    with st.spinner("Preparando el índice de búsqueda..."):
+        indice, _ = obtener_indice(data_dict)
+
+    st.header("Buscar Empleado")
+    consulta = st.text_input(
+        "Nombre o número de documento",
+        placeholder="Ej.: maria gomez, 1144 o 1.144.567",
+        key="consulta_busqueda"
+    )
+    st.caption(
+        "Se buscan las palabras que empiecen por cada término, sin distinguir tildes ni mayúsculas. "
+        f"Índice: {indice.filas_total} registros, {len(indice.terminos)} términos."
+    )
+
+
+    # Las columnas de nombre y documento solo se aceptan por su encabezado
+    esquemas = obtener_esquemas(data_dict)
+    mostrar_diagnostico(esquemas, {hoja: ['nombre'] for hoja in ORIGENES})
+    sin_documento = hojas_sin_documento(data_dict)
+    if sin_documento:
+        st.warning(
+            f"Sin columna de documento en {', '.join(sin_documento)}: en esas hojas solo se busca por nombre."
+        )
+
+    if len(consulta.strip()) < MIN_CARACTERES:
+        st.info(f"Escriba al menos {MIN_CARACTERES} caracteres para buscar.")
+        return
+
+    # ---------- RESULTADOS ----------
+    instrumentacion.etapa('busqueda')
+    inicio = time.perf_counter()
+    with medir('busqueda'):
+        resultados = buscar_empleados(data_dict, consulta, origenes_seleccionados)
+    duracion_ms = (time.perf_counter() - inicio) * 1000
+
+    if resultados.empty:
+        st.warning("No se encontraron registros para la búsqueda.")
+        return
+
+    st.caption(f"{len(resultados)} registros encontrados en {duracion_ms:.1f} ms.")
+    if len(resultados) > MAX_RESULTADOS:
+        st.info(f"Se muestran los primeros {MAX_RESULTADOS}; refine la búsqueda para ver el resto.")
+    vista = resultados.head(MAX_RESULTADOS)
+    with medir('render', filas=len(vista)):
+        st.dataframe(vista, use_container_width=True)
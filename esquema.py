@@ -0,0 +1,202 @@
+import hashlib
+import threading
+import unicodedata
+
+import streamlit as st
+
+# Columnas que agrega el cargador de datos (no forman parte del encabezado de la hoja)
+COLUMNAS_DERIVADAS = {'tipo_novedad', 'fecha_ingreso', 'fecha_retiro', 'sitio'}
+
+NOMBRES_AREA = ['AREA', 'ÁREA', 'Area', 'Área']
+NOMBRES_CONTRATO = ['TIPO DE CONTRATO', 'Tipo de Contrato', 'TIPO CONTRATO']
+NOMBRES_MOTIVO = ['MOTIVO DEL RETIRO', 'Motivo del Retiro', 'MOTIVO RETIRO']
+NOMBRES_PROGRAMA = ['PROGRAMA AL QUE PERTENECE', 'Programa al que Pertenece', 'PROGRAMA']
+NOMBRES_EMPRESA = ['EMPRESA', 'Empresa']
+NOMBRES_NOMBRE = ['NOMBRE COMPLETO', 'Nombre Completo', 'NOMBRES Y APELLIDOS', 'NOMBRE']
+NOMBRES_DOCUMENTO = ['NUMERO DE DOCUMENTO', 'Número de Documento', 'DOCUMENTO', 'CEDULA', 'Cédula']
+
+# Campos lógicos de cada hoja: posición esperada (0 = columna A) y nombres alternativos.
+# Con posición None el campo solo se acepta por nombre (no hay una posición conocida)
+CAMPOS = {
+    'planta': {
+        'nombre': (None, NOMBRES_NOMBRE),
+        'documento': (None, NOMBRES_DOCUMENTO),
+        'empresa': (5, NOMBRES_EMPRESA),        # Posición F
+        'motivo': (10, NOMBRES_MOTIVO),         # Posición K
+        'contrato': (12, NOMBRES_CONTRATO),     # Posición M
+        'area': (13, NOMBRES_AREA),             # Posición N
+    },
+    'manipuladoras': {
+        'nombre': (None, NOMBRES_NOMBRE),
+        'documento': (None, NOMBRES_DOCUMENTO),
+        'area': (5, NOMBRES_AREA),              # Posición F
+        'programa': (7, NOMBRES_PROGRAMA),      # Posición H
+        'motivo': (17, NOMBRES_MOTIVO),         # Posición R
+        'contrato': (19, NOMBRES_CONTRATO),     # Posición T
+    },
+    'aprendices': {
+        'nombre': (None, NOMBRES_NOMBRE),
+        'documento': (None, NOMBRES_DOCUMENTO),
+        'area': (5, NOMBRES_AREA),              # Posición F
+        'contrato': (39, NOMBRES_CONTRATO),     # Posición AN
+    },
+}
+
+# Nombres legibles de los campos para los mensajes
+ETIQUETAS = {
+    'empresa': 'EMPRESA',
+    'motivo': 'MOTIVO DEL RETIRO',
+    'contrato': 'Tipo de Contrato',
+    'area': 'AREA',
+    'programa': 'PROGRAMA AL QUE PERTENECE',
+    'nombre': 'NOMBRE COMPLETO',
+    'documento': 'NUMERO DE DOCUMENTO',
+}
+
+NOMBRES_HOJA = {'planta': 'Planta', 'manipuladoras': 'Manipuladoras', 'aprendices': 'Aprendices'}
+
+# Esquemas resueltos por (hoja, huella del encabezado)
+_cache = {}
+_lock = threading.Lock()
+
+
+def normalizar_encabezado(texto):
+    """Normaliza un encabezado para compararlo: sin tildes, mayúsculas y espacios simples."""
+    texto = unicodedata.normalize('NFKD', str(texto))
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return ' '.join(texto.upper().split())
+
+
+def letra_columna(posicion):
+    """Convierte una posición (0 = A) en la letra de columna de la hoja de cálculo."""
+    letras = ''
+    posicion += 1
+    while posicion > 0:
+        posicion, resto = divmod(posicion - 1, 26)
+        letras = chr(ord('A') + resto) + letras
+    return letras
+
+
+def encabezados_hoja(df):
+    """Retorna el encabezado original de la hoja (sin las columnas derivadas)."""
+    return [str(c) for c in df.columns if c not in COLUMNAS_DERIVADAS]
+
+
+def huella_encabezado(encabezados):
+    """Hash del encabezado; identifica la versión del esquema de la hoja."""
+    return hashlib.sha1('\x1f'.join(encabezados).encode('utf-8')).hexdigest()
+
+
+class Esquema:
+    """
+    Correspondencia entre campos lógicos (contrato, area, ...) y columnas físicas de una hoja.
+    """
+
+    def __init__(self, hoja, huella, columnas, problemas):
+        self.hoja = hoja
+        self.huella = huella
+        self.columnas = columnas
+        self.problemas = problemas
+
+    def __getitem__(self, campo):
+        return self.columnas.get(campo)
+
+    def get(self, campo, defecto=None):
+        columna = self.columnas.get(campo)
+        return defecto if columna is None else columna
+
+
+def _resolver(hoja, encabezados):
+    columnas = {}
+    problemas = {}
+    normalizados = [normalizar_encabezado(e) for e in encabezados]
+    nombre_hoja = NOMBRES_HOJA.get(hoja, hoja)
+
+    for campo, (posicion, alternativos) in CAMPOS.get(hoja, {}).items():
+        esperados = {normalizar_encabezado(n) for n in alternativos}
+
+        # Campos sin posición conocida: solo por nombre, sin suponer ninguna columna
+        if posicion is None:
+            columnas[campo] = next((encabezados[i] for i, n in enumerate(normalizados) if n in esperados), None)
+            if columnas[campo] is None:
+                problemas[campo] = f"{ETIQUETAS.get(campo, campo)} ({nombre_hoja}): no hay columna con ese nombre"
+            continue
+
+        etiqueta = f"{ETIQUETAS.get(campo, campo)} ({nombre_hoja}, posición {letra_columna(posicion)})"
+
+        # 1. La columna está en la posición esperada y su nombre coincide
+        if posicion < len(encabezados) and normalizados[posicion] in esperados:
+            columnas[campo] = encabezados[posicion]
+            continue
+
+        # 2. La columna se movió: buscar por nombre
+        por_nombre = next((encabezados[i] for i, n in enumerate(normalizados) if n in esperados), None)
+        if por_nombre is not None:
+            columnas[campo] = por_nombre
+            problemas[campo] = (
+                f"{etiqueta}: encontrada por nombre en la posición "
+                f"{letra_columna(encabezados.index(por_nombre))}"
+            )
+            continue
+
+        # 3. Sin coincidencia de nombre: se usa la posición (comportamiento histórico)
+        if posicion < len(encabezados):
+            columnas[campo] = encabezados[posicion]
+            problemas[campo] = f"{etiqueta}: se usa '{encabezados[posicion]}' sin validar el nombre"
+            continue
+
+        columnas[campo] = None
+        problemas[campo] = f"{etiqueta}: no encontrada"
+
+    return columnas, problemas
+
+
+# Función para obtener el esquema de una hoja
+def obtener_esquema(hoja, df):
+    """
+    Retorna el Esquema de la hoja ('planta', 'manipuladoras' o 'aprendices').
+    La resolución se hace una vez por encabezado distinto y luego se reutiliza.
+    """
+    encabezados = encabezados_hoja(df)
+    huella = huella_encabezado(encabezados)
+    clave = (hoja, huella)
+    esquema = _cache.get(clave)
+    if esquema is None:
+        columnas, problemas = _resolver(hoja, encabezados)
+        esquema = Esquema(hoja, huella, columnas, problemas)
+        with _lock:
+            _cache[clave] = esquema
+    return esquema
+
+
+def obtener_esquemas(data_dict):
+    """Retorna los esquemas de todas las hojas de data_dict."""
+    return {hoja: obtener_esquema(hoja, df) for hoja, df in data_dict.items()}
+
+
+# Función para mostrar un único diagnóstico de columnas por página
+def mostrar_diagnostico(esquemas, campos_por_hoja):
+    """
+    Muestra una sola advertencia con los campos que la página necesita y que
+    no se encontraron o no coinciden con el encabezado esperado.
+    """
+    faltantes = []
+    avisos = []
+    for hoja, campos in campos_por_hoja.items():
+        esquema = esquemas.get(hoja)
+        if esquema is None:
+            continue
+        for campo in campos:
+            problema = esquema.problemas.get(campo)
+            if problema is None:
+                continue
+            if esquema[campo] is None:
+                faltantes.append(problema)
+            else:
+                avisos.append(problema)
+
+    if faltantes:
+        st.warning(f"No se encontraron las siguientes columnas: {'; '.join(faltantes)}")
+        st.info("Por favor, verifica los nombres o posiciones de las columnas en los datos.")
+    if avisos:
+        st.caption(f"Encabezados distintos a los esperados: {'; '.join(avisos)}")
@@ -0,0 +1,149 @@
+import streamlit as st
+import pandas as pd
+import plotly.express as px
+from utils import load_all_data, version_datos
+from registros import obtener_registros, ORIGENES
+from dotacion import serie_dotacion, FRECUENCIAS
+from cambios import obtener_conteo
+import instrumentacion
+from instrumentacion import medir
+
+# Dimensiones por las que se puede desagregar la dotación
+AGRUPACIONES = {
+    'Sin agrupar': [],
+    'Origen': ['origen'],
+    'Área': ['area'],
+    'Tipo de Contrato': ['contrato'],
+    'Sede': ['sitio'],
+    'Origen y Tipo de Contrato': ['origen', 'contrato'],
+}
+
+# Serie cacheada por versión de datos y filtros (la tabla de registros no se hashea)
+@st.cache_data(ttl=3600, max_entries=32, show_spinner=False)
+def serie_cacheada(version, origenes, por, frecuencia, fecha_inicio, fecha_fin, _registros):
+    """
+    Retorna la serie de dotación para los orígenes y la agrupación seleccionados.
+    """
+    registros = _registros[_registros['origen'].isin(origenes)]
+    return serie_dotacion(registros, por=list(por), frecuencia=frecuencia,
+                          fecha_inicio=fecha_inicio, fecha_fin=fecha_fin)
+
+def run():
+    """
+    Módulo que muestra la evolución de la dotación (personas activas por día o por mes)
+    de Planta, Manipuladoras y Aprendices, a partir de las fechas de ingreso y retiro.
+    """
+    # Cargar datos
+    instrumentacion.etapa('carga')
+    with st.spinner("Cargando datos..."):
+        data_dict = load_all_data()
+        registros = obtener_registros(data_dict)
+
+    # ---------- FILTROS EN LA BARRA LATERAL ----------
+    instrumentacion.etapa('filtros_sidebar')
+    st.sidebar.header("Filtros")
+
+    # 1. ORIGEN DE LOS DATOS
+    todos_origenes = list(ORIGENES.values())
+    origenes_seleccionados = st.sidebar.multiselect(
+        "Origen",
+        options=todos_origenes,
+        default=todos_origenes,
+        key="origenes_evolucion"
+    )
+    if not origenes_seleccionados:
+        st.sidebar.warning("Por favor, seleccione al menos un origen.")
+        origenes_seleccionados = todos_origenes
+
+    # 2. AGRUPACIÓN Y FRECUENCIA
+    agrupacion = st.sidebar.selectbox("Agrupar por", list(AGRUPACIONES), key="agrupacion_evolucion")
+    frecuencia = st.sidebar.radio(
+        "Frecuencia",
+        options=['M', 'D'],
+        format_func=lambda f: FRECUENCIAS[f],
+        key="frecuencia_evolucion"
+    )
+
+    # 3. RANGO DE FECHAS
+    st.sidebar.subheader("Rango de Fechas")
+    fechas_ingreso = registros['fecha_ingreso'].dropna()
+    hoy = pd.Timestamp.now().normalize()
+    if fechas_ingreso.empty:
+        min_date = hoy - pd.Timedelta(days=365)
+    else:
+        min_date = fechas_ingreso.min()
+    max_date = max(hoy, registros['fecha_retiro'].max()) if registros['fecha_retiro'].notna().any() else hoy
+
+    date_range = st.sidebar.date_input(
+        "Seleccione rango de fechas",
+        value=(min_date.date(), max_date.date()),
+        key="date_range_evolucion"
+    )
+    if not hasattr(date_range, '__len__'):
+        date_range = (date_range, date_range)
+    elif len(date_range) == 1:
+        date_range = (date_range[0], date_range[0])
+    fecha_min = pd.Timestamp(date_range[0])
+    fecha_max = pd.Timestamp(date_range[1])
+
+    # ---------- CÁLCULO DE LA SERIE ----------
+    # Sobre el conteo mantenido (registros agrupados por dimensiones y fechas)
+    conteo = obtener_conteo(data_dict)
+    instrumentacion.etapa('agregacion', filas=len(conteo))
+    serie = serie_cacheada(
+        version_datos(data_dict),
+        tuple(origenes_seleccionados),
+        tuple(AGRUPACIONES[agrupacion]),
+        frecuencia,
+        fecha_min,
+        fecha_max,
+        conteo
+    )
+
+    st.header("Evolución de la Dotación")
+
+    if serie.empty:
+        st.warning("No hay datos disponibles con los filtros seleccionados.")
+        return
+
+    st.caption(
+        "Personas activas según sus fechas de ingreso y retiro. "
+        "Los registros sin fecha de ingreso y los RETIRADO sin fecha de retiro no se incluyen."
+    )
+
+    # Métricas al cierre del periodo
+    ultimo = serie.iloc[-1]
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric(f"Activos al {serie.index[-1].strftime('%d/%m/%Y')}", int(ultimo.sum()))
+    with col2:
+        st.metric(f"Activos al {serie.index[0].strftime('%d/%m/%Y')}", int(serie.iloc[0].sum()))
+
+    # ---------- GRÁFICO ----------
+    instrumentacion.etapa('graficos')
+    datos_grafico = serie.reset_index().melt(id_vars='Fecha', var_name='Grupo', value_name='Activos')
+    fig = px.line(
+        datos_grafico,
+        x='Fecha',
+        y='Activos',
+        color='Grupo' if agrupacion != 'Sin agrupar' else None,
+        title=f"Dotación {FRECUENCIAS[frecuencia].lower()}" + (f" por {agrupacion.lower()}" if agrupacion != 'Sin agrupar' else ''),
+        labels={'Activos': 'Personas activas', 'Grupo': agrupacion},
+        height=500
+    )
+    fig.update_layout(plot_bgcolor='rgba(240, 240, 240, 0.5)')
+    with medir('render'):
+        st.plotly_chart(fig, use_container_width=True)
+
+    # ---------- TABLAS ----------
+    st.subheader("Dotación al cierre del periodo")
+    cierre = ultimo.rename_axis('Grupo').reset_index(name='Activos')
+    cierre = cierre.sort_values('Activos', ascending=False)
+    with medir('render', filas=len(cierre)):
+        st.dataframe(cierre, use_container_width=True)
+
+    with st.expander("Ver serie completa"):
+        tabla = serie.copy()
+        tabla.index = tabla.index.strftime('%Y-%m-%d')
+        with medir('render', filas=len(tabla)):
+            st.dataframe(tabla, use_container_width=True)
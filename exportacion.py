@@ -0,0 +1,161 @@
+import tempfile
+
+import streamlit as st
+from openpyxl import Workbook
+
+from esquema import COLUMNAS_DERIVADAS
+from registros import ORIGENES, ETIQUETAS
+from instrumentacion import medir
+
+# Filas que se convierten a la vez (la memoria depende del bloque, no del total exportado)
+TAMANO_BLOQUE = 5000
+
+# Límite de filas de una hoja de Excel (incluido el encabezado)
+MAX_FILAS_EXCEL = 1048576
+
+# Los archivos más grandes que esto se escriben en disco mientras se generan
+MAX_MEMORIA_ARCHIVO = 8 * 1024 * 1024
+
+FORMATOS = {
+    'csv': ('CSV', 'text/csv'),
+    'xlsx': ('Excel', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+}
+
+TODOS = 'Todos'
+
+HOJA_POR_ORIGEN = {origen: hoja for hoja, origen in ORIGENES.items()}
+
+
+def columnas_originales(df):
+    """Columnas de la hoja tal como vienen de Google Sheets (sin las derivadas por el cargador)."""
+    return [c for c in df.columns if c not in COLUMNAS_DERIVADAS]
+
+
+def bloques(df, indices, columnas, tamano=TAMANO_BLOQUE):
+    """Recorre las filas 'indices' (etiquetas del índice de df) en bloques de 'tamano' filas."""
+    for inicio in range(0, len(indices), tamano):
+        yield df.loc[indices[inicio:inicio + tamano], columnas]
+
+
+# Función para escribir el CSV de la exportación por bloques
+def escribir_csv(destino, partes, tamano=TAMANO_BLOQUE):
+    """
+    Escribe en 'destino' (archivo binario) el CSV de las partes ((origen, df, indices,
+    columnas)) bloque por bloque (ver bloques), en UTF-8 con BOM para que Excel reconozca
+    las tildes: el BOM y el encabezado van solo en el primer bloque. Con varias partes las
+    columnas se unen (en orden de aparición) y se agrega 'Origen'.
+    """
+    varias = len(partes) > 1
+    union = ['Origen'] + list(dict.fromkeys(c for _, _, _, columnas in partes for c in columnas))
+    primero = True
+    for origen, df, indices, columnas in partes:
+        for bloque in bloques(df, indices, columnas, tamano):
+            if varias:
+                bloque = bloque.reindex(columns=union)
+                bloque['Origen'] = origen
+            bloque.to_csv(destino, index=False, header=primero, encoding='utf-8-sig' if primero else 'utf-8')
+            primero = False
+
+
+# Función para escribir un libro de Excel fila por fila
+def escribir_excel(destino, partes, tamano=TAMANO_BLOQUE):
+    """
+    Escribe un libro con una hoja por parte ((nombre, df, indices, columnas)) usando el modo
+    de solo escritura de openpyxl: las filas se vuelcan a medida que se agregan en lugar de
+    mantener el libro completo en memoria como DataFrame.to_excel.
+    """
+    libro = Workbook(write_only=True)
+    for nombre, df, indices, columnas in partes:
+        hoja, numero, filas = libro.create_sheet(nombre[:31]), 1, 0
+        hoja.append(columnas)
+        for bloque in bloques(df, indices, columnas, tamano):
+            bloque = bloque.astype(object).where(bloque.notna(), None)
+            for fila in bloque.itertuples(index=False, name=None):
+                if filas == MAX_FILAS_EXCEL - 1:
+                    numero, filas = numero + 1, 0
+                    hoja = libro.create_sheet(f"{nombre[:26]} ({numero})")
+                    hoja.append(columnas)
+                hoja.append(fila)
+                filas += 1
+    if not libro.worksheets:
+        libro.create_sheet('Sin datos')
+    libro.save(destino)
+
+
+def preparar_archivo(data_dict, filas, formato):
+    """
+    Escribe el archivo de exportación de los registros 'filas' (subconjunto de la tabla
+    unificada) con las columnas originales de cada hoja y lo retorna como archivo temporal,
+    posicionado al inicio. Excel lleva una hoja por origen; CSV agrega la columna 'Origen'
+    si hay más de uno.
+    """
+    partes = []
+    for origen in [o for o in ORIGENES.values() if (filas['origen'] == o).any()]:
+        df = data_dict[HOJA_POR_ORIGEN[origen]]
+        indices = filas.loc[filas['origen'] == origen, 'indice_origen'].to_numpy()
+        partes.append((origen, df, indices, columnas_originales(df)))
+
+    archivo = tempfile.SpooledTemporaryFile(max_size=MAX_MEMORIA_ARCHIVO)
+    if formato == 'xlsx':
+        escribir_excel(archivo, partes)
+    else:
+        escribir_csv(archivo, partes)
+    archivo.seek(0)
+    return archivo
+
+
+# Función para mostrar la sección de exportación de una página
+def mostrar_exportacion(data_dict, filas, dimensiones, clave):
+    """
+    Permite descargar los registros detrás de un conteo de la página: 'filas' son los
+    registros ya filtrados (tabla unificada) y con los selectores se elige el origen y el
+    valor de cada dimensión (por ejemplo un área y un tipo de contrato).
+    """
+    with st.expander("⬇️ Exportar registros filtrados"):
+        if filas.empty:
+            st.info("No hay registros para exportar con los filtros seleccionados.")
+            return
+
+        origenes = [o for o in ORIGENES.values() if (filas['origen'] == o).any()]
+        origen = st.selectbox(
+            "Origen",
+            options=[TODOS] + origenes if len(origenes) > 1 else origenes,
+            key=f"exportar_origen_{clave}"
+        )
+        seleccion = filas if origen == TODOS else filas[filas['origen'] == origen]
+
+        columnas = st.columns(len(dimensiones)) if dimensiones else []
+        for columna, dimension in zip(columnas, dimensiones):
+            valores = sorted(seleccion[dimension].dropna().astype(str).unique())
+            if not valores:
+                continue
+            with columna:
+                valor = st.selectbox(
+                    ETIQUETAS.get(dimension, dimension),
+                    options=[TODOS] + valores,
+                    key=f"exportar_{dimension}_{clave}"
+                )
+            if valor != TODOS:
+                seleccion = seleccion[seleccion[dimension].astype(str) == valor]
+
+        formato = st.radio(
+            "Formato",
+            options=list(FORMATOS),
+            format_func=lambda f: FORMATOS[f][0],
+            key=f"exportar_formato_{clave}"
+        )
+        st.caption(f"{len(seleccion)} registros seleccionados.")
+
+        # El archivo solo se genera al pedirlo (no en cada interacción con la página)
+        if st.button("Preparar archivo", key=f"exportar_preparar_{clave}", disabled=seleccion.empty):
+            # Streamlit guarda el archivo terminado en su almacén de descargas (en memoria):
+            # la memoria máxima es la del archivo, aunque el libro de Excel se escriba por bloques
+            with medir('exportacion', filas=len(seleccion), formato=formato):
+                with preparar_archivo(data_dict, seleccion, formato) as archivo:
+                    st.download_button(
+                        f"Descargar {FORMATOS[formato][0]}",
+                        data=archivo,
+                        file_name=f"registros_{clave}.{formato}",
+                        mime=FORMATOS[formato][1],
+                        key=f"exportar_descargar_{clave}"
+                    )
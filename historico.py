@@ -0,0 +1,281 @@
+import json
+import mmap
+import os
+import threading
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+import conversion
+
+# Carpeta del histórico. Vacío (por defecto) = no se guardan instantáneas; se activa con
+# INDICADORES_HISTORICO=<carpeta>
+DIRECTORIO_HISTORICO = os.environ.get('INDICADORES_HISTORICO', '')
+
+# Hojas que se guardan (nombre de la hoja en Google Sheets)
+HOJAS = ['Planta', 'Manipuladoras', 'Aprendices']
+
+# Código de las celdas vacías en las matrices de filas
+VACIO = -1
+
+_lock = threading.Lock()
+
+
+def clave_fecha(fecha):
+    """Fecha como texto AAAA-MM-DD (acepta date, datetime, Timestamp o texto)."""
+    return pd.Timestamp(fecha).date().isoformat()
+
+
+def a_tramos(ids):
+    """
+    Comprime los identificadores de fila de una instantánea en tramos (inicio, largo) de
+    identificadores consecutivos: una hoja que no cambió es un solo tramo.
+    """
+    ids = np.asarray(ids, dtype=np.int64)
+    if len(ids) == 0:
+        return np.zeros((0, 2), dtype=np.int64)
+    inicios = np.r_[0, np.flatnonzero(np.diff(ids) != 1) + 1]
+    largos = np.diff(np.r_[inicios, len(ids)])
+    return np.column_stack([ids[inicios], largos])
+
+
+def desde_tramos(tramos):
+    """Identificadores de fila de una instantánea a partir de sus tramos."""
+    tramos = np.asarray(tramos, dtype=np.int64).reshape(-1, 2)
+    if len(tramos) == 0:
+        return np.zeros(0, dtype=np.int64)
+    inicios, largos = tramos[:, 0], tramos[:, 1]
+    desplazamiento = np.repeat(inicios - np.r_[0, np.cumsum(largos)[:-1]], largos)
+    return desplazamiento + np.arange(largos.sum())
+
+
+class HistoricoHoja:
+    """
+    Instantáneas diarias de una hoja, deduplicadas en tres niveles:
+
+    - valores.jsonl: cada valor de celda distinto, una sola vez (diccionario, solo se agrega),
+      con valores_posiciones.npy (byte de inicio de cada línea) y valores_hashes.npy
+      (hash de cada línea) para buscar y leer valores sin recorrer el diccionario.
+    - bloque_NNNNN.npz: las filas distintas como códigos del diccionario, comprimidas y por
+      columna (una por refresco, con solo las filas nuevas) y claves.npy con el hash de
+      cada fila.
+    - instantanea_AAAA-MM-DD.npy: las filas de la hoja ese día como tramos de identificadores.
+
+    Un refresco sin cambios no escribe nada y uno con cambios agrega solo los valores y
+    filas nuevos, así que el espacio crece con los cambios y no con instantáneas × filas.
+    """
+
+    def __init__(self, hoja, directorio=DIRECTORIO_HISTORICO):
+        self.hoja = hoja
+        self.directorio = os.path.join(directorio, hoja.lower())
+        self.ruta_indice = os.path.join(self.directorio, 'indice.json')
+        self.ruta_valores = os.path.join(self.directorio, 'valores.jsonl')
+        self.ruta_posiciones = os.path.join(self.directorio, 'valores_posiciones.npy')
+        self.ruta_hashes = os.path.join(self.directorio, 'valores_hashes.npy')
+        self.ruta_claves = os.path.join(self.directorio, 'claves.npy')
+
+    def _ruta(self, archivo):
+        return os.path.join(self.directorio, archivo)
+
+    def leer_indice(self):
+        """Bloques de filas e instantáneas guardadas (ordenadas por fecha)."""
+        try:
+            with open(self.ruta_indice, encoding='utf-8') as archivo:
+                return json.load(archivo)
+        except FileNotFoundError:
+            return {'bloques': [], 'instantaneas': []}
+
+    def _escribir_indice(self, indice):
+        temporal = self.ruta_indice + '.tmp'
+        with open(temporal, 'w', encoding='utf-8') as archivo:
+            json.dump(indice, archivo, ensure_ascii=False, indent=1)
+        os.replace(temporal, self.ruta_indice)
+
+    def _indice_valores(self):
+        """
+        (posiciones, hashes) del diccionario: byte de inicio de cada línea de valores.jsonl
+        y hash de 64 bits de cada línea.
+        """
+        if os.path.exists(self.ruta_posiciones):
+            return np.load(self.ruta_posiciones), np.load(self.ruta_hashes)
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.uint64)
+
+    def codificar(self, matriz):
+        """
+        Reemplaza cada celda de la matriz por su código en el diccionario (VACIO si está
+        vacía), agregando al diccionario los valores nuevos. Solo se serializan los valores
+        distintos de la matriz y se buscan por su hash, sin leer el diccionario.
+        """
+        codigos, distintos = pd.factorize(matriz.ravel())
+        posiciones, hashes = self._indice_valores()
+        claves = np.array([json.dumps(v, ensure_ascii=False, default=str) for v in distintos], dtype=object)
+        hashes_claves = pd.util.hash_array(claves, categorize=False)
+        traduccion = pd.Index(hashes).get_indexer(hashes_claves).astype(np.int32)
+
+        faltan = traduccion < 0
+        if faltan.any():
+            nuevos, primera, inversa = np.unique(hashes_claves[faltan], return_index=True, return_inverse=True)
+            lineas = [(claves[faltan][i] + '\n').encode('utf-8') for i in primera]
+            with open(self.ruta_valores, 'ab') as archivo:
+                # Desde el final real del archivo (una escritura interrumpida no desplaza los códigos)
+                inicio = archivo.seek(0, os.SEEK_END)
+                archivo.write(b''.join(lineas))
+            largos = np.array([len(linea) for linea in lineas], dtype=np.int64)
+            posiciones = np.concatenate([posiciones, inicio + np.r_[0, np.cumsum(largos)[:-1]]])
+            traduccion[faltan] = len(hashes) + inversa.ravel()
+            hashes = np.concatenate([hashes, nuevos])
+            np.save(self.ruta_posiciones, posiciones)
+            np.save(self.ruta_hashes, hashes)
+        return np.append(traduccion, VACIO).astype(np.int32)[codigos].reshape(matriz.shape)
+
+    def decodificar(self, codigos):
+        """Matriz de valores (None en las vacías) de una matriz de códigos; solo se leen las líneas usadas."""
+        usados, inversa = np.unique(codigos, return_inverse=True)
+        valores = np.empty(len(usados), dtype=object)
+        validos = usados != VACIO
+        if validos.any():
+            posiciones, _ = self._indice_valores()
+            with open(self.ruta_valores, 'rb') as archivo, mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ) as datos:
+                valores[validos] = [
+                    json.loads(datos[posiciones[c]:datos.find(b'\n', posiciones[c])]) for c in usados[validos].tolist()
+                ]
+        return valores[inversa.reshape(codigos.shape)]
+
+    def guardar(self, values, version, columnas_origen=None, fecha=None):
+        """
+        Guarda la respuesta 'values' de la API como la instantánea del día (reemplaza la de
+        ese día si ya existe). Retorna False si la versión es la de la última instantánea.
+        """
+        fecha = clave_fecha(fecha or date.today())
+        encabezado, filas = list(values[0]), values[1:]
+        with _lock:
+            os.makedirs(self.directorio, exist_ok=True)
+            indice = self.leer_indice()
+            instantaneas = indice['instantaneas']
+            if instantaneas and instantaneas[-1]['version'] == version:
+                return False
+
+            matriz = conversion.matriz_desde_filas(filas, len(encabezado))
+            matriz[matriz == ''] = None
+            codigos = self.codificar(matriz)
+
+            # Filas nuevas: hash de sus códigos frente a los de las filas ya guardadas
+            hashes = pd.util.hash_pandas_object(pd.DataFrame(codigos), index=False).to_numpy()
+            existentes = np.load(self.ruta_claves) if os.path.exists(self.ruta_claves) else np.zeros(0, np.uint64)
+            ids = pd.Index(existentes).get_indexer(hashes).astype(np.int64)
+            faltantes = ids < 0
+            if faltantes.any():
+                nuevos, primera, inversa = np.unique(hashes[faltantes], return_index=True, return_inverse=True)
+                # Nuevas filas en el orden en que aparecen en la hoja (tramos más largos)
+                orden = np.argsort(primera, kind='stable')
+                rango = np.empty(len(orden), dtype=np.int64)
+                rango[orden] = np.arange(len(orden))
+                ids[faltantes] = len(existentes) + rango[inversa.ravel()]
+                archivo = f"bloque_{len(indice['bloques']):05d}.npz"
+                filas_nuevas = codigos[np.flatnonzero(faltantes)[primera[orden]]]
+                np.savez_compressed(
+                    self._ruta(archivo), **{f'c{j}': filas_nuevas[:, j] for j in range(filas_nuevas.shape[1])}
+                )
+                np.save(self.ruta_claves, np.concatenate([existentes, nuevos[orden]]))
+                indice['bloques'].append({'archivo': archivo, 'filas': int(len(orden)), 'ancho': len(encabezado)})
+
+            archivo = f"instantanea_{fecha}.npy"
+            np.save(self._ruta(archivo), a_tramos(ids))
+            entrada = {
+                'fecha': fecha, 'version': version, 'archivo': archivo, 'encabezado': encabezado,
+                'filas': len(filas), 'columnas_origen': columnas_origen or {},
+            }
+            indice['instantaneas'] = [i for i in instantaneas if i['fecha'] != fecha] + [entrada]
+            indice['instantaneas'].sort(key=lambda i: i['fecha'])
+            self._escribir_indice(indice)
+        return True
+
+    def instantanea(self, fecha):
+        """Entrada del índice de la última instantánea guardada hasta 'fecha' (o None)."""
+        fecha = clave_fecha(fecha)
+        anteriores = [i for i in self.leer_indice()['instantaneas'] if i['fecha'] <= fecha]
+        return anteriores[-1] if anteriores else None
+
+    def leer(self, entrada):
+        """
+        Retorna la matriz de celdas (objetos, None en las vacías) de una instantánea. Solo
+        se descomprimen las columnas de los bloques que tienen filas de la instantánea y solo
+        se leen del diccionario los valores que aparecen en ellas.
+        """
+        ids = desde_tramos(np.load(self._ruta(entrada['archivo'])))
+        ancho = len(entrada['encabezado'])
+        codigos = np.full((len(ids), ancho), VACIO, dtype=np.int32)
+        inicio = 0
+        for bloque in self.leer_indice()['bloques']:
+            fin = inicio + bloque['filas']
+            en_bloque = (ids >= inicio) & (ids < fin)
+            if en_bloque.any():
+                posiciones = np.flatnonzero(en_bloque)
+                filas = ids[en_bloque] - inicio
+                with np.load(self._ruta(bloque['archivo'])) as columnas:
+                    for j in range(min(ancho, bloque['ancho'])):
+                        codigos[posiciones, j] = columnas[f'c{j}'][filas]
+            inicio = fin
+        return self.decodificar(codigos)
+
+
+# Función para guardar la instantánea de una hoja al refrescar los datos
+def guardar(hoja, values, version, columnas_origen=None):
+    """Agrega la respuesta de la API al histórico de la hoja (si el histórico está activo)."""
+    if not DIRECTORIO_HISTORICO:
+        return False
+    guardada = HistoricoHoja(hoja, DIRECTORIO_HISTORICO).guardar(values, version, columnas_origen)
+    if guardada:
+        _fechas_guardadas.clear()
+    return guardada
+
+
+def instantanea(hoja, fecha):
+    """Entrada de la instantánea más cercana (anterior o igual) a la fecha, o None."""
+    if not DIRECTORIO_HISTORICO:
+        return None
+    return HistoricoHoja(hoja, DIRECTORIO_HISTORICO).instantanea(fecha)
+
+
+def leer(hoja, entrada):
+    """Matriz de celdas de la instantánea 'entrada' de la hoja (ver HistoricoHoja.leer)."""
+    return HistoricoHoja(hoja, DIRECTORIO_HISTORICO).leer(entrada)
+
+
+# Fechas guardadas, leídas de los índices a lo sumo una vez por minuto (guardar() las descarta)
+@st.cache_data(ttl=60, show_spinner=False)
+def _fechas_guardadas(directorio, hojas):
+    fechas = {i['fecha'] for hoja in hojas for i in HistoricoHoja(hoja, directorio).leer_indice()['instantaneas']}
+    return sorted(fechas, reverse=True)
+
+
+def fechas_disponibles(hojas=HOJAS):
+    """Fechas con alguna instantánea guardada, de la más reciente a la más antigua."""
+    if not DIRECTORIO_HISTORICO:
+        return []
+    return _fechas_guardadas(DIRECTORIO_HISTORICO, tuple(hojas))
+
+
+# Función para elegir en la barra lateral la fecha de los datos
+def selector_fecha(hojas=HOJAS):
+    """
+    Muestra el selector de la fecha de los datos si hay instantáneas guardadas. Con una
+    fecha elegida, utils.load_all_data() retorna las hojas tal como estaban ese día.
+    """
+    fechas = fechas_disponibles(hojas)
+    if not fechas:
+        return None
+    return st.sidebar.selectbox(
+        "Datos al",
+        options=[None] + fechas,
+        format_func=lambda f: "Hoy (datos actuales)" if f is None else f,
+        key="fecha_historico",
+        help="Muestra el dashboard con las hojas tal como estaban en esa fecha (última instantánea guardada hasta ese día)."
+    )
+
+
+def fecha_consulta():
+    """Fecha de los datos elegida en la sesión (None = datos actuales)."""
+    return st.session_state.get('fecha_historico')
@@ -0,0 +1,149 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from esquema import obtener_esquema, NOMBRES_HOJA
+from registros import obtener_registros, ORIGENES
+from utils import version_datos
+
+# Modos de conteo de las páginas
+MODOS_CONTEO = {
+    'registros': 'Registros',
+    'personas': 'Personas distintas',
+}
+
+
+def normalizar_documento(serie):
+    """Documento comparable: solo letras y dígitos, en mayúsculas y sin ceros a la izquierda."""
+    texto = serie.astype('string').str.upper().str.replace(r'[^0-9A-Z]', '', regex=True).str.lstrip('0')
+    return texto.mask(texto == '')
+
+
+def claves_persona(registros):
+    """
+    Clave de identidad (hash de 64 bits) de cada registro de la tabla unificada: el hash del
+    documento normalizado, de modo que los registros de una misma persona en cualquier hoja
+    comparten la clave. Un registro sin documento es una persona aparte (clave propia).
+    """
+    documento = normalizar_documento(registros['documento'])
+    respaldo = (
+        'SIN DOCUMENTO|' + registros['origen'].astype(str) + '|' + registros['indice_origen'].astype(str)
+    ).astype('string')
+    clave = documento.fillna(respaldo).to_numpy(dtype=object)
+    return pd.util.hash_array(clave, categorize=False).view(np.int64)
+
+
+class IndiceIdentidad:
+    """
+    Índice de identidad de la tabla unificada: persona (código denso) de cada registro y,
+    por persona, sus registros contiguos (formato CSR) y las hojas en que aparece.
+    """
+
+    def __init__(self, registros):
+        self.persona = claves_persona(registros)
+        self.codigos, claves = pd.factorize(self.persona)
+        self.claves = pd.Index(claves)
+        self.personas = len(self.claves)
+        self.sin_documento = int(normalizar_documento(registros['documento']).isna().sum())
+
+        # Registros de cada persona contiguos
+        self.posiciones = np.argsort(self.codigos, kind='stable')
+        self.inicios = np.searchsorted(self.codigos[self.posiciones], np.arange(self.personas + 1))
+        self.registros_por_persona = np.diff(self.inicios)
+
+        # Hojas de cada persona como máscara de bits (una por origen)
+        origenes = list(ORIGENES.values())
+        bits = np.left_shift(1, pd.Categorical(registros['origen'].astype(object), categories=origenes).codes.astype(np.int64))
+        if self.personas:
+            mascara = np.bitwise_or.reduceat(bits[self.posiciones], self.inicios[:-1])
+        else:
+            mascara = np.zeros(0, dtype=np.int64)
+        self.hojas_por_persona = sum((mascara >> i) & 1 for i in range(len(origenes)))
+
+    def registros_de(self, documento):
+        """Posiciones en la tabla unificada de los registros con ese documento."""
+        normalizado = normalizar_documento(pd.Series([documento])).iloc[0]
+        if pd.isna(normalizado):
+            return np.array([], dtype=np.int64)
+        clave = pd.util.hash_array(np.array([normalizado], dtype=object), categorize=False).view(np.int64)[0]
+        codigo = self.claves.get_indexer([clave])[0]
+        if codigo < 0:
+            return np.array([], dtype=np.int64)
+        return self.posiciones[self.inicios[codigo]:self.inicios[codigo + 1]]
+
+    def resumen(self):
+        """Cantidad de registros y de personas, con las que se repiten entre filas y hojas."""
+        return {
+            'registros': len(self.persona),
+            'personas': self.personas,
+            'con_varios_registros': int((self.registros_por_persona > 1).sum()),
+            'en_varias_hojas': int((self.hojas_por_persona > 1).sum()),
+            'sin_documento': self.sin_documento,
+        }
+
+
+# Índice construido una vez por versión de los datos (compartido entre sesiones)
+@st.cache_resource(ttl=3600, max_entries=2, show_spinner=False)
+def _identidad_por_version(version, _registros):
+    return IndiceIdentidad(_registros)
+
+
+def obtener_identidad(data_dict):
+    """Retorna el IndiceIdentidad de la versión actual de los datos."""
+    return _identidad_por_version(version_datos(data_dict), obtener_registros(data_dict))
+
+
+def personas_de(data_dict, filas):
+    """Clave de persona de cada fila de un subconjunto de la tabla unificada (por su índice)."""
+    registros = obtener_registros(data_dict)
+    return obtener_identidad(data_dict).persona[registros.index.get_indexer(filas.index)]
+
+
+def hojas_sin_documento(data_dict):
+    """Hojas con registros en las que no se encontró la columna de documento por su encabezado."""
+    return [
+        NOMBRES_HOJA[hoja] for hoja in ORIGENES
+        if data_dict.get(hoja) is not None and not data_dict[hoja].empty
+        and obtener_esquema(hoja, data_dict[hoja])['documento'] is None
+    ]
+
+
+# Función para elegir entre contar registros o personas distintas
+def selector_conteo(clave, data_dict):
+    """
+    Muestra en la barra lateral el modo de conteo y retorna True si se cuentan personas.
+    Sin columna de documento en ninguna hoja el modo por personas queda deshabilitado; si
+    falta en algunas se advierte que sus registros cuentan cada uno como una persona.
+    """
+    sin_documento = hojas_sin_documento(data_dict)
+    hojas = [h for h in ORIGENES if data_dict.get(h) is not None and not data_dict[h].empty]
+    deshabilitado = len(sin_documento) == len(hojas)
+    modo = st.sidebar.radio(
+        "Contar",
+        options=list(MODOS_CONTEO),
+        format_func=lambda m: MODOS_CONTEO[m],
+        key=f"modo_conteo_{clave}",
+        disabled=deshabilitado,
+        help="Personas distintas agrupa los registros con el mismo número de documento en cualquier hoja."
+    )
+    if deshabilitado:
+        st.sidebar.caption("Conteo por personas no disponible: no se encontró la columna de documento.")
+        return False
+    if modo == 'personas' and sin_documento:
+        st.sidebar.warning(
+            f"Sin columna de documento en {', '.join(sin_documento)}: "
+            "cada registro de esas hojas se cuenta como una persona distinta."
+        )
+    return modo == 'personas'
+
+
+# Función para mostrar el resumen de identidades
+def mostrar_resumen_identidad(data_dict):
+    """Muestra cuántas personas hay detrás de los registros y cuántas se repiten."""
+    resumen = obtener_identidad(data_dict).resumen()
+    st.caption(
+        f"Conteo por personas distintas: {resumen['registros']} registros corresponden a "
+        f"{resumen['personas']} personas ({resumen['con_varios_registros']} con más de un registro, "
+        f"{resumen['en_varias_hojas']} en más de una hoja; {resumen['sin_documento']} registros "
+        "sin documento se cuentan como personas distintas)."
+    )
@@ -2,6 +2,15 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime, timedelta
 from utils import load_all_data
+from esquema import obtener_esquemas, mostrar_diagnostico
+from reportes import obtener_reporte
+from comparacion import selector_periodo_comparacion, obtener_comparacion, mostrar_comparacion, filas_en_rango
+from registros import obtener_registros
+from exportacion import mostrar_exportacion
+from visor import mostrar_visor
+from identidad import selector_conteo, mostrar_resumen_identidad
+import instrumentacion
+from instrumentacion import medir
 
 def run():
     """
@@ -9,6 +18,7 @@ def run():
     combinando datos de las tablas Manipuladoras y Planta, con filtros en la barra lateral.
     """
     # Cargar datos
+    instrumentacion.etapa('carga')
     with st.spinner("Cargando datos..."):
         data_dict = load_all_data()
         
@@ -17,6 +27,7 @@ def run():
         planta_df = data_dict['planta'].copy()
     
     # ---------- FILTROS EN LA BARRA LATERAL ----------
+    instrumentacion.etapa('filtros_sidebar')
     st.sidebar.header("Filtros")
     
     # 1. FILTRO DE TIPO DE NOVEDAD (MULTISELECT)
@@ -59,38 +70,7 @@ def run():
     # Determinar qué columnas de fechas usar según el filtro de novedad
     columnas_fecha = []
     
-    # Preparar las fechas en los DataFrames para el filtrado
-    # Fechas de ingreso para manipuladoras
-    if 'FECHA DE INGRESO (AAAAMMDD)' in manipuladoras_df.columns:
-        manipuladoras_df['fecha_ingreso'] = pd.to_datetime(
-            manipuladoras_df['FECHA DE INGRESO (AAAAMMDD)'], 
-            format='%Y%m%d', 
-            errors='coerce'
-        )
-    
-    # Fechas de retiro para manipuladoras
-    if 'FECHA DE RETIRO (AAAAMMDD)' in manipuladoras_df.columns:
-        manipuladoras_df['fecha_retiro'] = pd.to_datetime(
-            manipuladoras_df['FECHA DE RETIRO (AAAAMMDD)'], 
-            format='%Y%m%d', 
-            errors='coerce'
-        )
-    
-    # Fechas de ingreso para planta
-    if 'FECHA DE INGRESO (AAAAMMDD)' in planta_df.columns:
-        planta_df['fecha_ingreso'] = pd.to_datetime(
-            planta_df['FECHA DE INGRESO (AAAAMMDD)'], 
-            format='%Y%m%d', 
-            errors='coerce'
-        )
-    
-    # Fechas de retiro para planta
-    if 'FECHA DE RETIRO (AAAAMMDD)' in planta_df.columns:
-        planta_df['fecha_retiro'] = pd.to_datetime(
-            planta_df['FECHA DE RETIRO (AAAAMMDD)'], 
-            format='%Y%m%d', 
-            errors='coerce'
-        )
+    # Las columnas fecha_ingreso y fecha_retiro ya vienen convertidas por el cargador
     
     # Obtener todas las fechas según el tipo de novedad seleccionado
     fechas = []
@@ -137,108 +117,72 @@ def run():
     fecha_min = pd.Timestamp(date_range[0])
     fecha_max = pd.Timestamp(date_range[1])
     
-    # ---------- APLICAR FILTROS A LOS DATOS ----------
-    manipuladoras_filtradas = manipuladoras_df.copy()
-    planta_filtrada = planta_df.copy()
-    
-    # 1. Filtrar por tipo de novedad
-    if 'tipo_novedad' in manipuladoras_filtradas.columns:
-        manipuladoras_filtradas = manipuladoras_filtradas[
-            manipuladoras_filtradas['tipo_novedad'].isin(tipos_novedad_seleccionados)
-        ]
-    
-    if 'tipo_novedad' in planta_filtrada.columns:
-        planta_filtrada = planta_filtrada[
-            planta_filtrada['tipo_novedad'].isin(tipos_novedad_seleccionados)
-        ]
-    
-    # 2. Filtrar por fechas
-    # Crear máscaras para cada DataFrame
-    manipuladoras_mask = pd.Series(False, index=manipuladoras_filtradas.index)
-    planta_mask = pd.Series(False, index=planta_filtrada.index)
-    
-    # Aplicar filtros según tipo de novedad
-    if any(item in ["ACTIVO", "CASO ESPECIAL"] for item in tipos_novedad_seleccionados):
-        # Filtrar manipuladoras por fecha de ingreso
-        if 'fecha_ingreso' in manipuladoras_filtradas.columns:
-            mask_ingreso = (
-                (manipuladoras_filtradas['fecha_ingreso'] >= fecha_min) & 
-                (manipuladoras_filtradas['fecha_ingreso'] <= fecha_max) &
-                (manipuladoras_filtradas['tipo_novedad'].isin(['ACTIVO', 'CASO ESPECIAL']))
-            )
-            manipuladoras_mask = manipuladoras_mask | mask_ingreso
-        
-        # Filtrar planta por fecha de ingreso
-        if 'fecha_ingreso' in planta_filtrada.columns:
-            mask_ingreso = (
-                (planta_filtrada['fecha_ingreso'] >= fecha_min) & 
-                (planta_filtrada['fecha_ingreso'] <= fecha_max) &
-                (planta_filtrada['tipo_novedad'].isin(['ACTIVO', 'CASO ESPECIAL']))
-            )
-            planta_mask = planta_mask | mask_ingreso
+    # Periodo opcional para comparar las tablas
+    periodo_comparacion = selector_periodo_comparacion('indicadores', fecha_min, fecha_max)
     
-    if "RETIRADO" in tipos_novedad_seleccionados:
-        # Filtrar manipuladoras por fecha de retiro
-        if 'fecha_retiro' in manipuladoras_filtradas.columns:
-            mask_retiro = (
-                (manipuladoras_filtradas['fecha_retiro'] >= fecha_min) & 
-                (manipuladoras_filtradas['fecha_retiro'] <= fecha_max) &
-                (manipuladoras_filtradas['tipo_novedad'] == 'RETIRADO')
-            )
-            manipuladoras_mask = manipuladoras_mask | mask_retiro
-        
-        # Filtrar planta por fecha de retiro
-        if 'fecha_retiro' in planta_filtrada.columns:
-            mask_retiro = (
-                (planta_filtrada['fecha_retiro'] >= fecha_min) & 
-                (planta_filtrada['fecha_retiro'] <= fecha_max) &
-                (planta_filtrada['tipo_novedad'] == 'RETIRADO')
-            )
-            planta_mask = planta_mask | mask_retiro
-    
-    # Aplicar las máscaras
-    manipuladoras_filtradas = manipuladoras_filtradas[manipuladoras_mask]
-    planta_filtrada = planta_filtrada[planta_mask]
+    # Contar registros o personas distintas (mismo documento en cualquier hoja)
+    distintas = selector_conteo('indicadores', data_dict)
+    
+    # ---------- APLICAR FILTROS A LOS DATOS ----------
+    instrumentacion.etapa('filtrado')
+    filas_detalle = filas_en_rango(
+        obtener_registros(data_dict), tipos_novedad_seleccionados, fecha_min, fecha_max
+    )
+    filas_detalle = filas_detalle[filas_detalle['origen'].isin(['Planta', 'Manipuladoras'])]
+    registros_por_origen = filas_detalle['origen'].astype(object).value_counts()
     
     # ---------- MOSTRAR INFORMACIÓN DE RESULTADOS ----------
     col1, col2 = st.columns(2)
     with col1:
-        st.info(f"Registros filtrados en Manipuladoras: {len(manipuladoras_filtradas)}")
+        st.info(f"Registros filtrados en Manipuladoras: {registros_por_origen.get('Manipuladoras', 0)}")
     with col2:
-        st.info(f"Registros filtrados en Planta: {len(planta_filtrada)}")
+        st.info(f"Registros filtrados en Planta: {registros_por_origen.get('Planta', 0)}")
     
     # ---------- PROCESAMIENTO PARA LA TABLA DE RESULTADOS ----------
-    # Verificar que existan las columnas de tipo de contrato
-    if 'tipo_contrato' not in manipuladoras_filtradas.columns:
-        if 'TIPO DE CONTRATO' in manipuladoras_filtradas.columns:
-            manipuladoras_filtradas['tipo_contrato'] = manipuladoras_filtradas['TIPO DE CONTRATO']
-        else:
-            st.error("No se encontró la columna de tipo de contrato en la tabla Manipuladoras")
-            return
-        
-    if 'tipo_contrato' not in planta_filtrada.columns:
-        if 'TIPO DE CONTRATO' in planta_filtrada.columns:
-            planta_filtrada['tipo_contrato'] = planta_filtrada['TIPO DE CONTRATO']
-        else:
-            st.error("No se encontró la columna de tipo de contrato en la tabla Planta")
-            return
-    
-    # Combinar los tipos de contrato de ambas fuentes
-    tipos_contrato_manipuladoras = manipuladoras_filtradas['tipo_contrato'].dropna()
-    tipos_contrato_planta = planta_filtrada['tipo_contrato'].dropna()
-    
-    # Concatenar las series
-    todos_tipos_contrato = pd.concat([tipos_contrato_manipuladoras, tipos_contrato_planta])
+    instrumentacion.etapa('agregacion')
+    # Resolver la columna de tipo de contrato de cada hoja (una vez por versión del encabezado)
+    esquemas = obtener_esquemas(data_dict)
+    mostrar_diagnostico(esquemas, {'manipuladoras': ['contrato'], 'planta': ['contrato']})
     
-    # Contar los valores y ordenar por frecuencia descendente
-    conteo_tipos = todos_tipos_contrato.value_counts().reset_index()
-    conteo_tipos.columns = ['Tipo de Contrato', 'Total']
+    # Verificar que existan las columnas de tipo de contrato
+    if not esquemas['manipuladoras']['contrato']:
+        st.error("No se encontró la columna de tipo de contrato en la tabla Manipuladoras")
+        return
+    if not esquemas['planta']['contrato']:
+        st.error("No se encontró la columna de tipo de contrato en la tabla Planta")
+        return
+    
+    # Conteo de los tipos de contrato de ambas fuentes (reportes.REPORTE_INDICADORES),
+    # ordenado por frecuencia descendente
+    tablas = obtener_reporte(
+        data_dict, 'indicadores', tipos_novedad_seleccionados, fecha_min, fecha_max, distintas=distintas
+    )
+    conteo_tipos = tablas['contratos'].reset_index(drop=True)
     
     # Mostrar la tabla con los conteos
     st.header("Conteo Total de Tipos de Contrato")
+    if distintas:
+        mostrar_resumen_identidad(data_dict)
     
     # Verificar si hay datos para mostrar
     if len(conteo_tipos) > 0:
-        st.dataframe(conteo_tipos, use_container_width=True)
+        with medir('render', filas=len(conteo_tipos)):
+            st.dataframe(conteo_tipos, use_container_width=True)
     else:
-        st.warning("No hay datos disponibles con los filtros seleccionados.")
\ No newline at end of file
+        st.warning("No hay datos disponibles con los filtros seleccionados.")
+    
+    # ---------- REGISTROS DETALLADOS Y EXPORTACIÓN ----------
+    mostrar_visor(data_dict, filas_detalle, 'indicadores')
+    mostrar_exportacion(
+        data_dict, filas_detalle, ['contrato'], 'indicadores'
+    )
+    
+    # ---------- COMPARACIÓN CON OTRO PERIODO ----------
+    if periodo_comparacion:
+        instrumentacion.etapa('comparacion')
+        periodo_actual = (fecha_min, fecha_max)
+        comparacion = obtener_comparacion(
+            data_dict, ['Planta', 'Manipuladoras'], ['contrato'],
+            tipos_novedad_seleccionados, periodo_actual, periodo_comparacion, distintas=distintas
+        )
+        mostrar_comparacion(comparacion, "Comparación de Tipos de Contrato", periodo_actual, periodo_comparacion)
@@ -0,0 +1,194 @@
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+import streamlit as st
+
+# Archivo donde se escriben las etapas medidas (una línea JSON por etapa)
+LOG_ETAPAS_PATH = os.environ.get('INDICADORES_LOG_ETAPAS', os.path.join('logs', 'etapas.jsonl'))
+
+# Estado de la ejecución actual. Streamlit ejecuta cada rerun en su propio hilo,
+# por lo que un estado local al hilo separa las sesiones sin depender de st.session_state
+# (y permite usar el módulo fuera de Streamlit).
+_estado = threading.local()
+
+_logger = logging.getLogger('indicadores.etapas')
+
+
+def _configurar_logger():
+    """Configura (una sola vez) el archivo de log estructurado de etapas."""
+    if _logger.handlers:
+        return
+    _logger.setLevel(logging.INFO)
+    _logger.propagate = False
+    try:
+        directorio = os.path.dirname(LOG_ETAPAS_PATH)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        handler = logging.FileHandler(LOG_ETAPAS_PATH, encoding='utf-8')
+    except OSError:
+        # Sin permisos de escritura: se descartan los registros
+        handler = logging.NullHandler()
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    _logger.addHandler(handler)
+
+
+def _spans():
+    if not hasattr(_estado, 'spans'):
+        _estado.spans = []
+        _estado.abiertos = []
+        _estado.vuelta = None
+        _estado.ejecucion = None
+        _estado.pagina = None
+    return _estado.spans
+
+
+def _registrar(span):
+    """Guarda un span terminado y lo escribe en el log estructurado."""
+    _spans().append(span)
+    _configurar_logger()
+    registro = {
+        'ts': datetime.now().isoformat(timespec='milliseconds'),
+        'ejecucion': _estado.ejecucion,
+        'pagina': _estado.pagina,
+    }
+    registro.update(span)
+    _logger.info(json.dumps(registro, ensure_ascii=False, default=str))
+
+
+# Función para iniciar la medición de un rerun
+def iniciar_ejecucion(pagina):
+    """
+    Reinicia las mediciones al comienzo de un rerun de la página indicada.
+    """
+    _spans()
+    _estado.spans = []
+    _estado.abiertos = []
+    _estado.vuelta = None
+    _estado.ejecucion = uuid.uuid4().hex[:12]
+    _estado.pagina = pagina
+    _estado.inicio = time.perf_counter()
+
+
+# Función para cerrar la medición de un rerun
+def finalizar_ejecucion():
+    """
+    Cierra la etapa abierta, registra la duración total del rerun
+    y la retorna en segundos (None si no se inició la medición).
+    """
+    _spans()
+    _cerrar_vuelta()
+    inicio = getattr(_estado, 'inicio', None)
+    if inicio is None:
+        return None
+    segundos = time.perf_counter() - inicio
+    _registrar({
+        'etapa': 'total',
+        'ms': round(segundos * 1000, 3),
+    })
+    _estado.inicio = None
+    return segundos
+
+
+@contextmanager
+def medir(nombre, **atributos):
+    """
+    Mide la duración de un bloque de código. Los atributos (filas, hoja, cache...)
+    se guardan junto con el tiempo y pueden completarse dentro del bloque con anotar().
+    """
+    _spans()
+    span = {'etapa': nombre}
+    span.update(atributos)
+    _estado.abiertos.append(span)
+    inicio = time.perf_counter()
+    try:
+        yield span
+    finally:
+        span['ms'] = round((time.perf_counter() - inicio) * 1000, 3)
+        _estado.abiertos.remove(span)
+        _registrar(span)
+
+
+def anotar(**atributos):
+    """
+    Añade atributos al span abierto más interno (por ejemplo, cache='fallo'
+    desde el cuerpo de una función cacheada).
+    """
+    _spans()
+    if _estado.abiertos:
+        _estado.abiertos[-1].update(atributos)
+
+
+def _cerrar_vuelta():
+    vuelta = _estado.vuelta
+    if vuelta is not None:
+        span, inicio = vuelta
+        span['ms'] = round((time.perf_counter() - inicio) * 1000, 3)
+        _estado.vuelta = None
+        _registrar(span)
+
+
+def etapa(nombre, **atributos):
+    """
+    Marca el inicio de una etapa secuencial de la página. La etapa anterior
+    se cierra automáticamente, por lo que no es necesario reindentar el código.
+    """
+    _spans()
+    _cerrar_vuelta()
+    span = {'etapa': nombre}
+    span.update(atributos)
+    _estado.vuelta = (span, time.perf_counter())
+
+
+def obtener_etapas():
+    """
+    Retorna un DataFrame con las etapas medidas en el rerun actual.
+    """
+    spans = list(_spans())
+    if not spans:
+        return pd.DataFrame(columns=['etapa', 'ms'])
+    return pd.DataFrame(spans)
+
+
+# Función para mostrar el panel de tiempos en la barra lateral
+def mostrar_panel():
+    """
+    Muestra en la barra lateral los tiempos por etapa, aciertos de caché
+    y cantidad de filas del último rerun.
+    """
+    mostrar = st.sidebar.checkbox("Mostrar tiempos de ejecución", value=False, key="mostrar_tiempos")
+    if not mostrar:
+        return
+
+    etapas = obtener_etapas()
+    with st.sidebar.expander("⏱️ Tiempos del último rerun", expanded=True):
+        if etapas.empty:
+            st.caption("No hay mediciones disponibles.")
+            return
+
+        total = etapas.loc[etapas['etapa'] == 'total', 'ms']
+        if not total.empty:
+            st.markdown(f"**Total:** {total.iloc[-1]:.1f} ms")
+
+        # Agrupar las etapas repetidas (por ejemplo, varios 'render')
+        detalle = etapas[etapas['etapa'] != 'total']
+        agrupado = detalle.groupby('etapa', sort=False)
+        resumen = agrupado.agg(ms=('ms', 'sum'), veces=('ms', 'size'))
+        if 'filas' in detalle.columns:
+            resumen['filas'] = agrupado['filas'].sum(min_count=1)
+        resumen = resumen.reset_index()
+        resumen['ms'] = resumen['ms'].round(1)
+        st.dataframe(resumen, use_container_width=True)
+
+        if 'cache' in etapas.columns:
+            cache = etapas.dropna(subset=['cache'])
+            if not cache.empty:
+                columnas = [c for c in ['etapa', 'cache', 'filas', 'ms'] if c in cache.columns]
+                st.caption("Cargas de datos")
+                st.dataframe(cache[columnas], use_container_width=True)
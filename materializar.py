@@ -0,0 +1,282 @@
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+import pandas as pd
+
+import utils
+from comparacion import filas_en_rango
+from registros import obtener_registros
+from reportes import REPORTES, ejecutar_reporte
+from retiros import AGRUPACIONES_ROTACION
+from rollup import rollup
+from rotacion import tasa_rotacion
+
+# ---------- CONFIGURACIÓN ----------
+# Tipos de novedad de cada página por defecto (None = todos los que existan en los datos)
+NOVEDADES_POR_REPORTE = {
+    'indicadores': None,
+    'areas_contratos': ['ACTIVO'],
+    'personal_activo': ['ACTIVO'],
+    'retiros': ['RETIRADO'],
+}
+
+# Desgloses jerárquicos que muestran las páginas (niveles del rollup)
+DESGLOSES = {
+    'areas_contratos': ['origen', 'area', 'contrato'],
+    'personal_activo': ['origen', 'area', 'contrato'],
+}
+
+# Prefijo corto de cada página en los nombres de las hojas de Excel (máximo 31 caracteres)
+PREFIJOS_HOJA = {
+    'indicadores': 'indicadores',
+    'areas_contratos': 'areas',
+    'personal_activo': 'activo',
+    'retiros': 'retiros',
+}
+
+# Granularidad de la tasa de rotación materializada
+GRANO_ROTACION = 'M'
+
+DIRECTORIO_SALIDA = os.environ.get('INDICADORES_MATERIALIZAR_SALIDA', 'materializado')
+PRESUPUESTO_SEGUNDOS = float(os.environ.get('INDICADORES_MATERIALIZAR_PRESUPUESTO', '600'))
+
+
+class PresupuestoAgotado(Exception):
+    """Se superó el tiempo máximo de la ejecución."""
+
+
+# ---------- PERIODOS ----------
+def periodos_por_defecto(referencia):
+    """Mes anterior completo y año en curso hasta la fecha de referencia."""
+    hoy = pd.Timestamp(referencia).normalize()
+    inicio_mes = hoy.replace(day=1)
+    return {
+        'mes_anterior': (inicio_mes - pd.DateOffset(months=1), inicio_mes - pd.Timedelta(days=1)),
+        'anio_en_curso': (hoy.replace(month=1, day=1), hoy),
+    }
+
+
+def leer_periodo(texto):
+    """Convierte 'nombre=AAAA-MM-DD:AAAA-MM-DD' en (nombre, (inicio, fin))."""
+    try:
+        nombre, rango = texto.split('=', 1)
+        inicio, fin = (pd.Timestamp(parte).normalize() for parte in rango.split(':', 1))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Periodo no válido: '{texto}' (se espera nombre=AAAA-MM-DD:AAAA-MM-DD)")
+    if not nombre or inicio > fin:
+        raise argparse.ArgumentTypeError(f"Periodo no válido: '{texto}'")
+    return nombre, (inicio, fin)
+
+
+# ---------- CÁLCULO ----------
+def tareas_periodo(data_dict, registros, fecha_min, fecha_max, motor):
+    """
+    Retorna la lista de (página, función) que calculan las tablas de un periodo.
+    Cada función retorna {nombre de la tabla: DataFrame}.
+    """
+    todas_novedades = sorted(registros['tipo_novedad'].dropna().astype(str).unique())
+    tareas = []
+    for pagina, reporte in REPORTES.items():
+        novedades = NOVEDADES_POR_REPORTE.get(pagina) or todas_novedades
+        tareas.append((pagina, lambda r=reporte, n=novedades: ejecutar_reporte(
+            r, data_dict, n, fecha_min, fecha_max, motor=motor
+        )))
+        if pagina in DESGLOSES:
+            niveles = DESGLOSES[pagina]
+            tareas.append((pagina, lambda n=novedades, niveles=niveles: {
+                'desglose': rollup(filas_en_rango(registros, n, fecha_min, fecha_max)[niveles], niveles)
+            }))
+
+    # Tasa de rotación de la página de retiros, una tabla con todas las agrupaciones
+    def rotacion():
+        partes = []
+        for agrupacion, (por, origenes) in AGRUPACIONES_ROTACION.items():
+            tabla = tasa_rotacion(
+                registros[registros['origen'].isin(origenes)], por=por, grano=GRANO_ROTACION,
+                fecha_inicio=fecha_min, fecha_fin=fecha_max
+            )
+            tabla.insert(0, 'Agrupación', agrupacion)
+            partes.append(tabla)
+        return {'rotacion': pd.concat(partes, ignore_index=True)}
+    tareas.append(('retiros', rotacion))
+    return tareas
+
+
+def calcular_periodo(data_dict, registros, fecha_min, fecha_max, motor, limite):
+    """
+    Calcula todas las tablas de las páginas para un periodo. Retorna {'pagina.tabla': DataFrame}.
+    Lanza PresupuestoAgotado (con las tablas ya calculadas) si se supera el instante 'limite'.
+    """
+    tablas = {}
+    for pagina, tarea in tareas_periodo(data_dict, registros, fecha_min, fecha_max, motor):
+        if time.perf_counter() > limite:
+            raise PresupuestoAgotado(tablas)
+        for nombre, tabla in tarea().items():
+            tablas[f'{pagina}.{nombre}'] = tabla
+    return tablas
+
+
+# ---------- ESCRITURA ----------
+def formato_columnar():
+    """Parquet si hay un motor disponible (pyarrow o fastparquet); si no, CSV."""
+    for modulo in ('pyarrow', 'fastparquet'):
+        try:
+            __import__(modulo)
+            return 'parquet'
+        except ImportError:
+            continue
+    return 'csv'
+
+
+def nombre_hoja(clave):
+    pagina, tabla = clave.split('.', 1)
+    return f"{PREFIJOS_HOJA.get(pagina, pagina)}.{tabla}"[:31]
+
+
+def escribir_periodo(directorio, periodo, tablas, resumen, formato):
+    """
+    Escribe el libro de Excel del periodo (una hoja por tabla y una hoja de resumen) y un
+    archivo columnar por tabla. Retorna la lista de archivos escritos.
+    """
+    carpeta = os.path.join(directorio, periodo)
+    os.makedirs(carpeta, exist_ok=True)
+    archivos = []
+
+    ruta_excel = os.path.join(directorio, f'{periodo}.xlsx')
+    with pd.ExcelWriter(ruta_excel, engine='openpyxl') as libro:
+        pd.DataFrame(list(resumen.items()), columns=['Campo', 'Valor']).to_excel(libro, sheet_name='resumen', index=False)
+        for clave, tabla in tablas.items():
+            tabla.to_excel(libro, sheet_name=nombre_hoja(clave), index=False)
+    archivos.append(ruta_excel)
+
+    for clave, tabla in tablas.items():
+        ruta = os.path.join(carpeta, f'{clave}.{formato}')
+        if formato == 'parquet':
+            # Columnas de texto como texto (los vacíos quedan nulos)
+            tabla.astype({c: 'string' for c in tabla.columns if tabla[c].dtype == object}).to_parquet(ruta, index=False)
+        else:
+            tabla.to_csv(ruta, index=False)
+        archivos.append(ruta)
+    return archivos
+
+
+# ---------- EJECUCIÓN ----------
+def materializar(data_dict, periodos, directorio=DIRECTORIO_SALIDA, presupuesto=PRESUPUESTO_SEGUNDOS,
+                 motor='pandas', formato=None):
+    """
+    Calcula y escribe las tablas de todas las páginas para cada periodo con una sola carga de
+    datos. Si se agota el presupuesto de tiempo se escriben las tablas ya calculadas del
+    periodo en curso y no se procesan los siguientes.
+
+    Retorna el manifiesto de la ejecución (también se guarda como manifiesto.json).
+    """
+    inicio = time.perf_counter()
+    limite = inicio + presupuesto
+    formato = formato or formato_columnar()
+    os.makedirs(directorio, exist_ok=True)
+
+    registros = obtener_registros(data_dict)
+    manifiesto = {
+        'generado': datetime.now().isoformat(timespec='seconds'),
+        'version_datos': utils.version_datos(data_dict),
+        'filas': len(registros),
+        'motor': motor,
+        'formato': formato,
+        'presupuesto_segundos': presupuesto,
+        'completo': True,
+        'periodos': [],
+    }
+
+    for periodo, (fecha_min, fecha_max) in periodos.items():
+        if time.perf_counter() > limite:
+            manifiesto['completo'] = False
+            manifiesto['periodos'].append({'periodo': periodo, 'estado': 'omitido'})
+            continue
+
+        inicio_periodo = time.perf_counter()
+        estado = 'completo'
+        try:
+            tablas = calcular_periodo(data_dict, registros, fecha_min, fecha_max, motor, limite)
+        except PresupuestoAgotado as agotado:
+            tablas = agotado.args[0]
+            estado = 'parcial'
+            manifiesto['completo'] = False
+
+        resumen = {
+            'Periodo': periodo,
+            'Desde': fecha_min.date().isoformat(),
+            'Hasta': fecha_max.date().isoformat(),
+            'Estado': estado,
+            'Versión de los datos': manifiesto['version_datos'],
+            'Generado': manifiesto['generado'],
+        }
+        archivos = escribir_periodo(directorio, periodo, tablas, resumen, formato)
+        manifiesto['periodos'].append({
+            'periodo': periodo,
+            'desde': resumen['Desde'],
+            'hasta': resumen['Hasta'],
+            'estado': estado,
+            'tablas': len(tablas),
+            'segundos': round(time.perf_counter() - inicio_periodo, 3),
+            'archivos': archivos,
+        })
+
+    manifiesto['segundos'] = round(time.perf_counter() - inicio, 3)
+    with open(os.path.join(directorio, 'manifiesto.json'), 'w', encoding='utf-8') as archivo:
+        json.dump(manifiesto, archivo, ensure_ascii=False, indent=2)
+    return manifiesto
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Materializa en archivos las tablas de las páginas del dashboard (Excel y formato columnar)."
+    )
+    parser.add_argument('--periodo', action='append', type=leer_periodo, default=[],
+                        help="Periodo nombre=AAAA-MM-DD:AAAA-MM-DD (repetible). Por defecto: mes anterior y año en curso.")
+    parser.add_argument('--fecha-referencia', default=None,
+                        help="Fecha para los periodos por defecto (AAAA-MM-DD); por defecto hoy.")
+    parser.add_argument('--salida', default=DIRECTORIO_SALIDA, help="Directorio de salida.")
+    parser.add_argument('--presupuesto', type=float, default=PRESUPUESTO_SEGUNDOS,
+                        help="Tiempo máximo de la ejecución en segundos (incluye la carga de datos).")
+    parser.add_argument('--motor', choices=['pandas', 'sqlite'], default='pandas', help="Motor de los conteos.")
+    parser.add_argument('--formato', choices=['parquet', 'csv'], default=None,
+                        help="Formato columnar; por defecto parquet si está disponible.")
+    parser.add_argument('--sinteticos', type=int, default=0,
+                        help="Usar N filas de datos sintéticos en lugar de Google Sheets (prueba del proceso).")
+    parser.add_argument('--datos-al', default=None,
+                        help="Materializar las hojas tal como estaban en esa fecha (AAAA-MM-DD) según el histórico.")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    if args.sinteticos:
+        from benchmarks import cargar_datos_sinteticos
+        data_dict = cargar_datos_sinteticos(args.sinteticos)
+    else:
+        data_dict = utils.load_all_data(as_of=args.datos_al)
+    if all(df.empty for df in data_dict.values()):
+        print("No se pudieron cargar datos de ninguna hoja.", file=sys.stderr)
+        return 2
+
+    if args.periodo:
+        periodos = dict(args.periodo)
+    else:
+        periodos = periodos_por_defecto(args.fecha_referencia or datetime.now())
+    restante = args.presupuesto - (time.perf_counter() - inicio)
+
+    manifiesto = materializar(data_dict, periodos, args.salida, restante, args.motor, args.formato)
+    for periodo in manifiesto['periodos']:
+        print(f"{periodo['periodo']}: {periodo['estado']}"
+              + (f" ({periodo['tablas']} tablas, {periodo['segundos']} s)" if 'tablas' in periodo else ""))
+    print(f"Total: {time.perf_counter() - inicio:.1f} s, salida en {args.salida}")
+    if not manifiesto['completo']:
+        print("Se agotó el presupuesto de tiempo: la materialización quedó incompleta.", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,282 @@
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import streamlit as st
+
+# Puerto local donde se exponen las métricas (vacío o "0" para desactivar el servidor)
+METRICAS_PUERTO = os.environ.get('INDICADORES_METRICAS_PUERTO', '9464')
+METRICAS_HOST = os.environ.get('INDICADORES_METRICAS_HOST', '127.0.0.1')
+
+# Archivo opcional donde se vuelca la exposición al final de cada rerun
+# (útil para el textfile collector de node_exporter)
+METRICAS_ARCHIVO = os.environ.get('INDICADORES_METRICAS_ARCHIVO', '')
+
+# Límites (en segundos) de los histogramas de duración
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _etiquetas(nombres, valores, extra=None):
+    pares = list(zip(nombres, valores))
+    if extra:
+        pares.append(extra)
+    if not pares:
+        return ''
+    return '{' + ','.join(f'{k}="{_escapar(v)}"' for k, v in pares) + '}'
+
+
+def _formatear(valor):
+    if valor == float('inf'):
+        return '+Inf'
+    if float(valor).is_integer():
+        return str(int(valor))
+    return repr(float(valor))
+
+
+class _Metrica:
+    """Base de las métricas: nombre, ayuda, etiquetas y un valor por combinación de etiquetas."""
+    tipo = 'untyped'
+
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._valores = {}
+        self._lock = threading.Lock()
+
+    def _clave(self, etiquetas):
+        faltantes = set(self.etiquetas) - set(etiquetas)
+        if faltantes:
+            raise ValueError(f"Faltan etiquetas para {self.nombre}: {sorted(faltantes)}")
+        return tuple(str(etiquetas[e]) for e in self.etiquetas)
+
+    def exponer(self):
+        lineas = [f'# HELP {self.nombre} {self.ayuda}', f'# TYPE {self.nombre} {self.tipo}']
+        with self._lock:
+            items = sorted(self._valores.items())
+        for clave, valor in items:
+            lineas.append(f'{self.nombre}{_etiquetas(self.etiquetas, clave)} {_formatear(valor)}')
+        return lineas
+
+
+class Contador(_Metrica):
+    """Contador monótono (por ejemplo, aciertos de caché)."""
+    tipo = 'counter'
+
+    def incrementar(self, cantidad=1, **etiquetas):
+        clave = self._clave(etiquetas)
+        with self._lock:
+            self._valores[clave] = self._valores.get(clave, 0) + cantidad
+
+
+class Indicador(_Metrica):
+    """Valor que puede subir o bajar (gauge). Acepta una función que se evalúa al exponer."""
+    tipo = 'gauge'
+
+    def __init__(self, nombre, ayuda, etiquetas=(), funcion=None):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.funcion = funcion
+
+    def fijar(self, valor, **etiquetas):
+        clave = self._clave(etiquetas)
+        with self._lock:
+            self._valores[clave] = valor
+
+    def exponer(self):
+        if self.funcion is not None:
+            try:
+                valor = self.funcion()
+            except Exception:
+                valor = None
+            if valor is not None:
+                with self._lock:
+                    self._valores[()] = valor
+        return super().exponer()
+
+
+class Histograma(_Metrica):
+    """Histograma acumulado con buckets fijos, suma y conteo."""
+    tipo = 'histogram'
+
+    def __init__(self, nombre, ayuda, etiquetas=(), buckets=BUCKETS_SEGUNDOS):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observar(self, valor, **etiquetas):
+        clave = self._clave(etiquetas)
+        with self._lock:
+            conteos, suma = self._valores.get(clave, ([0] * len(self.buckets), 0.0))
+            for i, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    conteos[i] += 1
+            self._valores[clave] = (conteos, suma + valor)
+
+    def exponer(self):
+        lineas = [f'# HELP {self.nombre} {self.ayuda}', f'# TYPE {self.nombre} {self.tipo}']
+        with self._lock:
+            items = sorted((k, (list(c), s)) for k, (c, s) in self._valores.items())
+        for clave, (conteos, suma) in items:
+            for limite, conteo in zip(self.buckets, conteos):
+                etiquetas = _etiquetas(self.etiquetas, clave, ('le', _formatear(limite)))
+                lineas.append(f'{self.nombre}_bucket{etiquetas} {conteo}')
+            etiquetas = _etiquetas(self.etiquetas, clave)
+            lineas.append(f'{self.nombre}_sum{etiquetas} {_formatear(suma)}')
+            lineas.append(f'{self.nombre}_count{etiquetas} {conteos[-1]}')
+        return lineas
+
+
+class Registro:
+    """Conjunto de métricas del proceso."""
+
+    def __init__(self):
+        self._metricas = {}
+        self._lock = threading.Lock()
+
+    def registrar(self, metrica):
+        with self._lock:
+            existente = self._metricas.get(metrica.nombre)
+            if existente is not None:
+                return existente
+            self._metricas[metrica.nombre] = metrica
+            return metrica
+
+    def exponer(self):
+        """Retorna las métricas en el formato de exposición de texto de Prometheus."""
+        with self._lock:
+            metricas = list(self._metricas.values())
+        lineas = []
+        for metrica in metricas:
+            lineas.extend(metrica.exponer())
+        return '\n'.join(lineas) + '\n'
+
+
+REGISTRO = Registro()
+
+
+def _memoria_rss():
+    """Memoria residente del proceso en bytes."""
+    try:
+        with open('/proc/self/statm') as archivo:
+            paginas = int(archivo.read().split()[1])
+        return paginas * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        import resource
+        # En Linux ru_maxrss está en KB (es el máximo, no el valor actual)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+# ---------- MÉTRICAS DEL DASHBOARD ----------
+SHEETS_DURACION = REGISTRO.registrar(Histograma(
+    'indicadores_sheets_fetch_seconds',
+    'Duración de la lectura de cada hoja en la API de Google Sheets.',
+    ['hoja']
+))
+SHEETS_ERRORES = REGISTRO.registrar(Contador(
+    'indicadores_sheets_errores_total',
+    'Errores al leer Google Sheets por hoja y tipo (cuota u otro).',
+    ['hoja', 'tipo']
+))
+RESPALDOS = REGISTRO.registrar(Contador(
+    'indicadores_respaldo_total',
+    'Veces que una hoja se cargó desde la copia local de respaldo.',
+    ['hoja']
+))
+FILAS_CARGADAS = REGISTRO.registrar(Indicador(
+    'indicadores_filas_cargadas',
+    'Cantidad de filas de la última carga de cada hoja.',
+    ['hoja']
+))
+ULTIMA_CARGA = REGISTRO.registrar(Indicador(
+    'indicadores_ultima_carga_timestamp_seconds',
+    'Momento (epoch) de la última lectura exitosa de cada hoja; la antigüedad es time() - valor.',
+    ['hoja']
+))
+CACHE = REGISTRO.registrar(Contador(
+    'indicadores_cache_total',
+    'Consultas a la caché de datos por hoja y resultado (acierto/fallo).',
+    ['hoja', 'resultado']
+))
+CAMBIOS = REGISTRO.registrar(Contador(
+    'indicadores_cambios_registros_total',
+    'Registros insertados, actualizados y eliminados aplicados al conteo mantenido.',
+    ['tipo']
+))
+PAGINA_DURACION = REGISTRO.registrar(Histograma(
+    'indicadores_pagina_seconds',
+    'Tiempo de cómputo de cada página por rerun.',
+    ['pagina']
+))
+MEMORIA = REGISTRO.registrar(Indicador(
+    'indicadores_memoria_rss_bytes',
+    'Memoria residente del proceso de Streamlit.',
+    funcion=_memoria_rss
+))
+
+
+def es_error_de_cuota(error):
+    """Indica si una excepción de la API corresponde a cuota excedida (HTTP 429)."""
+    estado = getattr(getattr(error, 'resp', None), 'status', None)
+    if str(estado) == '429':
+        return True
+    texto = str(error).lower()
+    return 'quota' in texto or 'rate limit' in texto or 'ratelimit' in texto
+
+
+def observar_carga(hoja, span):
+    """Registra el resultado de una carga medida con instrumentacion.medir()."""
+    CACHE.incrementar(hoja=hoja, resultado=span.get('cache', 'acierto'))
+    if 'filas' in span:
+        FILAS_CARGADAS.fijar(span['filas'], hoja=hoja)
+
+
+def volcar_archivo():
+    """Escribe la exposición actual en METRICAS_ARCHIVO (si está configurado)."""
+    if not METRICAS_ARCHIVO:
+        return
+    temporal = METRICAS_ARCHIVO + '.tmp'
+    try:
+        with open(temporal, 'w', encoding='utf-8') as archivo:
+            archivo.write(REGISTRO.exponer())
+        os.replace(temporal, METRICAS_ARCHIVO)
+    except OSError:
+        pass
+
+
+class _ManejadorMetricas(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/metrics', '/'):
+            self.send_error(404)
+            return
+        cuerpo = REGISTRO.exponer().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, format, *args):
+        # Silenciar el log de acceso por cada scrape
+        pass
+
+
+# Función para iniciar el servidor de métricas (una vez por proceso)
+@st.cache_resource
+def iniciar_servidor():
+    """
+    Inicia un servidor HTTP local en un hilo de fondo que expone /metrics.
+    Retorna el servidor, o None si está desactivado o el puerto no está disponible.
+    """
+    if not METRICAS_PUERTO or METRICAS_PUERTO == '0':
+        return None
+    try:
+        servidor = ThreadingHTTPServer((METRICAS_HOST, int(METRICAS_PUERTO)), _ManejadorMetricas)
+    except (OSError, ValueError):
+        return None
+    servidor.daemon_threads = True
+    hilo = threading.Thread(target=servidor.serve_forever, name='servidor-metricas', daemon=True)
+    hilo.start()
+    return servidor
@@ -1,7 +1,17 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime, timedelta
-from utils import load_all_data
+from utils import load_all_data, version_datos
+from esquema import obtener_esquemas, mostrar_diagnostico
+from registros import obtener_registros, ETIQUETAS
+from dotacion import obtener_indice_vigencia
+from reportes import REPORTE_PERSONAL_ACTIVO, obtener_reporte, reporte_de_filas
+from rollup import rollup_cacheado, mostrar_desglose
+from comparacion import filas_en_rango
+from exportacion import mostrar_exportacion
+from visor import mostrar_visor
+import instrumentacion
+from instrumentacion import medir
 
 def run():
     """
@@ -12,6 +22,7 @@ def run():
     Además filtra específicamente registros de BUGA en la tabla Planta.
     """
     # Cargar datos
+    instrumentacion.etapa('carga')
     with st.spinner("Cargando datos..."):
         data_dict = load_all_data()
         
@@ -21,6 +32,7 @@ def run():
         aprendices_df = data_dict['aprendices'].copy()
     
     # ---------- FILTROS EN LA BARRA LATERAL ----------
+    instrumentacion.etapa('filtros_sidebar')
     st.sidebar.header("Filtros")
     
     # 1. FILTRO DE TIPO DE NOVEDAD (MULTISELECT)
@@ -66,23 +78,7 @@ def run():
     # 2. FILTRO DE FECHAS (Igual que en las otras páginas)
     st.sidebar.subheader("Rango de Fechas")
     
-    # Preparar las fechas en los DataFrames para el filtrado
-    for df_name, df in [('manipuladoras', manipuladoras_df), ('planta', planta_df), ('aprendices', aprendices_df)]:
-        # Fechas de ingreso
-        if 'FECHA DE INGRESO (AAAAMMDD)' in df.columns:
-            df['fecha_ingreso'] = pd.to_datetime(
-                df['FECHA DE INGRESO (AAAAMMDD)'], 
-                format='%Y%m%d', 
-                errors='coerce'
-            )
-        
-        # Fechas de retiro
-        if 'FECHA DE RETIRO (AAAAMMDD)' in df.columns:
-            df['fecha_retiro'] = pd.to_datetime(
-                df['FECHA DE RETIRO (AAAAMMDD)'], 
-                format='%Y%m%d', 
-                errors='coerce'
-            )
+    # Las columnas fecha_ingreso y fecha_retiro ya vienen convertidas por el cargador
     
     # Obtener todas las fechas según el tipo de novedad seleccionado
     fechas = []
@@ -127,213 +123,120 @@ def run():
     fecha_min = pd.Timestamp(date_range[0])
     fecha_max = pd.Timestamp(date_range[1])
     
-    # ---------- APLICAR FILTROS A LOS DATOS ----------
-    # Función para aplicar filtros a cada DataFrame
-    def aplicar_filtros(df):
-        # Crear una copia para no modificar el original
-        df_filtrado = df.copy()
-        
-        # 1. Filtrar por tipo de novedad
-        if 'tipo_novedad' in df_filtrado.columns:
-            df_filtrado = df_filtrado[
-                df_filtrado['tipo_novedad'].isin(tipos_novedad_seleccionados)
-            ]
-        
-        # 2. Filtrar por fechas
-        mask = pd.Series(False, index=df_filtrado.index)
-        
-        # Aplicar filtros según tipo de novedad
-        if any(item in ["ACTIVO", "CASO ESPECIAL"] for item in tipos_novedad_seleccionados):
-            if 'fecha_ingreso' in df_filtrado.columns:
-                mask_ingreso = (
-                    (df_filtrado['fecha_ingreso'] >= fecha_min) & 
-                    (df_filtrado['fecha_ingreso'] <= fecha_max) &
-                    (df_filtrado['tipo_novedad'].isin(['ACTIVO', 'CASO ESPECIAL']))
-                )
-                mask = mask | mask_ingreso
-        
-        if "RETIRADO" in tipos_novedad_seleccionados:
-            if 'fecha_retiro' in df_filtrado.columns:
-                mask_retiro = (
-                    (df_filtrado['fecha_retiro'] >= fecha_min) & 
-                    (df_filtrado['fecha_retiro'] <= fecha_max) &
-                    (df_filtrado['tipo_novedad'] == 'RETIRADO')
-                )
-                mask = mask | mask_retiro
-        
-        # Aplicar la máscara
-        df_filtrado = df_filtrado[mask]
-        
-        return df_filtrado
+    # 3. FECHA DE CORTE: personal activo en un día específico según ingreso y retiro
+    st.sidebar.subheader("Fecha de Corte")
+    usar_fecha_corte = st.sidebar.checkbox(
+        "Consultar activos a una fecha de corte",
+        value=False,
+        key="usar_fecha_corte_personal_activo"
+    )
+    fecha_corte = None
+    if usar_fecha_corte:
+        fecha_corte = pd.Timestamp(st.sidebar.date_input(
+            "Fecha de corte",
+            value=datetime.now().date(),
+            key="fecha_corte_personal_activo"
+        ))
+        st.sidebar.caption("Con fecha de corte se ignoran los filtros de tipo de novedad y rango de fechas.")
     
-    # Aplicar filtros a cada DataFrame
-    manipuladoras_filtradas = aplicar_filtros(manipuladoras_df)
-    planta_filtrada = aplicar_filtros(planta_df)
-    aprendices_filtrados = aplicar_filtros(aprendices_df)
+    # ---------- APLICAR FILTROS A LOS DATOS ----------
+    instrumentacion.etapa('filtrado')
+    registros = obtener_registros(data_dict)
+    if fecha_corte is not None:
+        # Con fecha de corte, los registros vienen del índice de vigencia (consulta por búsqueda binaria)
+        indice = obtener_indice_vigencia(data_dict, por=('origen',))
+        filas_detalle = registros.iloc[indice.filas(fecha_corte)]
+        # Las tablas del reporte se arman con el conteo de esos registros
+        tablas = reporte_de_filas(REPORTE_PERSONAL_ACTIVO, filas_detalle)
+        
+        st.subheader(f"Personal activo al {fecha_corte.strftime('%d/%m/%Y')}")
+        st.caption("Registros con fecha de ingreso anterior o igual a la fecha de corte y sin retiro antes de ella.")
+    else:
+        filas_detalle = filas_en_rango(registros, tipos_novedad_seleccionados, fecha_min, fecha_max)
+        # Todas las tablas de la página salen de un solo conteo de los registros filtrados
+        tablas = obtener_reporte(data_dict, 'personal_activo', tipos_novedad_seleccionados, fecha_min, fecha_max)
+    registros_por_origen = filas_detalle['origen'].astype(object).value_counts()
     
     # ---------- MOSTRAR INFORMACIÓN DE RESULTADOS ----------
     col1, col2, col3 = st.columns(3)
     with col1:
-        st.info(f"Registros filtrados en Manipuladoras: {len(manipuladoras_filtradas)}")
+        st.info(f"Registros filtrados en Manipuladoras: {registros_por_origen.get('Manipuladoras', 0)}")
     with col2:
-        st.info(f"Registros filtrados en Planta: {len(planta_filtrada)}")
+        st.info(f"Registros filtrados en Planta: {registros_por_origen.get('Planta', 0)}")
     with col3:
-        st.info(f"Registros filtrados en Aprendices: {len(aprendices_filtrados)}")
+        st.info(f"Registros filtrados en Aprendices: {registros_por_origen.get('Aprendices', 0)}")
 
     # ---------- BUSCAR COLUMNAS NECESARIAS ----------
-    def encontrar_columna_por_posicion(df, posicion, nombre_alternativo=None):
-        """Busca una columna por posición o nombre alternativo."""
-        columna = None
-        
-        # 1. Buscar por posición
-        if len(df.columns) > posicion:
-            columna = df.columns[posicion]
-        
-        # 2. Si no se encuentra por posición, buscar por nombre alternativo
-        if columna is None and nombre_alternativo:
-            for nombre in nombre_alternativo:
-                if nombre in df.columns:
-                    columna = nombre
-                    break
-        
-        return columna
-    
-    # Buscar las columnas necesarias
-    manipuladoras_programa_col = encontrar_columna_por_posicion(
-        manipuladoras_filtradas, 
-        7,  # Posición H
-        ['PROGRAMA AL QUE PERTENECE', 'Programa al que Pertenece', 'PROGRAMA']
-    )
-    
-    aprendices_area_col = encontrar_columna_por_posicion(
-        aprendices_filtrados, 
-        5,  # Posición F
-        ['AREA', 'ÁREA', 'Area', 'Área']
-    )
-    
-    planta_area_col = encontrar_columna_por_posicion(
-        planta_filtrada, 
-        13,  # Posición N
-        ['AREA', 'ÁREA', 'Area', 'Área']
-    )
+    instrumentacion.etapa('resolucion_columnas')
+    # Resolver las columnas por campo lógico (una vez por versión del encabezado)
+    esquemas = obtener_esquemas(data_dict)
     
     # Mostrar advertencia si no se encuentran las columnas
-    missing_cols = []
-    if not manipuladoras_programa_col:
-        missing_cols.append("PROGRAMA AL QUE PERTENECE (Manipuladoras, posición H)")
-    if not aprendices_area_col:
-        missing_cols.append("AREA (Aprendices, posición F)")
-    if not planta_area_col:
-        missing_cols.append("AREA (Planta, posición N)")
-    
-    if missing_cols:
-        st.warning(f"No se encontraron las siguientes columnas: {', '.join(missing_cols)}")
-        st.info("Por favor, verifica los nombres o posiciones de las columnas en los datos.")
+    mostrar_diagnostico(esquemas, {
+        'manipuladoras': ['programa'],
+        'aprendices': ['area'],
+        'planta': ['area'],
+    })
+    
+    # Función para mostrar una tabla del reporte con los mensajes de la página
+    def mostrar_tabla(tabla, origen, campo, aviso_sin_datos, aviso_vacia):
+        if not esquemas[origen.lower()][campo] or registros_por_origen.get(origen, 0) == 0:
+            st.warning(aviso_sin_datos)
+            return False
+        if tabla.empty:
+            st.warning(aviso_vacia)
+            return False
+        with medir('render', filas=len(tabla)):
+            st.dataframe(tabla.reset_index(drop=True), use_container_width=True)
+        return True
     
     # ---------- CREAR TABLAS DE AGRUPACIÓN ----------
+    instrumentacion.etapa('agregacion')
     # 1. MANIPULADORAS - Agrupación por PROGRAMA AL QUE PERTENECE
     st.header("Agrupación por Programa (Manipuladoras)")
-    
-    if manipuladoras_programa_col and not manipuladoras_filtradas.empty:
-        # Normalizar la columna para el conteo
-        manipuladoras_filtradas['programa_normalizado'] = manipuladoras_filtradas[manipuladoras_programa_col]
-        
-        # Contar por programa
-        conteo_programas = manipuladoras_filtradas['programa_normalizado'].value_counts().reset_index()
-        conteo_programas.columns = ['Programa', 'Total']
-        
-        # Ordenar por programa
-        conteo_programas = conteo_programas.sort_values('Programa')
-        # Mostrar conteo
-        if len(conteo_programas) > 0:
-            st.dataframe(conteo_programas, use_container_width=True)
-        else:
-            st.warning("No hay datos de programas disponibles con los filtros seleccionados.")
-    else:
-        st.warning("No hay datos disponibles de Manipuladoras o falta la columna de programa.")
+    mostrar_tabla(
+        tablas['programas'], 'Manipuladoras', 'programa',
+        "No hay datos disponibles de Manipuladoras o falta la columna de programa.",
+        "No hay datos de programas disponibles con los filtros seleccionados."
+    )
     
     # 2. APRENDICES - Agrupación por AREA
     st.header("Agrupación por Área (Aprendices)")
+    mostrar_tabla(
+        tablas['areas_aprendices'], 'Aprendices', 'area',
+        "No hay datos disponibles de Aprendices o falta la columna de área.",
+        "No hay datos de áreas disponibles para Aprendices con los filtros seleccionados."
+    )
     
-    if aprendices_area_col and not aprendices_filtrados.empty:
-        # Normalizar la columna para el conteo
-        aprendices_filtrados['area_normalizada'] = aprendices_filtrados[aprendices_area_col]
-        
-        # Contar por área
-        conteo_areas_aprendices = aprendices_filtrados['area_normalizada'].value_counts().reset_index()
-        conteo_areas_aprendices.columns = ['Área', 'Total']
-        
-        # Ordenar por área
-        conteo_areas_aprendices = conteo_areas_aprendices.sort_values('Área')
-        
-        # Mostrar conteo
-        if len(conteo_areas_aprendices) > 0:
-            st.dataframe(conteo_areas_aprendices, use_container_width=True)
-        else:
-            st.warning("No hay datos de áreas disponibles para Aprendices con los filtros seleccionados.")
-    else:
-        st.warning("No hay datos disponibles de Aprendices o falta la columna de área.")
-    
-    # 3. PLANTA - Agrupación por AREA (excluyendo BUGA)
+    # 3. PLANTA - Agrupación por AREA (excluyendo BUGA), con la fila TOTAL al final
     st.header("Agrupación por Área (Planta, excluyendo BUGA)")
-
-    if planta_area_col and not planta_filtrada.empty:
-        # Normalizar la columna para el conteo
-        planta_filtrada['area_normalizada'] = planta_filtrada[planta_area_col]
-        
-        # Excluir las áreas que contienen BUGA
-        planta_sin_buga = planta_filtrada[
-            ~planta_filtrada['area_normalizada'].str.contains('BUGA', case=False, na=False)
-        ]
-        
-        # Contar por área
-        conteo_areas_planta = planta_sin_buga['area_normalizada'].value_counts().reset_index()
-        conteo_areas_planta.columns = ['Área', 'Total']
-        
-        # Ordenar por área
-        conteo_areas_planta = conteo_areas_planta.sort_values('Área')
-        
-        # Mostrar conteo
-        if len(conteo_areas_planta) > 0:
-            # Agregar una fila con el total
-            total_row = pd.DataFrame({
-                'Área': ['TOTAL'],
-                'Total': [conteo_areas_planta['Total'].sum()]
-            })
-            
-            # Concatenar con la tabla original
-            conteo_areas_planta_con_total = pd.concat([conteo_areas_planta, total_row], ignore_index=True)
-            
-            # Mostrar la tabla con el total
-            st.dataframe(conteo_areas_planta_con_total, use_container_width=True)
-        else:
-            st.warning("No hay datos de áreas disponibles para Planta (excluyendo BUGA) con los filtros seleccionados.")
-    else:
-        st.warning("No hay datos disponibles de Planta o falta la columna de área.")    
+    mostrar_tabla(
+        tablas['areas_planta_sin_buga'], 'Planta', 'area',
+        "No hay datos disponibles de Planta o falta la columna de área.",
+        "No hay datos de áreas disponibles para Planta (excluyendo BUGA) con los filtros seleccionados."
+    )
     
     # 4. PLANTA - Filtrado específico para BUGA
     st.header("Personal en BUGA (Planta)")
+    conteo_buga = tablas['areas_buga']
+    if mostrar_tabla(
+        conteo_buga, 'Planta', 'area',
+        "No hay datos disponibles de Planta o falta la columna de área para filtrar BUGA.",
+        "No se encontraron registros con BUGA en el área con los filtros seleccionados."
+    ):
+        # Mostrar total general
+        st.metric("Total de Personal en BUGA", int(conteo_buga['Total'].sum()))
+    
+    # 5. DESGLOSE JERÁRQUICO DE TODAS LAS FUENTES
+    st.header("Desglose por Origen, Área y Tipo de Contrato")
+    niveles = ['origen', 'area', 'contrato']
+    filtros = (
+        tuple(sorted(tipos_novedad_seleccionados)), fecha_min.isoformat(), fecha_max.isoformat(),
+        fecha_corte.isoformat() if fecha_corte is not None else None
+    )
+    jerarquia = rollup_cacheado(version_datos(data_dict), filtros, tuple(niveles), filas_detalle[niveles].astype(object))
+    mostrar_desglose(jerarquia, niveles, ETIQUETAS, 'personal_activo')
     
-    if planta_area_col and not planta_filtrada.empty:
-        # Filtrar registros que contengan 'BUGA'
-        planta_buga = planta_filtrada[
-            planta_filtrada['area_normalizada'].str.contains('BUGA', case=False, na=False)
-        ]
-        
-        # Contar por área específica de BUGA
-        if not planta_buga.empty:
-            conteo_buga = planta_buga['area_normalizada'].value_counts().reset_index()
-            conteo_buga.columns = ['Área en BUGA', 'Total']
-            
-            # Ordenar por área
-            conteo_buga = conteo_buga.sort_values('Área en BUGA')
-            
-            # Mostrar conteo
-            st.dataframe(conteo_buga, use_container_width=True)
-            
-            # Mostrar total general
-            st.metric("Total de Personal en BUGA", planta_buga.shape[0])
-        else:
-            st.warning("No se encontraron registros con BUGA en el área con los filtros seleccionados.")
-    else:
-        st.warning("No hay datos disponibles de Planta o falta la columna de área para filtrar BUGA.")
\ No newline at end of file
+    # 6. REGISTROS DETALLADOS Y EXPORTACIÓN
+    mostrar_visor(data_dict, filas_detalle, 'personal_activo')
+    mostrar_exportacion(data_dict, filas_detalle, ['sitio', 'area', 'programa'], 'personal_activo')
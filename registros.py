@@ -0,0 +1,87 @@
+import pandas as pd
+import streamlit as st
+
+from canonico import canonizar, recargar_alias, version_alias
+from esquema import obtener_esquema
+from utils import version_datos
+
+# Nombre visible de cada hoja
+ORIGENES = {
+    'planta': 'Planta',
+    'manipuladoras': 'Manipuladoras',
+    'aprendices': 'Aprendices',
+}
+
+# Campos lógicos que se copian a la tabla unificada (vacíos si la hoja no los tiene)
+CAMPOS = ['area', 'contrato', 'programa', 'empresa', 'motivo']
+
+# Nombres visibles de las dimensiones para selectores y tablas
+ETIQUETAS = {
+    'origen': 'Origen',
+    'area': 'Área',
+    'contrato': 'Tipo de Contrato',
+    'programa': 'Programa',
+    'empresa': 'Empresa',
+    'motivo': 'Motivo de Retiro',
+    'sitio': 'Sede',
+    'tipo_novedad': 'Tipo de Novedad',
+}
+
+
+def unificar(data_dict):
+    """
+    Construye una tabla con una fila por registro de Planta, Manipuladoras y Aprendices
+    y columnas normalizadas: origen, indice_origen, tipo_novedad, fecha_ingreso,
+    fecha_retiro, sitio, los campos lógicos (area, contrato, programa, empresa, motivo)
+    y el documento.
+    """
+    recargar_alias()
+    partes = []
+    for hoja, origen in ORIGENES.items():
+        df = data_dict.get(hoja)
+        if df is None or df.empty:
+            continue
+        esquema = obtener_esquema(hoja, df)
+        parte = pd.DataFrame({
+            'origen': origen,
+            'indice_origen': df.index,
+            'tipo_novedad': df['tipo_novedad'] if 'tipo_novedad' in df.columns else pd.NA,
+            'fecha_ingreso': pd.to_datetime(df['fecha_ingreso'], errors='coerce') if 'fecha_ingreso' in df.columns else pd.NaT,
+            'fecha_retiro': pd.to_datetime(df['fecha_retiro'], errors='coerce') if 'fecha_retiro' in df.columns else pd.NaT,
+        }, index=df.index)
+        parte['sitio'] = df['sitio'].astype(object) if 'sitio' in df.columns else pd.NA
+        for campo in CAMPOS:
+            columna = esquema[campo]
+            parte[campo] = df[columna].astype(object) if columna else pd.NA
+        # Documento tal como viene en la hoja (identidad de la persona, ver identidad.py)
+        parte['documento'] = df[esquema['documento']].astype(object) if esquema['documento'] else pd.NA
+        partes.append(parte)
+
+    columnas = ['origen', 'indice_origen', 'tipo_novedad', 'fecha_ingreso', 'fecha_retiro', 'sitio'] + CAMPOS + ['documento']
+    if not partes:
+        return pd.DataFrame(columns=columnas)
+
+    registros = pd.concat(partes, ignore_index=True)[columnas]
+    # Valores canónicos de todas las hojas juntas: las variantes de mayúsculas, tildes y
+    # espacios son una sola categoría, escrita igual en todos los orígenes
+    for campo in CAMPOS:
+        registros[campo] = canonizar(registros[campo], campo)
+    # Dimensiones como categorías: agrupar por códigos es más rápido que por texto
+    for columna in ['origen', 'tipo_novedad', 'sitio'] + CAMPOS:
+        registros[columna] = registros[columna].astype('category')
+    return registros
+
+
+# Tabla unificada cacheada por versión de los datos y del archivo de alias (compartida:
+# no modificarla). Editar los alias recalcula la tabla aunque los datos no cambien
+@st.cache_resource(ttl=3600, max_entries=4, show_spinner=False)
+def _registros_por_version(version, alias, _data_dict):
+    return unificar(_data_dict)
+
+
+def obtener_registros(data_dict):
+    """
+    Retorna la tabla unificada de registros, calculada una sola vez por versión de los datos.
+    El DataFrame retornado es compartido entre sesiones: hacer .copy() antes de modificarlo.
+    """
+    return _registros_por_version(version_datos(data_dict), version_alias(), data_dict)
@@ -0,0 +1,244 @@
+import pandas as pd
+import streamlit as st
+
+from almacen_sql import contar, motor_actual
+from registros import ETIQUETAS
+from rollup import TOTAL
+from utils import version_datos
+
+# ---------- DEFINICIONES DE REPORTES ----------
+# Cada tabla se describe con datos:
+# - origenes: hojas que aporta (valores de la columna 'origen')
+# - dimensiones: columnas de la tabla unificada por las que se cuenta (sin vacíos)
+# - requiere: {origen: [dimensiones]} que además deben tener valor en ese origen
+# - pivote: columna cuyos valores pasan a ser columnas (con 'Total General')
+# - columna_origen: agrega la columna 'Origen' con el único origen de la tabla
+# - orden: [(columna visible, ascendente), ...]
+# - fila_total: agrega una fila TOTAL con la suma de las columnas numéricas
+# - solo / excluir: {dimensión: [valores]} que se conservan / descartan antes de sumar
+# - etiquetas: {dimensión: nombre visible} cuando difiere de registros.ETIQUETAS
+REPORTE_INDICADORES = {
+    'contratos': {
+        'origenes': ['Planta', 'Manipuladoras'],
+        'dimensiones': ['contrato'],
+        'orden': [('Total', False), ('Tipo de Contrato', True)],
+    },
+}
+
+REPORTE_AREAS_CONTRATOS = {
+    'planta': {
+        'origenes': ['Planta'],
+        'dimensiones': ['contrato'],
+        'columna_origen': True,
+        'orden': [('Tipo de Contrato', True)],
+    },
+    'manipuladoras': {
+        'origenes': ['Manipuladoras'],
+        'dimensiones': ['area', 'contrato'],
+        'columna_origen': True,
+        'orden': [('Área', True), ('Tipo de Contrato', True)],
+    },
+    'aprendices': {
+        'origenes': ['Aprendices'],
+        'dimensiones': ['contrato'],
+        'columna_origen': True,
+        'orden': [('Tipo de Contrato', True)],
+    },
+    'resumen': {
+        'origenes': ['Planta', 'Manipuladoras', 'Aprendices'],
+        'dimensiones': ['contrato'],
+        # Manipuladoras aporta al resumen lo que muestra su tabla por área
+        'requiere': {'Manipuladoras': ['area']},
+        'pivote': 'origen',
+        'orden': [('Tipo de Contrato', True)],
+        'fila_total': True,
+    },
+}
+
+REPORTE_RETIROS = {
+    'planta': {
+        'origenes': ['Planta'],
+        'dimensiones': ['empresa', 'motivo'],
+        'orden': [('Empresa', True), ('Total', False)],
+    },
+    'manipuladoras': {
+        'origenes': ['Manipuladoras'],
+        'dimensiones': ['programa', 'motivo'],
+        'orden': [('Programa', True), ('Total', False)],
+    },
+    'motivos': {
+        'origenes': ['Planta', 'Manipuladoras'],
+        'dimensiones': ['motivo'],
+        'pivote': 'origen',
+        'orden': [('Total General', False)],
+    },
+}
+
+REPORTE_PERSONAL_ACTIVO = {
+    'programas': {
+        'origenes': ['Manipuladoras'],
+        'dimensiones': ['programa'],
+        'orden': [('Programa', True)],
+    },
+    'areas_aprendices': {
+        'origenes': ['Aprendices'],
+        'dimensiones': ['area'],
+        'orden': [('Área', True)],
+    },
+    'areas_planta_sin_buga': {
+        'origenes': ['Planta'],
+        'dimensiones': ['area'],
+        'excluir': {'sitio': ['BUGA']},
+        'orden': [('Área', True)],
+        'fila_total': True,
+    },
+    'areas_buga': {
+        'origenes': ['Planta'],
+        'dimensiones': ['area'],
+        'solo': {'sitio': ['BUGA']},
+        'etiquetas': {'area': 'Área en BUGA'},
+        'orden': [('Área en BUGA', True)],
+    },
+}
+
+REPORTES = {
+    'indicadores': REPORTE_INDICADORES,
+    'areas_contratos': REPORTE_AREAS_CONTRATOS,
+    'personal_activo': REPORTE_PERSONAL_ACTIVO,
+    'retiros': REPORTE_RETIROS,
+}
+
+
+# ---------- EJECUCIÓN ----------
+def planificar(reporte):
+    """
+    Retorna (origenes, dimensiones) del conteo compartido: la unión de los orígenes y de
+    las dimensiones (incluidas las requeridas y las de filtro) de todas las tablas del reporte.
+    """
+    origenes, dimensiones = [], []
+    for definicion in reporte.values():
+        origenes += [o for o in definicion['origenes'] if o not in origenes]
+        requeridas = [d for extra in definicion.get('requiere', {}).values() for d in extra]
+        filtros = list(definicion.get('solo', {})) + list(definicion.get('excluir', {}))
+        dimensiones += [d for d in definicion['dimensiones'] + requeridas + filtros if d not in dimensiones]
+    return origenes, dimensiones
+
+
+def agregar(filas, por, distintas=False):
+    """
+    Total de las filas del conteo compartido por las columnas 'por' (o el total general si
+    'por' está vacío): la suma de 'Total' o, con distintas=True, las personas distintas.
+    """
+    columna, funcion = ('persona', 'nunique') if distintas else ('Total', 'sum')
+    if not por:
+        return getattr(filas[columna], funcion)()
+    return getattr(filas.groupby(por)[columna], funcion)()
+
+
+def construir_tabla(base, definicion, distintas=False):
+    """
+    Arma una tabla del reporte a partir del conteo compartido (no vuelve a los registros).
+    Con distintas=True el conteo trae la persona y los totales cuentan personas distintas:
+    no se suman entre grupos porque una persona puede estar en varios.
+    """
+    dimensiones = definicion['dimensiones']
+    etiquetas = [definicion.get('etiquetas', {}).get(d, ETIQUETAS.get(d, d)) for d in dimensiones]
+    filas = base[base['origen'].isin(definicion['origenes'])]
+    for dimension, valores in definicion.get('solo', {}).items():
+        filas = filas[filas[dimension].isin(valores)]
+    for dimension, valores in definicion.get('excluir', {}).items():
+        filas = filas[~filas[dimension].isin(valores)]
+
+    # Sin vacíos en las dimensiones de la tabla ni en las requeridas por origen
+    mascara = filas[dimensiones].notna().all(axis=1)
+    for origen, requeridas in definicion.get('requiere', {}).items():
+        mascara &= ~((filas['origen'] == origen) & filas[requeridas].isna().any(axis=1))
+    filas = filas[mascara]
+
+    pivote = definicion.get('pivote')
+    if pivote:
+        columnas = etiquetas + list(definicion['origenes']) + ['Total General']
+        if filas.empty:
+            return pd.DataFrame(columns=columnas)
+        tabla = pd.pivot_table(
+            filas, values='persona' if distintas else 'Total', index=dimensiones, columns=pivote,
+            aggfunc='nunique' if distintas else 'sum', fill_value=0
+        ).reset_index()
+        tabla.columns.name = None
+        for origen in definicion['origenes']:
+            if origen not in tabla.columns:
+                tabla[origen] = 0
+        general = agregar(filas, dimensiones, distintas)
+        tabla['Total General'] = general.reindex(tabla.set_index(dimensiones).index).to_numpy()
+    else:
+        columnas = etiquetas + ['Total'] + (['Origen'] if definicion.get('columna_origen') else [])
+        if filas.empty:
+            return pd.DataFrame(columns=columnas)
+        tabla = agregar(filas, dimensiones, distintas).rename('Total').reset_index()
+        if definicion.get('columna_origen'):
+            tabla['Origen'] = definicion['origenes'][0]
+    tabla = tabla.rename(columns=dict(zip(dimensiones, etiquetas)))
+
+    orden = definicion.get('orden')
+    if orden:
+        tabla = tabla.sort_values([c for c, _ in orden], ascending=[a for _, a in orden])
+
+    if definicion.get('fila_total'):
+        if distintas:
+            # Personas distintas de cada columna de origen y del total (no la suma de las filas)
+            totales = {
+                c: agregar(filas[filas[pivote] == c] if pivote and c in definicion['origenes'] else filas, [], True)
+                for c in tabla.drop(columns=etiquetas).select_dtypes('number').columns
+            }
+        else:
+            totales = tabla.drop(columns=etiquetas).select_dtypes('number').sum()
+        fila = pd.DataFrame({etiquetas[0]: [TOTAL], **{c: [v] for c, v in totales.items()}})
+        tabla = pd.concat([tabla, fila], ignore_index=True)
+    return tabla
+
+
+def ejecutar_reporte(reporte, data_dict, novedades, fecha_min, fecha_max, motor=None, distintas=False):
+    """
+    Calcula todas las tablas de un reporte con un solo conteo de los registros filtrados
+    (por origen y la unión de las dimensiones, conservando los vacíos) en el motor de
+    consultas indicado. Cada tabla se obtiene sumando ese conteo, que es pequeño, en lugar
+    de hacer un value_counts / groupby por tabla sobre las filas. Con distintas=True el
+    conteo se hace además por persona y las tablas cuentan personas distintas.
+
+    Retorna un diccionario {nombre de la tabla: DataFrame}.
+    """
+    origenes, dimensiones = planificar(reporte)
+    base = contar(
+        data_dict, ['origen'] + dimensiones + (['persona'] if distintas else []), origenes, novedades,
+        fecha_min, fecha_max, motor=motor, incluir_nulos=True
+    )
+    return {nombre: construir_tabla(base, definicion, distintas) for nombre, definicion in reporte.items()}
+
+
+def reporte_de_filas(reporte, filas):
+    """
+    Calcula las tablas de un reporte a partir de un subconjunto ya elegido de la tabla
+    unificada (por ejemplo, los activos a una fecha de corte): el conteo compartido se arma
+    agrupando esas filas en lugar de filtrar por novedad y rango de fechas.
+    """
+    origenes, dimensiones = planificar(reporte)
+    por = ['origen'] + dimensiones
+    datos = filas.loc[filas['origen'].isin(origenes), por].astype(object)
+    base = datos.groupby(por, dropna=False).size().rename('Total').reset_index()
+    base['Total'] = base['Total'].astype('int64')
+    base = base.where(base.notna(), None)
+    return {nombre: construir_tabla(base, definicion) for nombre, definicion in reporte.items()}
+
+
+# Tablas cacheadas por versión de los datos, filtros y motor (los datos no se hashean)
+@st.cache_data(ttl=3600, max_entries=64, show_spinner=False)
+def _reporte_por_version(version, nombre, novedades, fecha_min, fecha_max, motor, distintas, _data_dict):
+    return ejecutar_reporte(REPORTES[nombre], _data_dict, list(novedades), fecha_min, fecha_max, motor, distintas)
+
+
+def obtener_reporte(data_dict, nombre, novedades, fecha_min, fecha_max, distintas=False):
+    """Retorna las tablas del reporte 'nombre', calculadas una sola vez por versión y filtros."""
+    return _reporte_por_version(
+        version_datos(data_dict), nombre, tuple(sorted(novedades)),
+        pd.Timestamp(fecha_min), pd.Timestamp(fecha_max), motor_actual(), distintas, data_dict
+    )
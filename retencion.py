@@ -0,0 +1,128 @@
+import streamlit as st
+import pandas as pd
+import plotly.graph_objects as go
+from utils import load_all_data
+from registros import obtener_registros, ORIGENES
+from cohortes import obtener_retencion, EDADES_MESES
+import instrumentacion
+from instrumentacion import medir
+
+# Dimensiones por las que se puede separar la matriz de retención
+AGRUPACIONES = {
+    'Sin agrupar': [],
+    'Origen': ['origen'],
+    'Tipo de Contrato': ['contrato'],
+    'Origen y Tipo de Contrato': ['origen', 'contrato'],
+}
+
+def run():
+    """
+    Módulo que muestra, para cada mes de ingreso (cohorte), el porcentaje de personas
+    que sigue activo 1, 3, 6 y 12 meses después, como mapa de calor.
+    """
+    # Cargar datos
+    instrumentacion.etapa('carga')
+    with st.spinner("Cargando datos..."):
+        data_dict = load_all_data()
+        registros = obtener_registros(data_dict)
+    
+    # ---------- FILTROS EN LA BARRA LATERAL ----------
+    instrumentacion.etapa('filtros_sidebar')
+    st.sidebar.header("Filtros")
+    
+    # 1. ORIGEN DE LOS DATOS
+    todos_origenes = list(ORIGENES.values())
+    origenes_seleccionados = st.sidebar.multiselect(
+        "Origen",
+        options=todos_origenes,
+        default=todos_origenes,
+        key="origenes_retencion"
+    )
+    if not origenes_seleccionados:
+        st.sidebar.warning("Por favor, seleccione al menos un origen.")
+        origenes_seleccionados = todos_origenes
+    
+    # 2. TIPO DE NOVEDAD
+    todos_tipos = sorted(registros['tipo_novedad'].dropna().astype(str).unique().tolist())
+    tipos_novedad_seleccionados = st.sidebar.multiselect(
+        "Seleccione Tipo(s) de Novedad",
+        options=todos_tipos,
+        default=todos_tipos,
+        key="tipos_novedad_retencion"
+    )
+    if not tipos_novedad_seleccionados:
+        st.sidebar.warning("Por favor, seleccione al menos un tipo de novedad.")
+        tipos_novedad_seleccionados = todos_tipos
+    
+    # 3. AGRUPACIÓN
+    agrupacion = st.sidebar.selectbox("Separar por", list(AGRUPACIONES), key="agrupacion_retencion")
+    
+    # La fecha de corte es hoy: forma parte de la clave de caché
+    fecha_corte = pd.Timestamp.now().normalize()
+    
+    # ---------- CÁLCULO DE LA MATRIZ ----------
+    instrumentacion.etapa('agregacion', filas=len(registros))
+    matriz = obtener_retencion(
+        data_dict, origenes_seleccionados, tipos_novedad_seleccionados,
+        AGRUPACIONES[agrupacion], fecha_corte
+    )
+    
+    st.header("Retención por Cohorte de Ingreso")
+    st.caption(
+        "Porcentaje de las personas que ingresaron cada mes y seguían activas a los "
+        f"{', '.join(str(e) for e in EDADES_MESES)} meses del ingreso. Las celdas vacías "
+        "corresponden a edades que la cohorte aún no alcanza."
+    )
+    
+    if matriz.empty:
+        st.warning("No hay datos disponibles con los filtros seleccionados.")
+        return
+    
+    # Grupo y rango de cohortes a mostrar
+    grupos = matriz['Grupo'].unique().tolist()
+    col1, col2 = st.columns(2)
+    with col1:
+        grupo = st.selectbox(agrupacion if agrupacion != 'Sin agrupar' else "Grupo", grupos, key="grupo_retencion")
+    datos_grupo = matriz[matriz['Grupo'] == grupo].set_index('Cohorte')
+    cohortes = datos_grupo.index.tolist()
+    with col2:
+        if len(cohortes) > 1:
+            desde, hasta = st.select_slider(
+                "Cohortes",
+                options=cohortes,
+                value=(cohortes[max(0, len(cohortes) - 24)], cohortes[-1]),
+                key="cohortes_retencion"
+            )
+        else:
+            desde, hasta = cohortes[0], cohortes[-1]
+    datos_grupo = datos_grupo.loc[desde:hasta]
+    
+    # ---------- MAPA DE CALOR ----------
+    instrumentacion.etapa('graficos')
+    columnas_edad = [f"{e} meses" for e in EDADES_MESES]
+    valores = datos_grupo[columnas_edad]
+    fig = go.Figure(go.Heatmap(
+        z=valores.to_numpy(),
+        x=columnas_edad,
+        y=valores.index.tolist(),
+        zmin=0,
+        zmax=100,
+        colorscale='RdYlGn',
+        colorbar={'title': 'Activos (%)'},
+        customdata=datos_grupo[['Ingresos']].to_numpy().repeat(len(columnas_edad), axis=1),
+        hovertemplate="Cohorte %{y}<br>%{x}: %{z:.1f}%<br>Ingresos: %{customdata}<extra></extra>"
+    ))
+    fig.update_layout(
+        title=f"Retención por cohorte — {grupo}",
+        xaxis_title="Meses desde el ingreso",
+        yaxis_title="Mes de ingreso",
+        yaxis={'autorange': 'reversed', 'type': 'category'},
+        height=max(400, 22 * len(valores) + 150)
+    )
+    with medir('render'):
+        st.plotly_chart(fig, use_container_width=True)
+    
+    # ---------- TABLA ----------
+    st.subheader("Matriz de retención (%)")
+    with medir('render', filas=len(datos_grupo)):
+        st.dataframe(datos_grupo.drop(columns='Grupo'), use_container_width=True)
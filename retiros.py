@@ -2,7 +2,114 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 from datetime import datetime, timedelta
-from utils import load_all_data
+from utils import load_all_data, version_datos
+from esquema import obtener_esquemas, mostrar_diagnostico
+from reportes import obtener_reporte
+from registros import obtener_registros
+from exportacion import mostrar_exportacion
+from visor import mostrar_visor
+from comparacion import selector_periodo_comparacion, obtener_comparacion, mostrar_comparacion, filas_en_rango
+from rotacion import obtener_rotacion, GRANOS
+import instrumentacion
+from instrumentacion import medir
+
+# Nombre de la categoría que agrupa los motivos menos frecuentes
+OTROS_MOTIVOS = 'Otros'
+
+# Agrupaciones de la tasa de rotación: (columnas de la tabla unificada, orígenes incluidos)
+AGRUPACIONES_ROTACION = {
+    'Origen': (['origen'], ['Planta', 'Manipuladoras']),
+    'Empresa (Planta)': (['empresa'], ['Planta']),
+    'Programa (Manipuladoras)': (['programa'], ['Manipuladoras']),
+    'Área': (['area'], ['Planta', 'Manipuladoras']),
+}
+
+def colapsar_motivos(pivot_motivos, top_n):
+    """
+    Conserva los top_n motivos con más retiros y agrupa el resto en 'Otros'.
+    Con top_n = 0 (o si hay pocos motivos) retorna la tabla sin cambios.
+    """
+    if not top_n or len(pivot_motivos) <= top_n:
+        return pivot_motivos
+    
+    ordenado = pivot_motivos.sort_values('Total General', ascending=False)
+    principales = ordenado.iloc[:top_n]
+    resto = ordenado.iloc[top_n:]
+    
+    fila_otros = resto[['Planta', 'Manipuladoras', 'Total General']].sum().to_frame().T
+    fila_otros.insert(0, 'Motivo de Retiro', f"{OTROS_MOTIVOS} ({len(resto)} motivos)")
+    return pd.concat([principales, fila_otros], ignore_index=True)
+
+def construir_figuras_motivos(pivot_motivos, top_n=0):
+    """
+    Construye el gráfico de motivos por origen y el ranking total a partir
+    de la tabla resumen de motivos (ya agregada).
+    """
+    pivot_motivos = colapsar_motivos(pivot_motivos, top_n)
+    
+    # Crear un DataFrame para el gráfico con formato largo (long format)
+    graph_data = pd.melt(
+        pivot_motivos, 
+        id_vars=['Motivo de Retiro'], 
+        value_vars=['Planta', 'Manipuladoras'],
+        var_name='Origen', 
+        value_name='Cantidad'
+    )
+    
+    # Crear gráfico de barras agrupadas
+    fig = px.bar(
+        graph_data,
+        x='Motivo de Retiro',
+        y='Cantidad',
+        color='Origen',
+        barmode='group',
+        title='Cantidad de Retiros por Motivo',
+        labels={'Cantidad': 'Número de Retiros', 'Motivo de Retiro': 'Motivo', 'Origen': 'Origen de Datos'},
+        height=600
+    )
+    
+    # Personalizar el diseño
+    fig.update_layout(
+        xaxis_title="Motivo de Retiro",
+        yaxis_title="Cantidad de Retiros",
+        legend_title="Origen de Datos",
+        xaxis={'categoryorder':'total descending'},
+        plot_bgcolor='rgba(240, 240, 240, 0.5)'
+    )
+    
+    # Crear un gráfico para el total general
+    total_general = pivot_motivos[['Motivo de Retiro', 'Total General']].sort_values('Total General', ascending=False)
+    
+    fig_total = px.bar(
+        total_general,
+        x='Motivo de Retiro',
+        y='Total General',
+        title='Total de Retiros por Motivo (Ambas Fuentes)',
+        labels={'Total General': 'Número de Retiros', 'Motivo de Retiro': 'Motivo'},
+        height=400,
+        color='Total General',
+        color_continuous_scale='Viridis'
+    )
+    
+    # Personalizar el diseño
+    fig_total.update_layout(
+        xaxis_title="Motivo de Retiro",
+        yaxis_title="Total de Retiros",
+        xaxis={'categoryorder':'total descending'},
+        plot_bgcolor='rgba(240, 240, 240, 0.5)'
+    )
+    
+    return fig, fig_total
+
+# Figuras cacheadas: la clave es (versión de datos, filtros, top N); la tabla no se hashea.
+# Se usa cache_resource para reutilizar el mismo objeto sin copiarlo (las figuras no se modifican).
+@st.cache_resource(ttl=3600, max_entries=64, show_spinner=False)
+def figuras_motivos_cacheadas(version, filtros, top_n, _pivot_motivos):
+    """
+    Retorna las figuras de motivos de retiro reutilizando las ya construidas
+    para la misma versión de datos y el mismo estado de filtros.
+    """
+    return construir_figuras_motivos(_pivot_motivos, top_n)
 
 def run():
     """
@@ -12,6 +119,7 @@ def run():
     Incluye un gráfico de columnas para visualizar la cantidad de retiros por motivo.
     """
     # Cargar datos
+    instrumentacion.etapa('carga')
     with st.spinner("Cargando datos..."):
         data_dict = load_all_data()
         
@@ -20,6 +128,7 @@ def run():
         planta_df = data_dict['planta'].copy()
     
     # ---------- FILTROS EN LA BARRA LATERAL ----------
+    instrumentacion.etapa('filtros_sidebar')
     st.sidebar.header("Filtros")
     
     # 1. FILTRO DE TIPO DE NOVEDAD (MULTISELECT)
@@ -62,23 +171,7 @@ def run():
     # 2. FILTRO DE FECHAS
     st.sidebar.subheader("Rango de Fechas")
     
-    # Preparar las fechas en los DataFrames para el filtrado
-    for df_name, df in [('manipuladoras', manipuladoras_df), ('planta', planta_df)]:
-        # Fechas de ingreso
-        if 'FECHA DE INGRESO (AAAAMMDD)' in df.columns:
-            df['fecha_ingreso'] = pd.to_datetime(
-                df['FECHA DE INGRESO (AAAAMMDD)'], 
-                format='%Y%m%d', 
-                errors='coerce'
-            )
-        
-        # Fechas de retiro
-        if 'FECHA DE RETIRO (AAAAMMDD)' in df.columns:
-            df['fecha_retiro'] = pd.to_datetime(
-                df['FECHA DE RETIRO (AAAAMMDD)'], 
-                format='%Y%m%d', 
-                errors='coerce'
-            )
+    # Las columnas fecha_ingreso y fecha_retiro ya vienen convertidas por el cargador
     
     # Obtener todas las fechas según el tipo de novedad seleccionado
     fechas = []
@@ -123,271 +216,168 @@ def run():
     fecha_min = pd.Timestamp(date_range[0])
     fecha_max = pd.Timestamp(date_range[1])
     
-    # ---------- APLICAR FILTROS A LOS DATOS ----------
-    # Función para aplicar filtros a cada DataFrame
-    def aplicar_filtros(df):
-        # Crear una copia para no modificar el original
-        df_filtrado = df.copy()
-        
-        # 1. Filtrar por tipo de novedad
-        if 'tipo_novedad' in df_filtrado.columns:
-            df_filtrado = df_filtrado[
-                df_filtrado['tipo_novedad'].isin(tipos_novedad_seleccionados)
-            ]
-        
-        # 2. Filtrar por fechas
-        mask = pd.Series(False, index=df_filtrado.index)
-        
-        # Aplicar filtros según tipo de novedad
-        if any(item in ["ACTIVO", "CASO ESPECIAL"] for item in tipos_novedad_seleccionados):
-            if 'fecha_ingreso' in df_filtrado.columns:
-                mask_ingreso = (
-                    (df_filtrado['fecha_ingreso'] >= fecha_min) & 
-                    (df_filtrado['fecha_ingreso'] <= fecha_max) &
-                    (df_filtrado['tipo_novedad'].isin(['ACTIVO', 'CASO ESPECIAL']))
-                )
-                mask = mask | mask_ingreso
-        
-        if "RETIRADO" in tipos_novedad_seleccionados:
-            if 'fecha_retiro' in df_filtrado.columns:
-                mask_retiro = (
-                    (df_filtrado['fecha_retiro'] >= fecha_min) & 
-                    (df_filtrado['fecha_retiro'] <= fecha_max) &
-                    (df_filtrado['tipo_novedad'] == 'RETIRADO')
-                )
-                mask = mask | mask_retiro
-        
-        # Aplicar la máscara
-        df_filtrado = df_filtrado[mask]
-        
-        return df_filtrado
+    # Periodo opcional para comparar las tablas
+    periodo_comparacion = selector_periodo_comparacion('retiros', fecha_min, fecha_max)
+    
+    # 3. OPCIONES DE LOS GRÁFICOS
+    st.sidebar.subheader("Gráficos")
+    top_n_motivos = st.sidebar.number_input(
+        "Motivos a mostrar (el resto se agrupa en 'Otros', 0 = todos)",
+        min_value=0,
+        value=15,
+        step=1,
+        key="top_n_motivos"
+    )
     
-    # Aplicar filtros a cada DataFrame
-    manipuladoras_filtradas = aplicar_filtros(manipuladoras_df)
-    planta_filtrada = aplicar_filtros(planta_df)
+    # 4. OPCIONES DE LA TASA DE ROTACIÓN
+    st.sidebar.subheader("Rotación")
+    grano_rotacion = st.sidebar.radio(
+        "Periodo",
+        options=list(GRANOS),
+        format_func=lambda g: GRANOS[g],
+        key="grano_rotacion"
+    )
+    agrupacion_rotacion = st.sidebar.selectbox(
+        "Agrupar rotación por",
+        list(AGRUPACIONES_ROTACION),
+        key="agrupacion_rotacion"
+    )
+    
+    # ---------- APLICAR FILTROS A LOS DATOS ----------
+    instrumentacion.etapa('filtrado')
+    filas_detalle = filas_en_rango(
+        obtener_registros(data_dict), tipos_novedad_seleccionados, fecha_min, fecha_max
+    )
+    filas_detalle = filas_detalle[filas_detalle['origen'].isin(['Planta', 'Manipuladoras'])]
+    registros_por_origen = filas_detalle['origen'].astype(object).value_counts()
     
     # ---------- MOSTRAR INFORMACIÓN DE RESULTADOS ----------
     col1, col2 = st.columns(2)
     with col1:
-        st.info(f"Registros filtrados en Manipuladoras: {len(manipuladoras_filtradas)}")
+        st.info(f"Registros filtrados en Manipuladoras: {registros_por_origen.get('Manipuladoras', 0)}")
     with col2:
-        st.info(f"Registros filtrados en Planta: {len(planta_filtrada)}")
+        st.info(f"Registros filtrados en Planta: {registros_por_origen.get('Planta', 0)}")
 
     # ---------- BUSCAR COLUMNAS NECESARIAS ----------
-    def encontrar_columna_por_posicion(df, posicion, nombre_alternativo=None):
-        """Busca una columna por posición o nombre alternativo."""
-        columna = None
-        
-        # 1. Buscar por posición
-        if len(df.columns) > posicion:
-            columna = df.columns[posicion]
-        
-        # 2. Si no se encuentra por posición, buscar por nombre alternativo
-        if columna is None and nombre_alternativo:
-            for nombre in nombre_alternativo:
-                if nombre in df.columns:
-                    columna = nombre
-                    break
-        
-        return columna
-    
-    # Buscar las columnas necesarias
-    planta_motivo_retiro_col = encontrar_columna_por_posicion(
-        planta_filtrada, 
-        10,  # Posición K
-        ['MOTIVO DEL RETIRO', 'Motivo del Retiro', 'MOTIVO RETIRO']
-    )
-    
-    planta_empresa_col = encontrar_columna_por_posicion(
-        planta_filtrada, 
-        5,  # Posición F
-        ['EMPRESA', 'Empresa']
-    )
-    
-    manipuladoras_motivo_retiro_col = encontrar_columna_por_posicion(
-        manipuladoras_filtradas, 
-        17,  # Posición R
-        ['MOTIVO DEL RETIRO', 'Motivo del Retiro', 'MOTIVO RETIRO']
-    )
-    
-    manipuladoras_programa_col = encontrar_columna_por_posicion(
-        manipuladoras_filtradas, 
-        7,  # Posición H
-        ['PROGRAMA AL QUE PERTENECE', 'Programa al que Pertenece', 'PROGRAMA']
-    )
+    instrumentacion.etapa('resolucion_columnas')
+    # Resolver las columnas por campo lógico (una vez por versión del encabezado)
+    esquemas = obtener_esquemas(data_dict)
+    planta_motivo_retiro_col = esquemas['planta']['motivo']
+    planta_empresa_col = esquemas['planta']['empresa']
+    manipuladoras_motivo_retiro_col = esquemas['manipuladoras']['motivo']
+    manipuladoras_programa_col = esquemas['manipuladoras']['programa']
     
     # Mostrar advertencia si no se encuentran las columnas
-    missing_cols = []
-    if not planta_motivo_retiro_col:
-        missing_cols.append("MOTIVO DEL RETIRO (Planta, posición K)")
-    if not planta_empresa_col:
-        missing_cols.append("EMPRESA (Planta, posición F)")
-    if not manipuladoras_motivo_retiro_col:
-        missing_cols.append("MOTIVO DEL RETIRO (Manipuladoras, posición R)")
-    if not manipuladoras_programa_col:
-        missing_cols.append("PROGRAMA AL QUE PERTENECE (Manipuladoras, posición H)")
-    
-    if missing_cols:
-        st.warning(f"No se encontraron las siguientes columnas: {', '.join(missing_cols)}")
-        st.info("Por favor, verifica los nombres o posiciones de las columnas en los datos.")
+    mostrar_diagnostico(esquemas, {
+        'planta': ['motivo', 'empresa'],
+        'manipuladoras': ['motivo', 'programa'],
+    })
     
     # ---------- CREAR TABLAS DE AGRUPACIÓN ----------
-    # 1. PLANTA - Motivos de retiro por Empresa
-    st.header("Motivos de Retiro por Empresa (Planta)")
+    instrumentacion.etapa('agregacion')
+    # Todas las tablas de la página salen de un solo conteo de los registros filtrados
+    tablas = obtener_reporte(data_dict, 'retiros', tipos_novedad_seleccionados, fecha_min, fecha_max)
+    
+    # Función para mostrar una tabla de motivos con los mensajes de la página
+    def mostrar_tabla(tabla, titulo, origen, columnas_disponibles):
+        st.header(titulo)
+        if not columnas_disponibles or registros_por_origen.get(origen, 0) == 0:
+            st.warning(f"No hay datos disponibles de {origen} o faltan las columnas necesarias.")
+            return False
+        if tabla.empty:
+            st.warning(f"No hay datos de retiros disponibles en {origen} con los filtros seleccionados.")
+            return False
+        with medir('render', filas=len(tabla)):
+            st.dataframe(tabla, use_container_width=True)
+        return True
     
-    if planta_motivo_retiro_col and planta_empresa_col and not planta_filtrada.empty:
-        # Normalizar las columnas para el conteo
-        planta_filtrada['motivo_retiro_normalizado'] = planta_filtrada[planta_motivo_retiro_col]
-        planta_filtrada['empresa_normalizada'] = planta_filtrada[planta_empresa_col]
-        
-        # Filtrar solo registros que tengan motivo de retiro
-        planta_con_motivo = planta_filtrada.dropna(subset=['motivo_retiro_normalizado'])
-        
-        if not planta_con_motivo.empty:
-            # Agrupar por empresa y motivo de retiro
-            conteo_planta = planta_con_motivo.groupby(['empresa_normalizada', 'motivo_retiro_normalizado']).size().reset_index()
-            conteo_planta.columns = ['Empresa', 'Motivo de Retiro', 'Total']
-            
-            # Ordenar por empresa y total (descendente)
-            conteo_planta = conteo_planta.sort_values(['Empresa', 'Total'], ascending=[True, False])
-            
-            # Mostrar la tabla
-            st.dataframe(conteo_planta, use_container_width=True)
-            
-            # Crear un dataframe para el total por motivo (para el gráfico)
-            total_por_motivo_planta = planta_con_motivo['motivo_retiro_normalizado'].value_counts().reset_index()
-            total_por_motivo_planta.columns = ['Motivo de Retiro', 'Total']
-            total_por_motivo_planta['Origen'] = 'Planta'
-        else:
-            st.warning("No hay datos de retiros disponibles en Planta con los filtros seleccionados.")
-            total_por_motivo_planta = pd.DataFrame(columns=['Motivo de Retiro', 'Total', 'Origen'])
-    else:
-        st.warning("No hay datos disponibles de Planta o faltan las columnas necesarias.")
-        total_por_motivo_planta = pd.DataFrame(columns=['Motivo de Retiro', 'Total', 'Origen'])
+    # 1. PLANTA - Motivos de retiro por Empresa
+    hay_planta = mostrar_tabla(
+        tablas['planta'], "Motivos de Retiro por Empresa (Planta)", "Planta",
+        planta_motivo_retiro_col and planta_empresa_col
+    )
     
     # 2. MANIPULADORAS - Motivos de retiro por Programa
-    st.header("Motivos de Retiro por Programa (Manipuladoras)")
-    
-    if manipuladoras_motivo_retiro_col and manipuladoras_programa_col and not manipuladoras_filtradas.empty:
-        # Normalizar las columnas para el conteo
-        manipuladoras_filtradas['motivo_retiro_normalizado'] = manipuladoras_filtradas[manipuladoras_motivo_retiro_col]
-        manipuladoras_filtradas['programa_normalizado'] = manipuladoras_filtradas[manipuladoras_programa_col]
-        
-        # Filtrar solo registros que tengan motivo de retiro
-        manipuladoras_con_motivo = manipuladoras_filtradas.dropna(subset=['motivo_retiro_normalizado'])
-        
-        if not manipuladoras_con_motivo.empty:
-            # Agrupar por programa y motivo de retiro
-            conteo_manipuladoras = manipuladoras_con_motivo.groupby(['programa_normalizado', 'motivo_retiro_normalizado']).size().reset_index()
-            conteo_manipuladoras.columns = ['Programa', 'Motivo de Retiro', 'Total']
-            
-            # Ordenar por programa y total (descendente)
-            conteo_manipuladoras = conteo_manipuladoras.sort_values(['Programa', 'Total'], ascending=[True, False])
-            
-            # Mostrar la tabla
-            st.dataframe(conteo_manipuladoras, use_container_width=True)
-            
-            # Crear un dataframe para el total por motivo (para el gráfico)
-            total_por_motivo_manipuladoras = manipuladoras_con_motivo['motivo_retiro_normalizado'].value_counts().reset_index()
-            total_por_motivo_manipuladoras.columns = ['Motivo de Retiro', 'Total']
-            total_por_motivo_manipuladoras['Origen'] = 'Manipuladoras'
-        else:
-            st.warning("No hay datos de retiros disponibles en Manipuladoras con los filtros seleccionados.")
-            total_por_motivo_manipuladoras = pd.DataFrame(columns=['Motivo de Retiro', 'Total', 'Origen'])
-    else:
-        st.warning("No hay datos disponibles de Manipuladoras o faltan las columnas necesarias.")
-        total_por_motivo_manipuladoras = pd.DataFrame(columns=['Motivo de Retiro', 'Total', 'Origen'])
+    hay_manipuladoras = mostrar_tabla(
+        tablas['manipuladoras'], "Motivos de Retiro por Programa (Manipuladoras)", "Manipuladoras",
+        manipuladoras_motivo_retiro_col and manipuladoras_programa_col
+    )
     
     # ---------- CREAR GRÁFICO DE COLUMNAS ----------
+    instrumentacion.etapa('graficos')
     st.header("Gráfico de Motivos de Retiro")
     
-    # Combinar los datos de ambas fuentes para el gráfico
-    if not total_por_motivo_planta.empty or not total_por_motivo_manipuladoras.empty:
-        # Concatenar los dataframes
-        total_por_motivo = pd.concat([total_por_motivo_planta, total_por_motivo_manipuladoras], ignore_index=True)
-        
-        # Agrupar por motivo de retiro y origen
-        pivot_motivos = pd.pivot_table(
-            total_por_motivo,
-            values='Total',
-            index='Motivo de Retiro',
-            columns='Origen',
-            aggfunc='sum',
-            fill_value=0
-        ).reset_index()
-        
-        # Asegurar que existan las columnas para ambos orígenes
-        if 'Planta' not in pivot_motivos.columns:
-            pivot_motivos['Planta'] = 0
-        if 'Manipuladoras' not in pivot_motivos.columns:
-            pivot_motivos['Manipuladoras'] = 0
-        
-        # Calcular el total general
-        pivot_motivos['Total General'] = pivot_motivos['Planta'] + pivot_motivos['Manipuladoras']
-        
-        # Ordenar por total general (descendente)
-        pivot_motivos = pivot_motivos.sort_values('Total General', ascending=False)
-        
+    # Tabla de motivos por origen (ya ordenada por total general descendente)
+    pivot_motivos = tablas['motivos']
+    if (hay_planta or hay_manipuladoras) and not pivot_motivos.empty:
         # Mostrar tabla resumen
         st.subheader("Tabla resumen de motivos de retiro")
-        st.dataframe(pivot_motivos, use_container_width=True)
-        
-        # Crear un DataFrame para el gráfico con formato largo (long format)
-        graph_data = pd.melt(
-            pivot_motivos, 
-            id_vars=['Motivo de Retiro'], 
-            value_vars=['Planta', 'Manipuladoras'],
-            var_name='Origen', 
-            value_name='Cantidad'
-        )
+        with medir('render', filas=len(pivot_motivos)):
+            st.dataframe(pivot_motivos, use_container_width=True)
         
-        # Crear gráfico de barras agrupadas
-        fig = px.bar(
-            graph_data,
-            x='Motivo de Retiro',
-            y='Cantidad',
-            color='Origen',
-            barmode='group',
-            title='Cantidad de Retiros por Motivo',
-            labels={'Cantidad': 'Número de Retiros', 'Motivo de Retiro': 'Motivo', 'Origen': 'Origen de Datos'},
-            height=600
-        )
-        
-        # Personalizar el diseño
-        fig.update_layout(
-            xaxis_title="Motivo de Retiro",
-            yaxis_title="Cantidad de Retiros",
-            legend_title="Origen de Datos",
-            xaxis={'categoryorder':'total descending'},
-            plot_bgcolor='rgba(240, 240, 240, 0.5)'
+        # Figuras cacheadas por versión de datos y estado de los filtros
+        filtros = (tuple(sorted(tipos_novedad_seleccionados)), fecha_min.isoformat(), fecha_max.isoformat())
+        fig, fig_total = figuras_motivos_cacheadas(
+            version_datos(data_dict), filtros, int(top_n_motivos), pivot_motivos
         )
         
         # Mostrar el gráfico
-        st.plotly_chart(fig, use_container_width=True)
-        
-        # Crear un gráfico para el total general
-        total_general = pivot_motivos[['Motivo de Retiro', 'Total General']].sort_values('Total General', ascending=False)
+        with medir('render'):
+            st.plotly_chart(fig, use_container_width=True)
         
-        fig_total = px.bar(
-            total_general,
-            x='Motivo de Retiro',
-            y='Total General',
-            title='Total de Retiros por Motivo (Ambas Fuentes)',
-            labels={'Total General': 'Número de Retiros', 'Motivo de Retiro': 'Motivo'},
-            height=400,
-            color='Total General',
-            color_continuous_scale='Viridis'
-        )
-        
-        # Personalizar el diseño
-        fig_total.update_layout(
-            xaxis_title="Motivo de Retiro",
-            yaxis_title="Total de Retiros",
-            xaxis={'categoryorder':'total descending'},
-            plot_bgcolor='rgba(240, 240, 240, 0.5)'
-        )
-        
-        # Mostrar el gráfico
-        st.plotly_chart(fig_total, use_container_width=True)
+        # Mostrar el gráfico del total general
+        with medir('render'):
+            st.plotly_chart(fig_total, use_container_width=True)
     else:
-        st.warning("No hay datos suficientes para generar el gráfico de motivos de retiro.")
\ No newline at end of file
+        st.warning("No hay datos suficientes para generar el gráfico de motivos de retiro.")
+    
+    # ---------- REGISTROS DETALLADOS Y EXPORTACIÓN ----------
+    mostrar_visor(data_dict, filas_detalle, 'retiros')
+    mostrar_exportacion(
+        data_dict, filas_detalle, ['motivo', 'empresa', 'programa'], 'retiros'
+    )
+    
+    # ---------- COMPARACIÓN CON OTRO PERIODO ----------
+    if periodo_comparacion:
+        instrumentacion.etapa('comparacion')
+        periodo_actual = (fecha_min, fecha_max)
+        comparacion = obtener_comparacion(
+            data_dict, ['Planta', 'Manipuladoras'], ['motivo', 'origen'],
+            tipos_novedad_seleccionados, periodo_actual, periodo_comparacion
+        )
+        mostrar_comparacion(comparacion, "Comparación de Motivos de Retiro", periodo_actual, periodo_comparacion)
+    
+    # ---------- TASA DE ROTACIÓN ----------
+    instrumentacion.etapa('rotacion')
+    st.header("Tasa de Rotación")
+    st.caption(
+        "Rotación = retiros del periodo / dotación promedio del periodo × 100. "
+        "La dotación promedio se calcula con la dotación diaria dentro del rango de fechas seleccionado."
+    )
+    
+    por_rotacion, origenes_rotacion = AGRUPACIONES_ROTACION[agrupacion_rotacion]
+    rotacion = obtener_rotacion(
+        data_dict, origenes_rotacion, por_rotacion, grano_rotacion, fecha_min, fecha_max
+    )
+    
+    if rotacion.empty:
+        st.warning("No hay datos suficientes para calcular la tasa de rotación.")
+        return
+    
+    fig_rotacion = px.line(
+        rotacion,
+        x='Periodo',
+        y='Rotación (%)',
+        color='Grupo',
+        markers=True,
+        title=f"Rotación {GRANOS[grano_rotacion].lower()} por {agrupacion_rotacion.lower()}",
+        labels={'Grupo': agrupacion_rotacion},
+        height=500
+    )
+    fig_rotacion.update_layout(plot_bgcolor='rgba(240, 240, 240, 0.5)')
+    with medir('render'):
+        st.plotly_chart(fig_rotacion, use_container_width=True)
+    
+    with st.expander("Ver tabla de rotación"):
+        with medir('render', filas=len(rotacion)):
+            st.dataframe(rotacion, use_container_width=True)
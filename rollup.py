@@ -0,0 +1,151 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from instrumentacion import medir
+
+# Etiqueta de los valores vacíos dentro de una dimensión
+SIN_DATO = 'Sin dato'
+
+# Etiqueta de la fila de total general
+TOTAL = 'TOTAL'
+
+
+def conjuntos_agrupacion(df, columnas, conjuntos, persona=None):
+    """
+    Cuenta filas para varios conjuntos de agrupación a la vez (como GROUPING SETS en SQL).
+
+    Se recorre la tabla una sola vez: cada columna se codifica con factorize y las filas se
+    cuentan por la clave combinada de todas las columnas (base mixta). Cada conjunto se
+    obtiene sumando esos conteos por la subclave de sus columnas, sin volver a las filas.
+
+    Con 'persona' (columna con la clave de identidad, ver identidad.py) se cuentan personas
+    distintas: se conservan los pares (clave, persona) distintos y cada conjunto cuenta los
+    pares distintos de su subclave (las personas no se suman entre grupos).
+
+    Retorna un DataFrame con las columnas, 'Total' y 'agrupacion' (máscara de bits de las
+    columnas agregadas, como GROUPING_ID: 0 = nivel más fino). Las columnas agregadas
+    quedan en None.
+    """
+    columnas = list(columnas)
+    salida = columnas + ['Total', 'agrupacion']
+    if df.empty:
+        return pd.DataFrame(columns=salida)
+
+    codigos, valores, bases = [], [], []
+    for columna in columnas:
+        serie = df[columna].astype(object).where(df[columna].notna(), SIN_DATO).astype(str)
+        c, v = pd.factorize(serie, sort=True)
+        codigos.append(c.astype(np.int64))
+        valores.append(np.asarray(v, dtype=object))
+        bases.append(len(v))
+
+    # Conteo por la clave más fina (un solo paso sobre las filas)
+    clave = np.zeros(len(df), dtype=np.int64)
+    for c, base in zip(codigos, bases):
+        clave = clave * base + c
+    if persona is None:
+        claves, conteos = np.unique(clave, return_counts=True)
+    else:
+        codigos_persona, unicas_persona = pd.factorize(df[persona])
+        personas = len(unicas_persona)
+        pares = np.unique(clave * personas + codigos_persona)
+        claves, personas_par = np.divmod(pares, personas)
+
+    # Dígitos de cada clave fina: el código de cada columna
+    digitos = []
+    resto = claves
+    for base in reversed(bases):
+        resto, digito = np.divmod(resto, base)
+        digitos.append(digito)
+    digitos = digitos[::-1]
+
+    partes = []
+    for conjunto in conjuntos:
+        indices = [columnas.index(c) for c in conjunto]
+        subclave = np.zeros(len(claves), dtype=np.int64)
+        for i in indices:
+            subclave = subclave * bases[i] + digitos[i]
+        unicas, posicion, inversa = np.unique(subclave, return_index=True, return_inverse=True)
+        parte = {
+            columna: (valores[i][digitos[i][posicion]] if i in indices else np.full(len(unicas), None, dtype=object))
+            for i, columna in enumerate(columnas)
+        }
+        inversa = inversa.ravel()
+        if persona is None:
+            parte['Total'] = np.bincount(inversa, weights=conteos, minlength=len(unicas)).astype(np.int64)
+        else:
+            grupo_par = np.unique(inversa * personas + personas_par) // personas
+            parte['Total'] = np.bincount(grupo_par, minlength=len(unicas)).astype(np.int64)
+        parte['agrupacion'] = sum(1 << (len(columnas) - 1 - i) for i in range(len(columnas)) if i not in indices)
+        partes.append(pd.DataFrame(parte, columns=salida))
+    return pd.concat(partes, ignore_index=True)
+
+
+def rollup(df, niveles, persona=None):
+    """
+    Conteos de todos los niveles de una jerarquía (como ROLLUP en SQL): por niveles[0],
+    por niveles[0..1], ..., el detalle completo y el total general, en un solo cálculo.
+    Con 'persona' cada nivel cuenta personas distintas (ver conjuntos_agrupacion).
+
+    Retorna un DataFrame con los niveles, 'Total' y 'nivel' (0 = total general,
+    len(niveles) = detalle), ordenado para que cada subtotal preceda a su detalle.
+    """
+    niveles = list(niveles)
+    conjuntos = [niveles[:k] for k in range(len(niveles), -1, -1)]
+    tabla = conjuntos_agrupacion(df, niveles, conjuntos, persona)
+    if tabla.empty:
+        return pd.DataFrame(columns=niveles + ['Total', 'nivel'])
+    tabla['nivel'] = tabla[niveles].notna().sum(axis=1)
+    tabla = tabla.drop(columns='agrupacion')
+    return tabla.sort_values(niveles, na_position='first', ignore_index=True)
+
+
+# Rollup cacheado por versión de los datos y estado de los filtros (los datos no se hashean)
+@st.cache_data(ttl=3600, max_entries=64, show_spinner=False)
+def rollup_cacheado(version, filtros, niveles, _datos, persona=None):
+    return rollup(_datos, list(niveles), persona)
+
+
+# Función para mostrar el desglose jerárquico a partir de un rollup ya calculado
+def mostrar_desglose(tabla, niveles, etiquetas, clave):
+    """
+    Muestra el primer nivel del rollup y permite expandir un valor por nivel con un
+    selector. Solo filtra la tabla precalculada: expandir un nivel no recalcula conteos.
+    """
+    niveles = list(niveles)
+    if tabla.empty:
+        st.warning("No hay datos disponibles con los filtros seleccionados.")
+        return
+
+    ruta = []
+    padre = tabla[tabla['nivel'] == 0]
+    for profundidad, nivel in enumerate(niveles):
+        seleccion = tabla['nivel'] == profundidad + 1
+        for anterior, valor in zip(niveles, ruta):
+            seleccion &= tabla[anterior] == valor
+        hijos = tabla.loc[seleccion, [nivel, 'Total']]
+        total_padre = int(padre['Total'].iloc[0]) if not padre.empty else int(hijos['Total'].sum())
+
+        vista = hijos.rename(columns={nivel: etiquetas.get(nivel, nivel)}).reset_index(drop=True)
+        vista['% del total'] = (vista['Total'] / total_padre * 100).round(1) if total_padre else 0.0
+        nombre_total = TOTAL if not ruta else f"{TOTAL} {' / '.join(ruta)}"
+        fila_total = pd.DataFrame({vista.columns[0]: [nombre_total], 'Total': [total_padre], '% del total': [100.0]})
+        vista = pd.concat([vista, fila_total], ignore_index=True)
+
+        if ruta:
+            st.markdown(f"**{' → '.join(ruta)}**")
+        with medir('render', filas=len(vista)):
+            st.dataframe(vista, use_container_width=True)
+
+        if profundidad + 1 == len(niveles):
+            break
+        opcion = st.selectbox(
+            f"Desglosar {etiquetas.get(nivel, nivel)}",
+            options=['—'] + hijos[nivel].tolist(),
+            key=f"desglose_{clave}_{profundidad}"
+        )
+        if opcion == '—':
+            break
+        ruta.append(opcion)
+        padre = tabla[seleccion & (tabla[nivel] == opcion)]
@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from dotacion import codigos_grupo, dias_desde_epoch, serie_dotacion
+from registros import obtener_registros
+from utils import version_datos
+
+# Granularidades soportadas (alias de periodo de pandas -> nombre visible)
+GRANOS = {'M': 'Mensual', 'Q': 'Trimestral', 'Y': 'Anual'}
+
+
+def _ordinales_periodo(fechas, grano):
+    """Ordinal del periodo (mes, trimestre o año) de cada fecha; NaT queda como -1."""
+    periodos = pd.PeriodIndex(pd.DatetimeIndex(fechas).to_period(grano))
+    ordinales = periodos.asi8.copy()
+    ordinales[periodos.isna()] = -1
+    return ordinales
+
+
+def tasa_rotacion(registros, por=None, grano='M', fecha_inicio=None, fecha_fin=None):
+    """
+    Calcula por periodo y grupo: retiros, dotación promedio y tasa de rotación
+    (retiros / dotación promedio × 100).
+
+    La dotación diaria sale de serie_dotacion; el promedio por periodo se obtiene con
+    una suma por tramos (np.add.reduceat) y los retiros con un conteo por casillas
+    (periodo, grupo). No hay ciclos por periodo.
+    """
+    por = list(por or [])
+    columnas = ['Periodo', 'Grupo', 'Retiros', 'Dotación Promedio', 'Rotación (%)']
+
+    diaria = serie_dotacion(registros, por=por, frecuencia='D', fecha_inicio=fecha_inicio, fecha_fin=fecha_fin)
+    if diaria.empty:
+        return pd.DataFrame(columns=columnas)
+    etiquetas = list(diaria.columns)
+    grupos = len(etiquetas)
+
+    # Tramos de días de cada periodo dentro de la ventana
+    ordinales_dias = _ordinales_periodo(diaria.index, grano)
+    inicios = np.flatnonzero(np.r_[True, ordinales_dias[1:] != ordinales_dias[:-1]])
+    largos = np.diff(np.r_[inicios, len(ordinales_dias)])
+    ordinales = ordinales_dias[inicios]
+    promedio = np.add.reduceat(diaria.to_numpy(dtype=np.float64), inicios, axis=0) / largos[:, None]
+
+    # Retiros dentro de la ventana, contados por (periodo, grupo)
+    codigos, etiquetas_registros = codigos_grupo(registros, por)
+    posicion_grupo = pd.Index(etiquetas).get_indexer(etiquetas_registros)
+    dias_retiro = dias_desde_epoch(registros['fecha_retiro'])
+    dentro = ~np.isnan(dias_retiro)
+    dentro &= dias_retiro >= dias_desde_epoch(pd.Series([diaria.index[0]]))[0]
+    dentro &= dias_retiro <= dias_desde_epoch(pd.Series([diaria.index[-1]]))[0]
+    grupo_retiro = posicion_grupo[codigos[dentro]]
+    periodo_retiro = np.searchsorted(ordinales, _ordinales_periodo(registros['fecha_retiro'][dentro], grano))
+    validos = grupo_retiro >= 0
+    retiros = np.bincount(
+        periodo_retiro[validos] * grupos + grupo_retiro[validos],
+        minlength=len(ordinales) * grupos
+    ).reshape(len(ordinales), grupos)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        tasa = np.where(promedio > 0, retiros / promedio * 100, np.nan)
+
+    nombres_periodo = pd.PeriodIndex.from_ordinals(ordinales, freq=grano).astype(str)
+    resultado = pd.DataFrame({
+        'Periodo': np.repeat(nombres_periodo, grupos),
+        'Grupo': np.tile(etiquetas, len(ordinales)),
+        'Retiros': retiros.ravel(),
+        'Dotación Promedio': promedio.ravel().round(1),
+        'Rotación (%)': tasa.ravel().round(2),
+    })
+    return resultado[columnas]
+
+
+# Rotación cacheada por versión de los datos y parámetros (los registros no se hashean)
+@st.cache_data(ttl=3600, max_entries=32, show_spinner=False)
+def _rotacion_por_version(version, origenes, por, grano, fecha_inicio, fecha_fin, _registros):
+    registros = _registros[_registros['origen'].isin(origenes)]
+    return tasa_rotacion(registros, por=list(por), grano=grano, fecha_inicio=fecha_inicio, fecha_fin=fecha_fin)
+
+
+def obtener_rotacion(data_dict, origenes, por, grano='M', fecha_inicio=None, fecha_fin=None):
+    """
+    Retorna la tabla de rotación para los orígenes, agrupación y granularidad indicados,
+    calculada una sola vez por versión de los datos.
+    """
+    return _rotacion_por_version(
+        version_datos(data_dict), tuple(origenes), tuple(por), grano,
+        fecha_inicio, fecha_fin, obtener_registros(data_dict)
+    )
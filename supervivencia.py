@@ -0,0 +1,146 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from dotacion import codigos_grupo, dias_desde_epoch, intervalos_vigencia
+from registros import obtener_registros
+from utils import version_datos
+
+# Días promedio de un mes (para expresar la antigüedad en meses)
+DIAS_MES = 30.4375
+
+# Tramos de antigüedad en meses: [límite inferior, siguiente límite)
+LIMITES_MESES = [0, 3, 6, 12, 24, 36, 60, 120]
+TRAMOS = [
+    '0-3 meses', '3-6 meses', '6-12 meses', '1-2 años',
+    '2-3 años', '3-5 años', '5-10 años', '10+ años',
+]
+
+
+def antiguedad_dias(registros, fecha_corte=None):
+    """
+    Retorna (mascara, dias, retirado) por registro:
+    - dias: días de permanencia (inclusive) hasta la fecha de retiro o hasta la fecha de corte.
+    - retirado: True si el retiro ocurrió en o antes de la fecha de corte (evento observado).
+    Se excluyen los registros sin intervalo de vigencia y los que ingresan después del corte.
+    """
+    mascara, inicio, fin = intervalos_vigencia(registros)
+    corte = dias_desde_epoch(pd.Series([fecha_corte or pd.Timestamp.now().normalize()]))[0]
+    retirado = ~np.isnan(fin) & (fin <= corte)
+    salida = np.where(retirado, fin, corte)
+    with np.errstate(invalid='ignore'):
+        mascara = mascara & (inicio <= corte) & (salida >= inicio)
+    dias = np.where(mascara, salida - inicio + 1, 0).astype(np.int64)
+    return mascara, dias, retirado
+
+
+def histograma_antiguedad(registros, por=None, estado='retiro', fecha_corte=None):
+    """
+    Cuenta registros por tramo de antigüedad y grupo.
+    estado='retiro': antigüedad al momento del retiro; estado='activo': antigüedad actual
+    de quienes siguen activos a la fecha de corte.
+
+    Retorna un DataFrame con un tramo por fila y un grupo por columna.
+    """
+    mascara, dias, retirado = antiguedad_dias(registros, fecha_corte)
+    seleccion = mascara & (retirado if estado == 'retiro' else ~retirado)
+    codigos, etiquetas = codigos_grupo(registros, por)
+
+    limites = np.floor(np.array(LIMITES_MESES) * DIAS_MES)
+    tramo = np.searchsorted(limites, dias[seleccion], side='right') - 1
+    grupos = len(etiquetas)
+    conteo = np.bincount(
+        tramo * grupos + codigos[seleccion],
+        minlength=len(TRAMOS) * grupos
+    ).reshape(len(TRAMOS), grupos)
+
+    tabla = pd.DataFrame(conteo, index=pd.Index(TRAMOS, name='Antigüedad'), columns=etiquetas)
+    return tabla.loc[:, tabla.sum() > 0]
+
+
+def curvas_supervivencia(registros, meses=120, fecha_corte=None):
+    """
+    Curvas de permanencia tipo Kaplan–Meier por cohorte (año de ingreso).
+
+    Las duraciones se ordenan por la clave compuesta cohorte * ancho + días, de modo que
+    un solo np.unique entrega, para todas las cohortes a la vez, los tiempos de retiro, las
+    personas en riesgo y los retiros de cada tiempo. El producto acumulado por cohorte se
+    calcula como suma acumulada de logaritmos por tramos.
+
+    Retorna (curvas, tamanos): curvas con índice 'Meses' (0..meses) y una columna por
+    cohorte con la proporción que sigue activa (NaN después de la última observación);
+    tamanos con la cantidad de personas por cohorte.
+    """
+    mascara, dias, retirado = antiguedad_dias(registros, fecha_corte)
+    cohorte = registros['fecha_ingreso'].dt.year.to_numpy()[mascara]
+    dias, retirado = dias[mascara], retirado[mascara]
+    indice_meses = pd.Index(np.arange(meses + 1), name='Meses')
+    if len(dias) == 0:
+        return pd.DataFrame(index=indice_meses), pd.Series(dtype=np.int64)
+
+    codigos, anios = pd.factorize(cohorte, sort=True)
+    etiquetas = [str(int(a)) for a in anios]
+    grupos = len(etiquetas)
+    ancho = int(dias.max()) + 1
+
+    # Tiempos distintos por cohorte, en riesgo y retiros en cada tiempo
+    claves = codigos.astype(np.int64) * ancho + dias
+    orden = np.argsort(claves, kind='stable')
+    claves, eventos = claves[orden], retirado[orden].astype(np.int64)
+    tiempos, primeros = np.unique(claves, return_index=True)
+    grupo_tiempo = tiempos // ancho
+    limites = np.searchsorted(claves, np.arange(grupos + 1) * ancho)
+    en_riesgo = limites[grupo_tiempo + 1] - primeros
+    retiros = np.add.reduceat(eventos, primeros)
+
+    # Producto acumulado de (1 - d/n) por cohorte; un factor 0 deja la curva en 0
+    factor = 1 - retiros / en_riesgo
+    ceros = factor <= 0
+    logaritmos = np.log(np.where(ceros, 1.0, factor))
+    inicio_tramo = np.searchsorted(tiempos, np.arange(grupos) * ancho)[grupo_tiempo]
+    suma = np.cumsum(logaritmos)
+    suma -= suma[inicio_tramo] - logaritmos[inicio_tramo]
+    ceros_acumulados = np.cumsum(ceros)
+    ceros_acumulados -= ceros_acumulados[inicio_tramo] - ceros[inicio_tramo]
+    supervivencia = np.exp(suma) * (ceros_acumulados == 0)
+
+    # Muestreo de las curvas (escalonadas) en cada mes, para todas las cohortes a la vez
+    dias_consulta = np.floor(indice_meses.to_numpy() * DIAS_MES).astype(np.int64)
+    base = np.arange(grupos, dtype=np.int64)[:, None] * ancho
+    posicion = np.searchsorted(tiempos, base + np.minimum(dias_consulta, ancho - 1), side='right') - 1
+    inicio_grupo = np.searchsorted(tiempos, base[:, 0])
+    valores = np.where(posicion >= inicio_grupo[:, None], supervivencia[np.maximum(posicion, 0)], 1.0)
+    ultimo = np.maximum.reduceat(dias[np.argsort(codigos, kind='stable')], limites[:-1])
+    valores[dias_consulta[None, :] > ultimo[:, None]] = np.nan
+
+    curvas = pd.DataFrame(valores.T, index=indice_meses, columns=etiquetas)
+    tamanos = pd.Series(np.diff(limites), index=etiquetas, name='Personas')
+    return curvas, tamanos
+
+
+# Resultados cacheados por versión de los datos y parámetros (los registros no se hashean)
+@st.cache_data(ttl=3600, max_entries=32, show_spinner=False)
+def _histograma_por_version(version, origenes, por, estado, fecha_corte, _registros):
+    registros = _registros[_registros['origen'].isin(origenes)]
+    return histograma_antiguedad(registros, por=list(por), estado=estado, fecha_corte=fecha_corte)
+
+
+@st.cache_data(ttl=3600, max_entries=32, show_spinner=False)
+def _curvas_por_version(version, origenes, meses, fecha_corte, _registros):
+    registros = _registros[_registros['origen'].isin(origenes)]
+    return curvas_supervivencia(registros, meses=meses, fecha_corte=fecha_corte)
+
+
+def obtener_histograma(data_dict, origenes, por, estado='retiro', fecha_corte=None):
+    """Histograma de antigüedad calculado una sola vez por versión de los datos y filtros."""
+    return _histograma_por_version(
+        version_datos(data_dict), tuple(origenes), tuple(por), estado,
+        fecha_corte, obtener_registros(data_dict)
+    )
+
+
+def obtener_curvas(data_dict, origenes, meses=120, fecha_corte=None):
+    """Curvas de permanencia por cohorte calculadas una sola vez por versión de los datos y filtros."""
+    return _curvas_por_version(
+        version_datos(data_dict), tuple(origenes), meses, fecha_corte, obtener_registros(data_dict)
+    )
@@ -0,0 +1,24 @@
+import os
+import sys
+
+import pytest
+
+# Los módulos del dashboard están en la raíz del repositorio
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Las pruebas no escriben instantáneas en el directorio de trabajo
+os.environ['INDICADORES_HISTORICO'] = ''
+
+
+@pytest.fixture(scope='session')
+def data_dict():
+    """Hojas sintéticas cargadas con el mismo cargador que las de Google Sheets."""
+    from benchmarks import cargar_datos_sinteticos
+    return cargar_datos_sinteticos(2000, semilla=3)
+
+
+@pytest.fixture(scope='session')
+def registros(data_dict):
+    """Tabla unificada de las hojas sintéticas."""
+    from registros import unificar
+    return unificar(data_dict)
@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+
+from busqueda import IndiceBusqueda, tokenizar
+
+
+def textos_prueba():
+    return pd.DataFrame({
+        'nombre': ['María Gómez', 'MARIO GOMEZ RUIZ', 'Ana Núñez', None, 'José María Pérez'],
+        'documento': ['1.144.567', '1144999', None, '31 222 333', 'CE-77'],
+    }, dtype=object)
+
+
+def por_recorrido(textos, consulta):
+    """Posiciones de los registros que cumplen la consulta, revisando registro por registro."""
+    terminos = [tokenizar(textos[c]) for c in textos.columns]
+    partes = tokenizar(pd.Series([consulta])).iloc[0]
+    encontrados = []
+    for fila in range(len(textos)):
+        propios = [t for lista in terminos for t in (lista.iloc[fila] if isinstance(lista.iloc[fila], list) else [])]
+        if all(any(t.startswith(p) for t in propios) for p in partes):
+            encontrados.append(fila)
+    return np.array(encontrados, dtype=np.int64)
+
+
+def test_indice_igual_a_recorrido():
+    textos = textos_prueba()
+    indice = IndiceBusqueda(textos)
+    for consulta in ['mar gom', 'maria', 'GOMEZ', 'gómez ruiz', '1144', '1.144.5', '31222', 'ce 77', 'nuñez', 'zz']:
+        np.testing.assert_array_equal(indice.buscar(consulta), por_recorrido(textos, consulta), err_msg=consulta)
+
+
+def test_consulta_vacia_e_indice_vacio():
+    assert len(IndiceBusqueda(textos_prueba()).buscar(' ,. ')) == 0
+    vacio = IndiceBusqueda(pd.DataFrame({'nombre': [None], 'documento': [None]}, dtype=object))
+    assert len(vacio.buscar('ana')) == 0
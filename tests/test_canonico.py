@@ -0,0 +1,62 @@
+import json
+
+import pandas as pd
+
+import canonico
+
+
+def test_variantes_son_una_categoria_con_tildes():
+    canonico.limpiar_memo()
+    serie = pd.Series(['Logística', ' LOGISTICA ', 'logística', None, 'Operaciones'])
+    resultado = canonico.canonizar(serie, 'area')
+    assert resultado.tolist() == ['LOGÍSTICA', 'LOGÍSTICA', 'LOGÍSTICA', None, 'OPERACIONES']
+
+
+def test_escritura_no_depende_del_orden():
+    canonico.limpiar_memo()
+    directo = canonico.canonizar(pd.Series(['ADMINISTRACION', 'Administración']), 'area')
+    inverso = canonico.canonizar(pd.Series(['Administración', 'ADMINISTRACION']), 'area')
+    assert directo.tolist() == inverso.tolist() == ['ADMINISTRACIÓN', 'ADMINISTRACIÓN']
+
+
+def test_escritura_no_depende_de_llamadas_anteriores():
+    canonico.limpiar_memo()
+    canonico.canonizar(pd.Series(['Administración']), 'area')
+    assert canonico.canonizar(pd.Series(['ADMINISTRACION']), 'area').tolist() == ['ADMINISTRACION']
+
+
+def test_memo_acotado():
+    canonico.limpiar_memo()
+    canonico.canonizar(pd.Series([f'valor {i}' for i in range(canonico.MAX_MEMO + 10)]), 'area')
+    assert canonico.valores_memoizados() <= canonico.MAX_MEMO
+
+
+def test_alias_por_campo(tmp_path, monkeypatch):
+    ruta = tmp_path / 'alias.json'
+    ruta.write_text(json.dumps({'area': {'Logistica': 'LOGÍSTICA Y TRANSPORTE'}}), encoding='utf-8')
+    monkeypatch.setattr(canonico, 'RUTA_ALIAS', str(ruta))
+    canonico.recargar_alias()
+    try:
+        resultado = canonico.canonizar(pd.Series(['logística', 'LOGISTICA']), 'area')
+        assert resultado.tolist() == ['LOGÍSTICA Y TRANSPORTE'] * 2
+        assert canonico.canonizar(pd.Series(['logística']), 'programa').tolist() == ['LOGÍSTICA']
+    finally:
+        monkeypatch.undo()
+        canonico.recargar_alias()
+
+
+def test_registros_se_recalculan_al_editar_alias(tmp_path, monkeypatch, data_dict):
+    import registros
+
+    ruta = tmp_path / 'alias.json'
+    monkeypatch.setattr(canonico, 'RUTA_ALIAS', str(ruta))
+    try:
+        antes = registros.obtener_registros(data_dict)
+        area = antes['area'].dropna().iloc[0]
+        ruta.write_text(json.dumps({'area': {area: 'ÁREA RENOMBRADA'}}), encoding='utf-8')
+        despues = registros.obtener_registros(data_dict)
+        assert 'ÁREA RENOMBRADA' in set(despues['area'].dropna())
+        assert area not in set(despues['area'].dropna())
+    finally:
+        monkeypatch.undo()
+        canonico.recargar_alias()
@@ -0,0 +1,53 @@
+import numpy as np
+
+import conversion
+import utils
+from benchmarks import cargar_datos_sinteticos
+
+
+def test_filas_grilla_numeros_solo_en_las_fechas():
+    texto = lambda v: {'formattedValue': v}
+    numero = lambda v, n: {'formattedValue': v, 'effectiveValue': {'numberValue': n}}
+    respuesta = {'sheets': [{'data': [{'rowData': [
+        {'values': [texto('CEDULA'), texto('FECHA'), texto('NOTA')]},
+        {'values': [numero('0123', 123.0), numero('31/01/2024', 45322.0), {}]},
+        {'values': [numero('9', 9.0), numero('20240131', 20240131), texto('x')]},
+        {},
+        {'values': [{}, numero('31/01/2024 18:00', 45322.75)]},
+        {'values': [{}, {}]},
+        {},
+    ]}]}]}
+    assert utils.filas_grilla(respuesta, ['FECHA', 'NO EXISTE']) == [
+        ['CEDULA', 'FECHA', 'NOTA'],
+        ['0123', 45322],
+        ['9', 20240131, 'x'],
+        [],
+        ['', 45322.75],
+    ]
+    assert utils.filas_grilla({}, ['FECHA']) == []
+
+
+def test_solo_las_fechas_llegan_sin_formato(data_dict):
+    for df in data_dict.values():
+        fechas = {df.attrs['columnas_origen']['fecha_ingreso'], df.attrs['columnas_origen']['fecha_retiro']}
+        for columna in utils.esquema.encabezados_hoja(df):
+            tipos = {type(v) for v in df[columna].dropna()}
+            if columna in fechas:
+                assert tipos <= {int, str}
+            else:
+                assert tipos <= {str}, columna
+
+
+def test_fechas_iguales_con_y_sin_formato(data_dict, monkeypatch):
+    monkeypatch.setattr(utils, 'RENDERIZADO_FECHAS', 'FORMATTED_VALUE')
+    con_formato = cargar_datos_sinteticos(2000, semilla=3)
+    for hoja, df in data_dict.items():
+        for columna in ['fecha_ingreso', 'fecha_retiro']:
+            assert df[columna].equals(con_formato[hoja][columna])
+
+
+def test_fechas_numericas_texto_y_serial():
+    valores = np.array([20240131, '20240131', 45322, 45322.75, 20241341, 'no es fecha', None], dtype=object)
+    fechas = conversion.convertir_fechas(valores)
+    esperado = np.array(['2024-01-31'] * 4 + ['NaT'] * 3, dtype='datetime64[ns]')
+    np.testing.assert_array_equal(fechas, esperado)
@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+
+from cohortes import EDADES_MESES, matriz_retencion, sumar_meses
+from dotacion import intervalos_vigencia
+
+CORTE = pd.Timestamp('2020-06-30')
+
+
+def test_sumar_meses_ajusta_al_fin_de_mes():
+    dias = np.array(['2023-01-31', '2024-01-31', '2023-03-15'], dtype='datetime64[D]').astype(np.int64)
+    resultado = sumar_meses(dias, 1).astype('datetime64[D]').astype(str).tolist()
+    assert resultado == ['2023-02-28', '2024-02-29', '2023-04-15']
+
+
+def test_matriz_igual_a_recorrido(registros):
+    matriz = matriz_retencion(registros, ['origen'], fecha_corte=CORTE).set_index(['Grupo', 'Cohorte'])
+
+    mascara, inicio, fin = intervalos_vigencia(registros)
+    filas = pd.DataFrame({
+        'Grupo': registros['origen'].astype(object).to_numpy(),
+        'ingreso': pd.to_datetime(inicio, unit='D'),
+        'retiro': pd.to_datetime(fin, unit='D'),
+    })[mascara]
+    filas = filas[filas['ingreso'] <= CORTE]
+    filas['Cohorte'] = filas['ingreso'].dt.strftime('%Y-%m')
+
+    for (grupo, cohorte), celda in filas.groupby(['Grupo', 'Cohorte']):
+        fila = matriz.loc[(grupo, cohorte)]
+        assert fila['Ingresos'] == len(celda)
+        for edad in EDADES_MESES:
+            objetivo = celda['ingreso'] + pd.DateOffset(months=edad)
+            observable = objetivo <= CORTE
+            activos = (observable & (celda['retiro'].isna() | (celda['retiro'] >= objetivo))).sum()
+            esperado = round(activos / observable.sum() * 100, 1) if observable.any() else np.nan
+            np.testing.assert_equal(fila[f'{edad} meses'], esperado)
+    assert len(matriz) == filas.groupby(['Grupo', 'Cohorte']).ngroups
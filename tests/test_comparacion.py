@@ -0,0 +1,22 @@
+import pandas as pd
+
+from comparacion import PERIODO_ACTUAL, PERIODO_COMPARACION, comparar_periodos, filas_en_rango
+from identidad import claves_persona
+
+NOVEDADES = ['ACTIVO', 'RETIRADO', 'CASO ESPECIAL']
+
+
+def test_comparacion_cuenta_personas_distintas(registros):
+    personas = claves_persona(registros)
+    evento = registros['fecha_ingreso'].dropna()
+    medio = evento.min() + (evento.max() - evento.min()) / 2
+    actual = (medio.normalize(), evento.max().normalize())
+    anterior = (evento.min().normalize(), medio.normalize())
+
+    tabla = comparar_periodos(registros, ['origen'], NOVEDADES, actual, anterior, personas)
+    assert (tabla[PERIODO_ACTUAL] > 0).any()
+    for columna, (desde, hasta) in [(PERIODO_ACTUAL, actual), (PERIODO_COMPARACION, anterior)]:
+        filas = filas_en_rango(registros, NOVEDADES, desde, hasta)
+        esperado = pd.Series(personas[filas.index], index=filas.index).groupby(filas['origen'], observed=True).nunique()
+        obtenido = tabla.set_index('Origen')[columna]
+        assert obtenido[obtenido > 0].to_dict() == esperado[esperado > 0].to_dict()
@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import almacen_sql
+import cambios
+
+CONSULTAS = [
+    (['contrato'], ['Planta', 'Manipuladoras'], ['ACTIVO', 'RETIRADO', 'CASO ESPECIAL']),
+    (['empresa', 'motivo'], ['Planta'], ['RETIRADO']),
+    (['programa', 'motivo'], ['Manipuladoras'], ['RETIRADO']),
+    (['origen', 'area', 'contrato'], ['Planta', 'Manipuladoras', 'Aprendices'], ['ACTIVO']),
+    (['sitio', 'tipo_novedad'], ['Planta', 'Manipuladoras', 'Aprendices'], ['ACTIVO', 'CASO ESPECIAL']),
+]
+FECHA_MIN, FECHA_MAX = pd.Timestamp('2017-01-01'), pd.Timestamp('2022-12-31')
+
+
+@pytest.fixture(scope='module')
+def almacen(registros):
+    return almacen_sql.AlmacenSQL(registros)
+
+
+@pytest.mark.parametrize('incluir_nulos', [False, True])
+@pytest.mark.parametrize('por, origenes, novedades', CONSULTAS)
+def test_pandas_mantenido_y_sqlite_iguales(registros, almacen, por, origenes, novedades, incluir_nulos):
+    argumentos = (por, origenes, novedades, FECHA_MIN, FECHA_MAX, incluir_nulos)
+    con_pandas = almacen_sql.contar_pandas(registros, *argumentos)
+    con_conteo = almacen_sql.contar_pandas(cambios.ConteoMantenido(registros).vista(), *argumentos)
+    con_sqlite = almacen_sql.contar_sql(almacen, *argumentos)
+    assert len(con_pandas) > 0
+    pd.testing.assert_frame_equal(con_pandas, con_sqlite)
+    pd.testing.assert_frame_equal(con_conteo, con_sqlite)
+
+
+def editar(registros, semilla=0):
+    """Nueva versión de la tabla: filas quitadas, insertadas, con otro contrato y reordenadas."""
+    rng = np.random.default_rng(semilla)
+    nuevos = registros.drop(index=rng.choice(registros.index, 40, replace=False))
+    cambiadas = rng.choice(nuevos.index, 60, replace=False)
+    nuevos['contrato'] = nuevos['contrato'].astype(object)
+    nuevos.loc[cambiadas, 'contrato'] = 'CONTRATO NUEVO'
+    insertados = registros.sample(25, random_state=semilla).assign(documento='99' + pd.Series(range(25)).astype(str).to_numpy())
+    nuevos = pd.concat([nuevos, insertados]).sample(frac=1, random_state=semilla).reset_index(drop=True)
+    for columna in cambios.DIMENSIONES:
+        nuevos[columna] = nuevos[columna].astype('category')
+    return nuevos
+
+
+def vista_ordenada(conteo):
+    vista = conteo.vista().astype({c: object for c in cambios.DIMENSIONES})
+    return vista.sort_values(cambios.COLUMNAS, na_position='first', ignore_index=True)
+
+
+def test_conteo_incremental_igual_a_recuento(registros):
+    anteriores = registros
+    conteo = cambios.ConteoMantenido(anteriores)
+    for semilla in range(3):
+        nuevos = editar(anteriores, semilla)
+        diferencias = cambios.diferencias(anteriores, nuevos)
+        resumen = diferencias.resumen()
+        assert (resumen['insertados'], resumen['eliminados']) == (25, 40)
+        conteo.aplicar(anteriores, nuevos, diferencias)
+        pd.testing.assert_frame_equal(vista_ordenada(conteo), vista_ordenada(cambios.ConteoMantenido(nuevos)))
+        anteriores = nuevos
+
+
+def test_claves_sin_documento_no_dependen_de_la_posicion(registros):
+    filas = registros.head(6).copy()
+    filas['documento'] = [None, None, '1', '2', None, '3']
+    filas['indice_origen'] = range(6)
+    movidas = filas.iloc[[1, 0, 2, 3, 5, 4]].copy()
+    movidas['indice_origen'] = range(6)
+    assert set(cambios.claves_fila(filas).tolist()) == set(cambios.claves_fila(movidas).tolist())
+
+
+def test_linajes_no_se_mezclan(data_dict):
+    historico = {clave: df.copy() for clave, df in data_dict.items()}
+    for df in historico.values():
+        df.attrs['instantanea'] = '2024-01-01'
+    assert cambios.linaje(data_dict) == cambios.ACTUAL
+    assert cambios.linaje(historico) == '2024-01-01'
+
+    # Alternar entre los datos actuales y una instantánea no registra cambios nuevos
+    for datos in [data_dict, historico, data_dict, historico]:
+        cambios.obtener_conteo(datos)
+    assert len(cambios.registro_cambios(cambios.ACTUAL)) == 1
+    assert len(cambios.registro_cambios('2024-01-01')) == 1
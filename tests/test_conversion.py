@@ -0,0 +1,33 @@
+import pandas as pd
+
+import conversion
+from benchmarks import generar_valores
+
+DERIVADAS = {
+    'tipo_novedad': ('TIPO DE NOVEDAD', conversion.DIMENSION),
+    'fecha_ingreso': ('FECHA DE INGRESO', conversion.FECHA),
+    'fecha_retiro': ('FECHA RETIRO', conversion.FECHA),
+}
+
+
+def ruta_anterior(values):
+    """Conversión previa al convertidor: DataFrame de filas, replace y to_datetime."""
+    df = pd.DataFrame(values[1:], columns=values[0])
+    df = df.replace('', pd.NA).dropna(how='all')
+    df['tipo_novedad'] = df['TIPO DE NOVEDAD']
+    df['fecha_ingreso'] = pd.to_datetime(df['FECHA DE INGRESO'], format='%Y%m%d', errors='coerce')
+    df['fecha_retiro'] = pd.to_datetime(df['FECHA RETIRO'], format='%Y%m%d', errors='coerce')
+    return df
+
+
+def como_objetos(df):
+    return df.astype(object).where(df.notna(), None)
+
+
+def test_convertidor_igual_a_ruta_anterior():
+    values = generar_valores('Aprendices', 500, semilla=1)
+    values.insert(10, [])
+    nueva = conversion.convertir(values, DERIVADAS)
+    assert como_objetos(nueva).equals(como_objetos(ruta_anterior(values)))
+    assert 9 not in nueva.index
+
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+
+from dotacion import IndiceVigencia, serie_dotacion
+
+
+def activos_por_fuerza_bruta(registros, fecha, por):
+    """Activos en la fecha recorriendo los registros uno por uno."""
+    fecha = pd.Timestamp(fecha)
+    ingreso, retiro = registros['fecha_ingreso'], registros['fecha_retiro']
+    retirado = registros['tipo_novedad'].astype(object) == 'RETIRADO'
+    activo = (
+        ingreso.notna() & (ingreso <= fecha)
+        & ~(retirado & retiro.isna())
+        & (retiro.isna() | (retiro >= fecha))
+        & ~(retiro < ingreso)
+    )
+    return registros[activo].groupby(por, observed=True).size()
+
+
+def test_indice_vigencia_igual_a_fuerza_bruta(registros):
+    indice = IndiceVigencia(registros, ['origen'])
+    for fecha in ['2014-06-01', '2016-03-15', '2019-12-31', '2030-01-01']:
+        esperado = activos_por_fuerza_bruta(registros, fecha, 'origen')
+        obtenido = indice.contar(fecha)
+        obtenido = obtenido[obtenido > 0]
+        assert obtenido.to_dict() == {str(k): v for k, v in esperado.items()}
+
+
+def test_retiro_anterior_al_ingreso_no_altera_otros_grupos():
+    registros = pd.DataFrame({
+        'origen': ['A', 'B', 'B'],
+        'tipo_novedad': ['RETIRADO', 'ACTIVO', 'RETIRADO'],
+        'fecha_ingreso': pd.to_datetime(['2020-01-10', '2020-01-01', '2020-03-01']),
+        'fecha_retiro': pd.to_datetime(['2019-12-01', None, '2020-01-05']),
+    })
+    indice = IndiceVigencia(registros, ['origen'])
+    assert indice.contar('2019-12-15').to_dict() == {'A': 0, 'B': 0}
+    assert indice.contar('2020-02-01').to_dict() == {'A': 0, 'B': 1}
+    assert list(indice.filas('2020-02-01')) == [1]
+
+    serie = serie_dotacion(registros, ['origen'], fecha_inicio='2019-11-01', fecha_fin='2020-04-01')
+    assert (serie['A'] == 0).all()
+    assert serie['B'].min() == 0 and serie['B'].max() == 1
+
+
+def test_serie_dotacion_igual_al_indice(registros):
+    serie = serie_dotacion(registros, ['origen'], fecha_inicio='2016-01-01', fecha_fin='2016-12-31')
+    indice = IndiceVigencia(registros, ['origen'])
+    for fecha in pd.to_datetime(['2016-01-01', '2016-07-14', '2016-12-31']):
+        assert serie.loc[fecha].to_dict() == indice.contar(fecha)[serie.columns].to_dict()
+    assert np.issubdtype(serie.to_numpy().dtype, np.integer)
@@ -0,0 +1,32 @@
+import pandas as pd
+
+from esquema import obtener_esquema
+
+
+def hoja(encabezados):
+    return pd.DataFrame(columns=encabezados)
+
+
+def test_documento_y_nombre_solo_por_encabezado():
+    esquema = obtener_esquema('aprendices', hoja(['ID', 'CARGO', 'SEDE', 'X', 'Y', 'AREA']))
+    assert esquema['nombre'] is None
+    assert esquema['documento'] is None
+    assert 'documento' in esquema.problemas
+
+
+def test_documento_encontrado_en_cualquier_posicion():
+    esquema = obtener_esquema('aprendices', hoja(['ID', 'CARGO', 'SEDE', 'Cédula', 'Nombre Completo', 'AREA']))
+    assert esquema['documento'] == 'Cédula'
+    assert esquema['nombre'] == 'Nombre Completo'
+    assert 'documento' not in esquema.problemas
+    assert esquema['area'] == 'AREA'
+
+
+def test_hojas_sin_documento():
+    from identidad import hojas_sin_documento
+    data_dict = {
+        'planta': pd.DataFrame({'NOMBRE COMPLETO': ['A'], 'NUMERO DE DOCUMENTO': ['1']}),
+        'manipuladoras': pd.DataFrame({'NOMBRE COMPLETO': ['B'], 'CODIGO': ['2']}),
+        'aprendices': pd.DataFrame(),
+    }
+    assert hojas_sin_documento(data_dict) == ['Manipuladoras']
@@ -0,0 +1,25 @@
+import io
+
+import pandas as pd
+
+from exportacion import escribir_csv
+
+
+def test_csv_por_bloques_igual_a_to_csv():
+    df = pd.DataFrame({'NOMBRE': ['José', 'Ana', None, 'Luis', 'Paola'], 'CODIGO': ['1', '2', '3', '', '5']})
+    indices = df.index.to_numpy()[[4, 0, 2, 3]]
+    destino = io.BytesIO()
+    escribir_csv(destino, [('Planta', df, indices, ['NOMBRE', 'CODIGO'])], tamano=2)
+    esperado = io.BytesIO()
+    df.loc[indices].to_csv(esperado, index=False, encoding='utf-8-sig')
+    assert destino.getvalue() == esperado.getvalue()
+
+
+def test_csv_varias_hojas_con_origen():
+    planta = pd.DataFrame({'A': [1, 2, 3], 'B': ['x', 'y', 'z']})
+    aprendices = pd.DataFrame({'B': ['ñ'], 'C': [9]})
+    destino = io.BytesIO()
+    escribir_csv(destino, [('Planta', planta, [0, 2], ['A', 'B']), ('Aprendices', aprendices, [0], ['B', 'C'])], tamano=1)
+    texto = destino.getvalue().decode('utf-8')
+    assert texto.count('﻿') == 1
+    assert texto.lstrip('﻿').splitlines() == ['Origen,A,B,C', 'Planta,1,x,', 'Planta,3,z,', 'Aprendices,,ñ,9']
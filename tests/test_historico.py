@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+import historico
+
+
+def valores_hoja(filas):
+    return [['NOMBRE', 'FECHA', 'CODIGO']] + filas
+
+
+@pytest.fixture
+def hoja(tmp_path):
+    return historico.HistoricoHoja('Planta', str(tmp_path))
+
+
+def comparable(values):
+    """Matriz esperada de leer(): celdas vacías como None y filas completadas al ancho."""
+    ancho = len(values[0])
+    return [[(f[j] if j < len(f) and f[j] != '' else None) for j in range(ancho)] for f in values[1:]]
+
+
+def test_guardar_y_leer_ida_y_vuelta(hoja):
+    dia1 = valores_hoja([['Ana', 20200101, '001'], ['Luis', '', 7], ['José Núñez']])
+    dia2 = valores_hoja([['Ana', 20200101, '001'], ['Paola', 45123.5, None], ['José Núñez'], ['Luis', '', 7]])
+    assert hoja.guardar(dia1, 'v1', fecha='2024-01-01')
+    assert hoja.guardar(dia2, 'v2', fecha='2024-01-02')
+    assert not hoja.guardar(dia2, 'v2', fecha='2024-01-03')
+
+    for fecha, values in [('2024-01-01', dia1), ('2024-01-02', dia2), ('2024-01-05', dia2)]:
+        entrada = hoja.instantanea(fecha)
+        assert hoja.leer(entrada).tolist() == comparable(values)
+    assert hoja.instantanea('2023-12-31') is None
+
+
+def test_solo_se_agregan_filas_y_valores_nuevos(hoja):
+    base = [[f'persona {i}', 20200101 + i, str(i)] for i in range(50)]
+    hoja.guardar(valores_hoja(base), 'v1', fecha='2024-01-01')
+    hoja.guardar(valores_hoja(base + [['nueva', 20240101, 'x']]), 'v2', fecha='2024-01-02')
+
+    indice = hoja.leer_indice()
+    assert [b['filas'] for b in indice['bloques']] == [50, 1]
+    posiciones, hashes = hoja._indice_valores()
+    assert len(posiciones) == len(hashes) == 150 + 3
+    # La instantánea de un día sin cambios intermedios es un solo tramo
+    tramos = np.load(hoja._ruta(indice['instantaneas'][-1]['archivo']))
+    assert tramos.tolist() == [[0, 51]]
+
+
+def test_fechas_disponibles_se_actualizan_al_guardar(tmp_path, monkeypatch):
+    monkeypatch.setattr(historico, 'DIRECTORIO_HISTORICO', str(tmp_path))
+    assert historico.fechas_disponibles() == []
+    historico.guardar('Planta', valores_hoja([['Ana', 1, 'a']]), 'v1')
+    assert historico.fechas_disponibles() == [historico.clave_fecha(historico.date.today())]
@@ -0,0 +1,43 @@
+from rollup import SIN_DATO, conjuntos_agrupacion, rollup
+
+
+def test_conjuntos_iguales_a_groupby(registros):
+    columnas = ['origen', 'area', 'contrato', 'motivo']
+    datos = registros[columnas].astype(object)
+    conjuntos = [columnas, ['origen', 'motivo'], ['contrato'], []]
+    tabla = conjuntos_agrupacion(datos, columnas, conjuntos)
+
+    for conjunto in conjuntos:
+        agregadas = [c for c in columnas if c not in conjunto]
+        mascara = sum(1 << (len(columnas) - 1 - columnas.index(c)) for c in agregadas)
+        parte = tabla[tabla['agrupacion'] == mascara]
+        assert parte[agregadas].isna().all().all()
+        if not conjunto:
+            assert parte['Total'].tolist() == [len(datos)]
+            continue
+        obtenido = parte.set_index(conjunto)['Total'].sort_index()
+        esperado = datos.fillna(SIN_DATO).groupby(conjunto).size().sort_index()
+        assert obtenido.to_dict() == esperado.to_dict()
+
+
+def test_rollup_subtotales_suman_el_detalle(registros):
+    niveles = ['origen', 'contrato', 'area']
+    tabla = rollup(registros[niveles].astype(object), niveles)
+    assert tabla.loc[tabla['nivel'] == 0, 'Total'].tolist() == [len(registros)]
+    for nivel in range(1, len(niveles)):
+        padres = tabla[tabla['nivel'] == nivel].set_index(niveles[:nivel])['Total']
+        hijos = tabla[tabla['nivel'] == nivel + 1].groupby(niveles[:nivel])['Total'].sum()
+        assert padres.to_dict() == hijos.to_dict()
+
+
+def test_rollup_personas_distintas_igual_a_nunique(registros):
+    from identidad import claves_persona
+
+    niveles = ['origen', 'contrato']
+    datos = registros[niveles].astype(object).assign(persona=claves_persona(registros))
+    tabla = rollup(datos, niveles, 'persona')
+    assert tabla.loc[tabla['nivel'] == 0, 'Total'].tolist() == [datos['persona'].nunique()]
+    for nivel in range(1, len(niveles) + 1):
+        obtenido = tabla[tabla['nivel'] == nivel].set_index(niveles[:nivel])['Total']
+        esperado = datos.fillna(SIN_DATO).groupby(niveles[:nivel])['persona'].nunique()
+        assert obtenido.to_dict() == esperado.to_dict()
@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from supervivencia import DIAS_MES, antiguedad_dias, curvas_supervivencia
+
+CORTE = pd.Timestamp('2023-06-30')
+
+
+def kaplan_meier(dias, retirado, dia):
+    """Proporción que sigue activa a 'dia', multiplicando (1 - retiros / en riesgo) tiempo por tiempo."""
+    supervivencia = 1.0
+    for tiempo in np.unique(dias[retirado]):
+        if tiempo > dia:
+            break
+        en_riesgo = (dias >= tiempo).sum()
+        retiros = ((dias == tiempo) & retirado).sum()
+        supervivencia *= 1 - retiros / en_riesgo
+    return supervivencia
+
+
+def test_curvas_iguales_a_kaplan_meier(registros):
+    curvas, tamanos = curvas_supervivencia(registros, meses=60, fecha_corte=CORTE)
+    mascara, dias, retirado = antiguedad_dias(registros, CORTE)
+    cohorte = registros['fecha_ingreso'].dt.year.to_numpy()[mascara].astype(int).astype(str)
+    dias, retirado = dias[mascara], retirado[mascara]
+
+    assert tamanos.to_dict() == pd.Series(cohorte).value_counts().to_dict()
+    for anio in curvas.columns:
+        propios = cohorte == anio
+        for meses, valor in curvas[anio].dropna().items():
+            dia = int(np.floor(meses * DIAS_MES))
+            assert valor == pytest.approx(kaplan_meier(dias[propios], retirado[propios], dia), rel=1e-9), (anio, meses)
+
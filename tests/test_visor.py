@@ -0,0 +1,23 @@
+import numpy as np
+import pandas as pd
+
+from visor import orden_filas
+
+
+def test_orden_columna_mezclada_numeros_y_textos():
+    df = pd.DataFrame({'CODIGO': pd.Series([12, '3', None, 7, '100'], index=[10, 11, 12, 13, 14], dtype=object)})
+    indices = df.index.to_numpy()
+    assert orden_filas(df, indices, 'CODIGO').tolist() == [11, 13, 10, 14, 12]
+    assert orden_filas(df, indices, 'CODIGO', ascendente=False).tolist() == [14, 10, 13, 11, 12]
+
+
+def test_orden_columna_mezclada_con_textos_no_numericos():
+    df = pd.DataFrame({'SEDE': pd.Series(['B', 5, np.nan, 'A', 20], dtype=object)})
+    indices = df.index.to_numpy()
+    assert orden_filas(df, indices, 'SEDE').tolist() == [4, 1, 3, 0, 2]
+
+
+def test_orden_solo_de_los_indices_pedidos():
+    df = pd.DataFrame({'EDAD': [40, 20, 30, 10]})
+    assert orden_filas(df, np.array([0, 2, 1]), 'EDAD').tolist() == [1, 2, 0]
+    assert orden_filas(df, np.array([0, 2, 1])).tolist() == [0, 2, 1]
@@ -1,9 +1,20 @@
+import contextlib
+import functools
+import hashlib
+import json
+import numpy as np
 import pandas as pd
 from google.oauth2 import service_account
 from googleapiclient.discovery import build
 import streamlit as st
 import os
+import time
 from datetime import datetime
+import conversion
+import esquema
+import historico
+import instrumentacion
+import metricas
 
 # ID de la hoja de Google Sheets
 try:
@@ -18,6 +29,15 @@ CREDENTIALS_PATH = 'sheets_api.json'  # Tu archivo de credenciales en la raíz d
 # Ámbito para la API de Sheets
 SCOPES = ['https://www.googleapis.com/auth/spreadsheets.readonly']
 
+# La hoja se pide en una sola llamada (spreadsheets.get con los datos de la grilla): de cada
+# celda llega el texto tal como se ve y, si es numérica, su valor sin formato. Las columnas
+# que se muestran usan el texto (no mezclan números y textos); las de fecha usan el número
+# (de serie o AAAAMMDD) y se convierten sin pasar por texto. La API de valores fija un solo
+# formato por llamada, por eso no se usa para las dos formas. INDICADORES_VALORES=
+# FORMATTED_VALUE lee solo el texto (values.get) y toma también las fechas como texto.
+RENDERIZADO_FECHAS = os.environ.get('INDICADORES_VALORES', 'UNFORMATTED_VALUE')
+CAMPOS_GRILLA = 'sheets/data/rowData/values(formattedValue,effectiveValue/numberValue)'
+
 # Función para crear el servicio de Google Sheets
 def create_sheets_service():
     """
@@ -56,147 +76,209 @@ def create_sheets_service():
         st.error(f"Error al crear el servicio de Google Sheets: {e}")
         return None
 
-# Función para cargar los datos de la hoja "Planta"
-@st.cache_data(ttl=3600)  # Caché durante 1 hora
-def load_planta_data():
+# Sedes identificadas a partir del texto del área (patrón en mayúsculas -> sede).
+# Para agregar una sede basta con añadir una entrada; no requiere nuevas búsquedas por fila.
+SITIOS = [
+    ('BUGA', 'BUGA'),
+]
+SITIO_POR_DEFECTO = 'OTRAS SEDES'
+
+@functools.lru_cache(maxsize=None)
+def sitio_de_area(area):
     """
-    Carga los datos de la hoja 'Planta' y los retorna como un DataFrame de pandas.
+    Retorna la sede correspondiente a un valor de área (memoizado por valor).
+    """
+    texto = str(area).upper()
+    for patron, sitio in SITIOS:
+        if patron in texto:
+            return sitio
+    return SITIO_POR_DEFECTO
+
+# Función para agregar la dimensión de sede a un DataFrame
+def agregar_dimension_sitio(df, col_area):
     """
+    Agrega la columna categórica 'sitio' calculada a partir de la columna de área.
+    Solo se evalúan los valores únicos del área; las filas reciben el código por indexación.
+    """
+    if not col_area or col_area not in df.columns:
+        return df
+    
+    categorias = list(dict.fromkeys([sitio for _, sitio in SITIOS] + [SITIO_POR_DEFECTO]))
+    codigos_area, valores_area = pd.factorize(df[col_area])
+    
+    # Código de sede por valor único; el último elemento corresponde a las áreas vacías (código -1)
+    codigos_sitio = np.array(
+        [categorias.index(sitio_de_area(valor)) for valor in valores_area]
+        + [categorias.index(SITIO_POR_DEFECTO)],
+        dtype=np.int8
+    )
+    df['sitio'] = pd.Categorical.from_codes(codigos_sitio[codigos_area], categories=categorias)
+    return df
+
+# Tipo de cada columna normalizada que se deriva de una columna de la hoja
+TIPOS_DERIVADAS = {
+    'tipo_novedad': conversion.DIMENSION,
+    'fecha_ingreso': conversion.FECHA,
+    'fecha_retiro': conversion.FECHA,
+}
+
+def _derivadas(columnas_origen):
+    """Columnas normalizadas a partir de las columnas originales de la novedad y las fechas."""
+    return {nueva: (columnas_origen.get(nueva), tipo) for nueva, tipo in TIPOS_DERIVADAS.items()}
+
+def _preparar_hoja(nombre_hoja, df, version, columnas_origen):
+    """Agrega la versión, las columnas originales y la sede a una hoja ya convertida."""
+    df.attrs['version_datos'] = version
+    # Columnas originales de la novedad y las fechas (las usa la validación de calidad.py)
+    df.attrs['columnas_origen'] = dict(columnas_origen)
+    # Sede (BUGA u otras) calculada una sola vez por versión de los datos
+    col_area = esquema.obtener_esquema(nombre_hoja.lower(), df)['area']
+    return agregar_dimension_sitio(df, col_area)
+
+def filas_grilla(respuesta, columnas_numericas):
+    """
+    Convierte la respuesta de spreadsheets.get (datos de la grilla de un rango) en filas
+    como las de values.get: el texto visible de cada celda, salvo en las columnas de
+    'columnas_numericas' (por encabezado), donde las celdas numéricas llevan su número sin
+    formato. Se recortan las celdas vacías del final de cada fila y las filas vacías finales.
+    """
+    hojas = respuesta.get('sheets') or [{}]
+    datos = hojas[0].get('data') or [{}]
+    celdas = [fila.get('values', []) for fila in datos[0].get('rowData', [])]
+    if not celdas:
+        return []
+    encabezado = [celda.get('formattedValue', '') for celda in celdas[0]]
+    numericas = {encabezado.index(c) for c in columnas_numericas if c in encabezado}
+
+    values = []
+    for numero_fila, fila in enumerate(celdas):
+        valores = []
+        for posicion, celda in enumerate(fila):
+            numero = celda.get('effectiveValue', {}).get('numberValue') if numero_fila and posicion in numericas else None
+            if numero is None:
+                valores.append(celda.get('formattedValue', ''))
+            else:
+                valores.append(int(numero) if isinstance(numero, float) and numero.is_integer() else numero)
+        while valores and valores[-1] == '':
+            valores.pop()
+        values.append(valores)
+    while values and not values[-1]:
+        values.pop()
+    return values
+
+def _leer_valores(sheet, rango, columnas_fecha):
+    """
+    Lee el rango en una sola llamada: el texto visible de cada celda y, en las columnas de
+    fecha, el número sin formato (ver filas_grilla). Con INDICADORES_VALORES=FORMATTED_VALUE
+    lee solo el texto.
+    """
+    if RENDERIZADO_FECHAS == 'FORMATTED_VALUE':
+        return sheet.values().get(spreadsheetId=SHEET_ID, range=rango).execute().get('values', [])
+    respuesta = sheet.get(
+        spreadsheetId=SHEET_ID, ranges=[rango], includeGridData=True, fields=CAMPOS_GRILLA
+    ).execute()
+    return filas_grilla(respuesta, columnas_fecha)
+
+# Función genérica para cargar una hoja y normalizar sus columnas
+def _cargar_hoja(nombre_hoja, rango, col_novedad, col_ingreso, col_retiro, backup_file):
+    """
+    Carga una hoja de Google Sheets y la retorna como un DataFrame de pandas,
+    agregando las columnas normalizadas tipo_novedad, fecha_ingreso, fecha_retiro y sitio
+    (ver conversion.convertir).
+    """
+    # El cuerpo solo se ejecuta cuando la caché de Streamlit no tiene el resultado
+    instrumentacion.anotar(cache='fallo')
+    columnas_origen = {'tipo_novedad': col_novedad, 'fecha_ingreso': col_ingreso, 'fecha_retiro': col_retiro}
+    derivadas = _derivadas(columnas_origen)
     try:
         # Obtener servicio
-        service = create_sheets_service()
+        with instrumentacion.medir('credenciales', hoja=nombre_hoja):
+            service = create_sheets_service()
         if service is None:
             return pd.DataFrame()
         
-        # Rango de datos a obtener (ajustar según tamaño de la hoja)
-        range_name = 'Planta!A1:Z1000'
-        
         # Llamar a la API
-        sheet = service.spreadsheets()
-        result = sheet.values().get(
-            spreadsheetId=SHEET_ID,
-            range=range_name
-        ).execute()
-        
-        # Obtener valores
-        values = result.get('values', [])
+        with instrumentacion.medir('sheets_api', hoja=nombre_hoja) as span:
+            inicio = time.perf_counter()
+            try:
+                sheet = service.spreadsheets()
+                values = _leer_valores(sheet, rango, [col_ingreso, col_retiro])
+            except Exception as e:
+                tipo_error = 'cuota' if metricas.es_error_de_cuota(e) else 'otro'
+                metricas.SHEETS_ERRORES.incrementar(hoja=nombre_hoja, tipo=tipo_error)
+                raise
+            finally:
+                metricas.SHEETS_DURACION.observar(time.perf_counter() - inicio, hoja=nombre_hoja)
+            
+            span['filas'] = max(len(values) - 1, 0)
+        metricas.ULTIMA_CARGA.fijar(time.time(), hoja=nombre_hoja)
         if not values:
-            st.warning('No se encontraron datos en la hoja Planta.')
+            st.warning(f'No se encontraron datos en la hoja {nombre_hoja}.')
             return pd.DataFrame()
         
-        # Convertir a DataFrame
-        headers = values[0]
-        data = values[1:]
-        df = pd.DataFrame(data, columns=headers)
+        # Huella de los valores recibidos: identifica la versión de los datos
+        version = hashlib.sha1(json.dumps(values, ensure_ascii=False, default=str).encode('utf-8')).hexdigest()[:16]
         
-        # Eliminar filas que estén completamente vacías
-        df = df.replace('', pd.NA)
-        df = df.dropna(how='all')
+        # Convertir a DataFrame: columnas armadas directamente desde las filas irregulares,
+        # con la novedad como categoría y las fechas convertidas en la misma pasada
+        with instrumentacion.medir('construir_dataframe', hoja=nombre_hoja) as span:
+            df = conversion.convertir(values, derivadas)
+            span['filas'] = len(df)
+        df = _preparar_hoja(nombre_hoja, df, version, columnas_origen)
         
-        # Asegurar que las columnas necesarias tengan nombres consistentes
-        if 'TIPO DE NOVEDAD (ACTIVO/RETIRADO)' in df.columns:
-            df['tipo_novedad'] = df['TIPO DE NOVEDAD (ACTIVO/RETIRADO)']
-        
-        # Fechas de ingreso y retiro
-        if 'FECHA DE INGRESO (AAAAMMDD)' in df.columns:
-            df['fecha_ingreso'] = df['FECHA DE INGRESO (AAAAMMDD)']
-            # Convertir formato de fecha si es posible
-            try:
-                df['fecha_ingreso'] = pd.to_datetime(df['fecha_ingreso'], format='%Y%m%d', errors='coerce')
-            except:
-                pass
-        
-        if 'FECHA DE RETIRO (AAAAMMDD)' in df.columns:
-            df['fecha_retiro'] = df['FECHA DE RETIRO (AAAAMMDD)']
-            # Convertir formato de fecha si es posible
+        # Instantánea del día en el histórico (solo se guardan los valores y filas nuevos)
+        with instrumentacion.medir('historico', hoja=nombre_hoja):
             try:
-                df['fecha_retiro'] = pd.to_datetime(df['fecha_retiro'], format='%Y%m%d', errors='coerce')
-            except:
-                pass
+                historico.guardar(nombre_hoja, values, version, columnas_origen)
+            except Exception as e:
+                st.warning(f"No se pudo guardar el histórico de {nombre_hoja}: {e}")
         
         return df
     
     except Exception as e:
-        st.error(f"Error al cargar datos de Planta: {e}")
+        st.error(f"Error al cargar datos de {nombre_hoja}: {e}")
         # Intentar cargar desde copia local si existe
         try:
-            backup_path = os.path.join('data_backup', 'planta_backup.csv')
+            backup_path = os.path.join('data_backup', backup_file)
             if os.path.exists(backup_path):
-                return pd.read_csv(backup_path)
+                instrumentacion.anotar(respaldo=backup_file)
+                metricas.RESPALDOS.incrementar(hoja=nombre_hoja)
+                return conversion.agregar_derivadas(pd.read_csv(backup_path), derivadas)
         except:
             pass
         return pd.DataFrame()
 
+# Función para cargar los datos de la hoja "Planta"
+@st.cache_data(ttl=3600)  # Caché durante 1 hora
+def load_planta_data():
+    """
+    Carga los datos de la hoja 'Planta' y los retorna como un DataFrame de pandas.
+    """
+    # Rango de datos a obtener (ajustar según tamaño de la hoja)
+    return _cargar_hoja(
+        'Planta',
+        'Planta!A1:Z1000',
+        'TIPO DE NOVEDAD (ACTIVO/RETIRADO)',
+        'FECHA DE INGRESO (AAAAMMDD)',
+        'FECHA DE RETIRO (AAAAMMDD)',
+        'planta_backup.csv'
+    )
+
 # Función para cargar los datos de la hoja "Manipuladoras"
 @st.cache_data(ttl=3600)  # Caché durante 1 hora
 def load_manipuladoras_data():
     """
     Carga los datos de la hoja 'Manipuladoras' y los retorna como un DataFrame de pandas.
     """
-    try:
-        # Obtener servicio
-        service = create_sheets_service()
-        if service is None:
-            return pd.DataFrame()
-        
-        # Rango de datos a obtener (ajustar según tamaño de la hoja)
-        range_name = 'Manipuladoras!A1:Z1000'
-        
-        # Llamar a la API
-        sheet = service.spreadsheets()
-        result = sheet.values().get(
-            spreadsheetId=SHEET_ID,
-            range=range_name
-        ).execute()
-        
-        # Obtener valores
-        values = result.get('values', [])
-        if not values:
-            st.warning('No se encontraron datos en la hoja Manipuladoras.')
-            return pd.DataFrame()
-        
-        # Convertir a DataFrame
-        headers = values[0]
-        data = values[1:]
-        df = pd.DataFrame(data, columns=headers)
-        
-        # Eliminar filas que estén completamente vacías
-        df = df.replace('', pd.NA)
-        df = df.dropna(how='all')
-        
-        # Asegurar que las columnas necesarias tengan nombres consistentes
-        if 'TIPO DE NOVEDAD (ACTIVO/RETIRADO)' in df.columns:
-            df['tipo_novedad'] = df['TIPO DE NOVEDAD (ACTIVO/RETIRADO)']
-        
-        # Fechas de ingreso y retiro
-        if 'FECHA DE INGRESO (AAAAMMDD)' in df.columns:
-            df['fecha_ingreso'] = df['FECHA DE INGRESO (AAAAMMDD)']
-            # Convertir formato de fecha si es posible
-            try:
-                df['fecha_ingreso'] = pd.to_datetime(df['fecha_ingreso'], format='%Y%m%d', errors='coerce')
-            except:
-                pass
-        
-        if 'FECHA DE RETIRO (AAAAMMDD)' in df.columns:
-            df['fecha_retiro'] = df['FECHA DE RETIRO (AAAAMMDD)']
-            # Convertir formato de fecha si es posible
-            try:
-                df['fecha_retiro'] = pd.to_datetime(df['fecha_retiro'], format='%Y%m%d', errors='coerce')
-            except:
-                pass
-        
-        return df
-    
-    except Exception as e:
-        st.error(f"Error al cargar datos de Manipuladoras: {e}")
-        # Intentar cargar desde copia local si existe
-        try:
-            backup_path = os.path.join('data_backup', 'manipuladoras_backup.csv')
-            if os.path.exists(backup_path):
-                return pd.read_csv(backup_path)
-        except:
-            pass
-        return pd.DataFrame()
+    # Rango de datos a obtener (ajustar según tamaño de la hoja)
+    return _cargar_hoja(
+        'Manipuladoras',
+        'Manipuladoras!A1:Z1000',
+        'TIPO DE NOVEDAD (ACTIVO/RETIRADO)',
+        'FECHA DE INGRESO (AAAAMMDD)',
+        'FECHA DE RETIRO (AAAAMMDD)',
+        'manipuladoras_backup.csv'
+    )
     
 # Función para cargar los datos de la hoja "Aprendices"
 @st.cache_data(ttl=3600)  # Caché durante 1 hora
@@ -204,79 +286,86 @@ def load_aprendices_data():
     """
     Carga los datos de la hoja 'Aprendices' y los retorna como un DataFrame de pandas.
     """
-    try:
-        # Obtener servicio
-        service = create_sheets_service()
-        if service is None:
-            return pd.DataFrame()
-        
-        # Rango de datos a obtener (ajustar según tamaño de la hoja)
-        range_name = 'Aprendices!A1:AZ1000'
-        
-        # Llamar a la API
-        sheet = service.spreadsheets()
-        result = sheet.values().get(
-            spreadsheetId=SHEET_ID,
-            range=range_name
-        ).execute()
-        
-        # Obtener valores
-        values = result.get('values', [])
-        if not values:
-            st.warning('No se encontraron datos en la hoja Aprendices.')
-            return pd.DataFrame()
-        
-        # Convertir a DataFrame
-        headers = values[0]
-        data = values[1:]
-        df = pd.DataFrame(data, columns=headers)
-        
-        # Eliminar filas que estén completamente vacías
-        df = df.replace('', pd.NA)
-        df = df.dropna(how='all')
-        
-        # Asegurar que las columnas necesarias tengan nombres consistentes
-        if 'TIPO DE NOVEDAD' in df.columns:
-            df['tipo_novedad'] = df['TIPO DE NOVEDAD']
-        
-        # Fechas de ingreso y retiro
-        if 'FECHA DE INGRESO' in df.columns:
-            df['fecha_ingreso'] = df['FECHA DE INGRESO']
-            # Convertir formato de fecha si es posible
-            try:
-                df['fecha_ingreso'] = pd.to_datetime(df['fecha_ingreso'], format='%Y%m%d', errors='coerce')
-            except:
-                pass
-        
-        if 'FECHA RETIRO' in df.columns:
-            df['fecha_retiro'] = df['FECHA RETIRO']
-            # Convertir formato de fecha si es posible
-            try:
-                df['fecha_retiro'] = pd.to_datetime(df['fecha_retiro'], format='%Y%m%d', errors='coerce')
-            except:
-                pass
-        
-        return df
-    
-    except Exception as e:
-        st.error(f"Error al cargar datos de Aprendices: {e}")
-        # Intentar cargar desde copia local si existe
-        try:
-            backup_path = os.path.join('data_backup', 'aprendices_backup.csv')
-            if os.path.exists(backup_path):
-                return pd.read_csv(backup_path)
-        except:
-            pass
-        return pd.DataFrame()
+    # Rango de datos a obtener (ajustar según tamaño de la hoja)
+    return _cargar_hoja(
+        'Aprendices',
+        'Aprendices!A1:AZ1000',
+        'TIPO DE NOVEDAD',
+        'FECHA DE INGRESO',
+        'FECHA RETIRO',
+        'aprendices_backup.csv'
+    )
+
+# Función para cargar una hoja desde el histórico
+@st.cache_data(ttl=3600, max_entries=16, show_spinner=False)
+def _cargar_instantanea(nombre_hoja, fecha, version):
+    """
+    Arma la hoja tal como estaba en la instantánea de esa fecha (versión incluida en la
+    clave de la caché) con la misma conversión que la carga desde Google Sheets.
+    """
+    entrada = historico.instantanea(nombre_hoja, fecha)
+    columnas_origen = entrada['columnas_origen']
+    df = conversion.desde_matriz(entrada['encabezado'], historico.leer(nombre_hoja, entrada), _derivadas(columnas_origen))
+    # Fecha de la instantánea: distingue las hojas históricas de las actuales (ver cambios.linaje)
+    df.attrs['instantanea'] = fecha
+    return _preparar_hoja(nombre_hoja, df, version, columnas_origen)
+
+def load_historical_data(as_of, registrar=True):
+    """
+    Retorna el diccionario de DataFrames de load_all_data() con cada hoja tal como estaba
+    en la última instantánea guardada hasta la fecha 'as_of' (vacía si no hay ninguna).
+    """
+    data_dict = {}
+    for clave, nombre_hoja in [('planta', 'Planta'), ('manipuladoras', 'Manipuladoras'), ('aprendices', 'Aprendices')]:
+        medicion = (
+            instrumentacion.medir(f'carga_{clave}', historico=historico.clave_fecha(as_of))
+            if registrar else contextlib.nullcontext({})
+        )
+        with medicion as span:
+            entrada = historico.instantanea(nombre_hoja, as_of)
+            if entrada is None:
+                if registrar:
+                    st.warning(f"No hay instantáneas de {nombre_hoja} hasta {historico.clave_fecha(as_of)}.")
+                df = pd.DataFrame()
+            else:
+                df = _cargar_instantanea(nombre_hoja, entrada['fecha'], entrada['version'])
+            span['filas'] = len(df)
+        data_dict[clave] = df
+    return data_dict
 
 # Modificar la función load_all_data para incluir Aprendices
-def load_all_data():
+def load_all_data(as_of=None, registrar=True):
     """
     Carga los datos de las hojas Planta, Manipuladoras y Aprendices y los retorna como un diccionario de DataFrames.
+    Con as_of (o una fecha elegida en la sesión, ver historico.selector_fecha) retorna las
+    hojas tal como estaban en esa fecha según el histórico de instantáneas.
+    Con registrar=False (hojas ya cargadas en este rerun, como en los paneles de la barra
+    lateral) no se registran las cargas en las métricas ni se repiten las advertencias.
     """
-    planta_df = load_planta_data()
-    manipuladoras_df = load_manipuladoras_data()
-    aprendices_df = load_aprendices_data()  # Nueva línea
+    if as_of is None:
+        as_of = historico.fecha_consulta()
+    if as_of is not None:
+        return load_historical_data(as_of, registrar)
+    if not registrar:
+        return {
+            'planta': load_planta_data(),
+            'manipuladoras': load_manipuladoras_data(),
+            'aprendices': load_aprendices_data(),
+        }
+    
+    # Cada carga se mide por separado; si el cuerpo cacheado no se ejecuta, fue un acierto de caché
+    with instrumentacion.medir('carga_planta', cache='acierto') as span:
+        planta_df = load_planta_data()
+        span['filas'] = len(planta_df)
+    metricas.observar_carga('Planta', span)
+    with instrumentacion.medir('carga_manipuladoras', cache='acierto') as span:
+        manipuladoras_df = load_manipuladoras_data()
+        span['filas'] = len(manipuladoras_df)
+    metricas.observar_carga('Manipuladoras', span)
+    with instrumentacion.medir('carga_aprendices', cache='acierto') as span:
+        aprendices_df = load_aprendices_data()  # Nueva línea
+        span['filas'] = len(aprendices_df)
+    metricas.observar_carga('Aprendices', span)
     
     return {
         'planta': planta_df,
@@ -284,6 +373,22 @@ def load_all_data():
         'aprendices': aprendices_df  # Nueva línea
     }
 
+# Función para obtener la versión de los datos cargados
+def version_datos(data_dict):
+    """
+    Retorna una huella que cambia cuando cambia el contenido de alguna hoja.
+    Sirve como clave de caché para los cálculos derivados (tablas, figuras, índices).
+    """
+    partes = []
+    for nombre in sorted(data_dict):
+        df = data_dict[nombre]
+        version = df.attrs.get('version_datos')
+        if version is None:
+            # Datos sin huella (por ejemplo, copia de respaldo): se calcula sobre el contenido
+            version = format(int(pd.util.hash_pandas_object(df, index=False).sum()) & 0xFFFFFFFFFFFFFFFF, 'x')
+        partes.append(f"{nombre}:{version}")
+    return hashlib.sha1('|'.join(partes).encode('utf-8')).hexdigest()[:16]
+
 def get_unique_tipos_novedad():
     """
     Retorna una lista con los valores únicos de tipo de novedad de todas las tablas.
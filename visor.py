@@ -0,0 +1,107 @@
+import pandas as pd
+import streamlit as st
+
+from exportacion import HOJA_POR_ORIGEN, columnas_originales
+from registros import ORIGENES
+from instrumentacion import medir
+
+# Filas por página disponibles
+TAMANOS_PAGINA = [25, 50, 100, 200]
+
+# Columnas del cargador que también se pueden ver y ordenar (fechas ya convertidas)
+COLUMNAS_NORMALIZADAS = ['tipo_novedad', 'fecha_ingreso', 'fecha_retiro']
+
+# Columnas visibles por defecto (además de las normalizadas)
+COLUMNAS_POR_DEFECTO = 6
+
+
+def clave_orden(valores):
+    """
+    Clave de un solo tipo para ordenar una columna de texto: numérica si todos sus valores
+    son números (aunque vengan mezclados con textos como '12'), si no, como texto.
+    """
+    if valores.dtype != object:
+        return valores
+    numeros = pd.to_numeric(valores, errors='coerce')
+    if numeros.notna().sum() == valores.notna().sum():
+        return numeros
+    return valores.astype('string')
+
+
+def orden_filas(df, indices, columna=None, ascendente=True):
+    """
+    Retorna las etiquetas 'indices' ordenadas por 'columna' (vacíos al final, orden estable).
+    Solo se ordena esa columna de las filas seleccionadas, no la tabla completa.
+    """
+    if columna is None:
+        return indices
+    valores = df.loc[indices, columna]
+    return valores.sort_values(
+        ascending=ascendente, na_position='last', kind='stable', key=clave_orden
+    ).index.to_numpy()
+
+
+def pagina_filas(df, indices, columnas, pagina, tamano):
+    """Filas de la página 'pagina' (desde 1) con las columnas elegidas."""
+    inicio = (pagina - 1) * tamano
+    return df.loc[indices[inicio:inicio + tamano], columnas]
+
+
+# Función para mostrar los registros detallados con paginación en el servidor
+def mostrar_visor(data_dict, filas, clave):
+    """
+    Muestra los registros de la hoja original detrás de 'filas' (registros ya filtrados de
+    la tabla unificada) una página a la vez. El orden, las columnas y la página se resuelven
+    aquí: al navegador solo se envían las filas visibles.
+    """
+    with st.expander("🔎 Ver registros detallados"):
+        origenes = [o for o in ORIGENES.values() if (filas['origen'] == o).any()]
+        if not origenes:
+            st.info("No hay registros con los filtros seleccionados.")
+            return
+
+        origen = st.selectbox("Origen", options=origenes, key=f"visor_origen_{clave}")
+        df = data_dict[HOJA_POR_ORIGEN[origen]]
+        indices = filas.loc[filas['origen'] == origen, 'indice_origen'].to_numpy()
+
+        disponibles = [c for c in COLUMNAS_NORMALIZADAS if c in df.columns] + columnas_originales(df)
+        columnas = st.multiselect(
+            "Columnas",
+            options=disponibles,
+            default=disponibles[:len(COLUMNAS_NORMALIZADAS) + COLUMNAS_POR_DEFECTO],
+            key=f"visor_columnas_{clave}"
+        )
+        if not columnas:
+            st.warning("Seleccione al menos una columna.")
+            return
+
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            orden = st.selectbox("Ordenar por", options=['—'] + disponibles, key=f"visor_orden_{clave}")
+        with col2:
+            ascendente = st.radio(
+                "Sentido", options=[True, False],
+                format_func=lambda a: "Ascendente" if a else "Descendente",
+                key=f"visor_sentido_{clave}"
+            )
+        with col3:
+            tamano = st.selectbox("Filas por página", options=TAMANOS_PAGINA, key=f"visor_tamano_{clave}")
+
+        paginas = max((len(indices) - 1) // tamano + 1, 1)
+        # Si cambió la selección, la página guardada puede quedar fuera de rango
+        clave_pagina = f"visor_pagina_{clave}"
+        if st.session_state.get(clave_pagina, 1) > paginas:
+            st.session_state[clave_pagina] = paginas
+        pagina = st.number_input(
+            "Página", min_value=1, max_value=paginas, step=1, key=clave_pagina
+        )
+
+        with medir('visor', filas=len(indices)):
+            ordenados = orden_filas(df, indices, None if orden == '—' else orden, ascendente)
+            vista = pagina_filas(df, ordenados, columnas, int(pagina), tamano)
+        inicio = (int(pagina) - 1) * tamano
+        st.caption(
+            f"Página {int(pagina)} de {paginas} · filas {inicio + 1 if len(vista) else 0}–{inicio + len(vista)} de {len(indices)}"
+        )
+        with medir('render', filas=len(vista)):
+            st.dataframe(vista, use_container_width=True)